@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare the JSON backends of dabasco on a synthetic large discussion: decoding a string-encoded D-BAS API v1 export
+and encoding an AF result of matching size. The baselines are the former json.loads loop for decoding and
+flask.jsonify for encoding.
+
+Usage: python3 benchmarks/benchmark_json_codec.py [number of arguments]
+"""
+
+import json
+import sys
+import time
+from os import path
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from dabasco.server.json_codec import JSONCodec, orjson  # noqa: E402
+
+
+def make_export(arguments):
+    export = {
+        'nodes': list(range(1, arguments + 2)),
+        'inferences': [{'id': i, 'conclusion': i + 1, 'premises': [i, i + 2], 'is_supportive': i % 3 != 0}
+                       for i in range(1, arguments + 1)],
+        'undercuts': [],
+    }
+    return json.dumps(json.dumps(export)).encode('utf-8')
+
+
+def make_result(arguments):
+    lines = ['arg(s{}).\narg(ns{}).\natt(s{},ns{}).\natt(ns{},s{}).\n'.format(*[i] * 6) for i in range(arguments)]
+    return {'dbas_discussion_id': 1, 'af': ''.join(lines)}
+
+
+def best_time(function, repetitions=5):
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def legacy_decode(data):
+    json_data = data.decode('utf-8')
+    while isinstance(json_data, str):
+        json_data = json.loads(json_data)
+    return json_data
+
+
+def main():
+    arguments = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    export = make_export(arguments)
+    result = make_result(arguments)
+    print('{} arguments: export {:.1f} MB, AF result {:.1f} MB'.format(
+        arguments, len(export) / 1e6, len(result['af']) / 1e6))
+
+    print('{:<24}{:>12}{:>12}'.format('backend', 'decode [s]', 'encode [s]'))
+    print('{:<24}{:>12.3f}{:>12}'.format('legacy json.loads loop', best_time(lambda: legacy_decode(export)), '-'))
+    # jsonify needs an application context, and returns the encoded result as a response
+    with Flask(__name__).app_context():
+        print('{:<24}{:>12}{:>12.3f}'.format('flask.jsonify', '-', best_time(lambda: jsonify(result))))
+    for backend in ['json'] + (['orjson'] if orjson is not None else []):
+        codec = JSONCodec(backend)
+        print('{:<24}{:>12.3f}{:>12.3f}'.format(backend, best_time(lambda: codec.decode(export)),
+                                                best_time(lambda: codec.encode(result))))
+
+
+if __name__ == '__main__':
+    main()
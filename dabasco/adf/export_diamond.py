@@ -9,13 +9,23 @@ def export_diamond(adf):
     :type adf: ADF
     :return: DIAMOND/YADF/QADF formatted string representation of the given adf
     """
-    output_list = []
+    return ''.join(iter_diamond(adf))
+
+
+def iter_diamond(adf):
+    """
+    Create the DIAMOND/YADF/QADF formatted string representation of the given adf statement by statement, e.g. to
+    stream it. The parts are separated by line breaks (at the start of each but the first part).
+
+    :param adf: ADF to be converted
+    :type adf: ADF
+    :return: iterator of str, one part with the s(...) and ac(...) lines per statement
+    """
+    separator = ''
     for statement in adf.statements:
-        output_list.append('s(' + statement + ').')
         acceptance_condition = diamond_acc_condition_to_string(adf.acceptance[statement])
-        output_list.append('ac(' + statement + ',' + acceptance_condition + ').')
-    output_string = '\n'.join(output_list)
-    return output_string
+        yield separator + 's(' + statement + ').\nac(' + statement + ',' + acceptance_condition + ').'
+        separator = '\n'
 
 
 def diamond_acc_condition_to_string(acc_node):
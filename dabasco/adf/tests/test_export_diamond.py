@@ -4,7 +4,7 @@ import unittest
 
 from dabasco.adf.adf_graph import ADF
 from dabasco.adf.adf_node import ADFNode
-from dabasco.adf.export_diamond import export_diamond
+from dabasco.adf.export_diamond import export_diamond, iter_diamond
 
 from os import path
 import logging
@@ -193,6 +193,14 @@ class TestADFExport(unittest.TestCase):
             logging.debug('%s in %s', output, export_list)
             self.assertTrue(output in export)
 
+    def test_iter_parts(self):
+        adf = ADF()
+        adf.add_statement('s1', ADFNode(ADFNode.LEAF, [ADFNode.CONSTANT_TRUE]))
+        adf.add_statement('s2', ADFNode(ADFNode.NOT, ['s1']))
+        parts = list(iter_diamond(adf))
+        self.assertEqual(parts, ['s(s1).\nac(s1,c(v)).', '\ns(s2).\nac(s2,neg(s1)).'])
+        self.assertEqual(''.join(parts), export_diamond(adf))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -9,21 +9,24 @@ def export_aspartix(af):
     :type af: AF
     :return: ASPARTIX formatted string representation of the given af
     """
-    str_list = []
+    return ''.join(iter_aspartix(af))
+
+
+def iter_aspartix(af):
+    """
+    Create the ASPARTIX formatted string representation of the given af line by line, e.g. to stream it.
+
+    :param af: argumentation framework to be converted
+    :type af: AF
+    :return: iterator of str, one line (including its line break) per argument or attack
+    """
     for arg in range(af.n):
         if af.A[arg] == AF.DEFINITE_ARGUMENT:
-            str_list.append('arg(')
-            str_list.append(str(af.get_name_for_argument(arg)))
-            str_list.append(').\n')
+            yield 'arg(' + str(af.get_name_for_argument(arg)) + ').\n'
     for attacker in range(af.n):
         if af.A[attacker] == AF.DEFINITE_ARGUMENT:
             for target in range(af.n):
                 if af.A[target] == AF.DEFINITE_ARGUMENT:
                     if af.R[attacker][target] == AF.DEFINITE_ATTACK:
-                        str_list.append('att(')
-                        str_list.append(str(af.get_name_for_argument(attacker)))
-                        str_list.append(',')
-                        str_list.append(str(af.get_name_for_argument(target)))
-                        str_list.append(').\n')
-    str_output = ''.join(str_list)
-    return str_output
+                        yield 'att(' + str(af.get_name_for_argument(attacker)) + ',' + \
+                              str(af.get_name_for_argument(target)) + ').\n'
@@ -3,7 +3,7 @@
 import unittest
 
 from dabasco.af.af_graph import AF
-from dabasco.af.export_aspartix import export_aspartix
+from dabasco.af.export_aspartix import export_aspartix, iter_aspartix
 
 from os import path
 import logging.config
@@ -165,6 +165,17 @@ class TestAFExport(unittest.TestCase):
             logging.debug('%s in %s', output, export_list)
             self.assertTrue(output in export)
 
+    def test_iter_lines(self):
+        af = AF(2)
+        af.set_argument_name(0, "a")
+        af.set_argument_name(1, "b")
+        af.set_argument(0, AF.DEFINITE_ARGUMENT)
+        af.set_argument(1, AF.DEFINITE_ARGUMENT)
+        af.set_attack(0, 1, AF.DEFINITE_ATTACK)
+        lines = list(iter_aspartix(af))
+        self.assertEqual(lines, ['arg(a).\n', 'arg(b).\n', 'att(a,b).\n'])
+        self.assertEqual(''.join(lines), export_aspartix(af))
+
 
 if __name__ == '__main__':
     unittest.main()
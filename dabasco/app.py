@@ -1,23 +1,37 @@
 #!/usr/bin/env python3
 
-from flask import Flask, jsonify
+from flask import Flask, request
 from flask_cors import CORS
-import urllib.request
+import http.client
+import urllib.error
 import urllib.parse
-import json
+import hashlib
+import hmac
+import re
+import threading
+import time
+import weakref
+import atexit
+import collections
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from config import *
 
 from dbas import dbas_import
+from dbas.dbas_http import DBASConnectionPoolManager, DBASResponse
+from dbas.dbas_stream import iter_text
+from dbas.dbas_cache import DBASCache
+from dbas.dbas_singleflight import DBASSingleFlight
+from dbas.dbas_circuit_breaker import DBASCircuitBreaker, DBASUnavailableError
+from dbas.dbas_snapshot import DBASSnapshotStore
+from server.json_codec import JSONCodec
+from server.compression import ResponseCompressor
+from server.warmup import RequestCounter, Warmup
 from invalid_request_error import InvalidRequestError
 
-import adf.import_strass as adf_import_strass
-import adf.export_diamond as adf_export_diamond
-
-import af.import_wyner as af_import_wyner
-import af.export_aspartix as af_export_aspartix
-
-import aspic.export_toast as aspic_export_toast
+import evaluation
+from evaluation import evaluation_outputs
 
 from os import path
 import logging
@@ -27,18 +41,278 @@ logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
 logger = logging.getLogger('root')
 
 app = Flask(__name__)
-CORS(app)  # Set security headers for Web requests
+# Set security headers for Web requests, and let browsers read the IDs sent with raw results
+CORS(app, expose_headers=[DABASCO_OUTPUT_HEADER_DISCUSSION_ID, DABASCO_OUTPUT_HEADER_USER_ID])
+
+# Decoder for D-BAS exports and encoder for results
+json_codec = JSONCodec(DABASCO_JSON_BACKEND)
+
+# Compression of evaluation results
+response_compressor = ResponseCompressor(DABASCO_COMPRESSION_ENCODINGS, DABASCO_COMPRESSION_LEVEL,
+                                         DABASCO_COMPRESSION_MIN_SIZE)
+
+# Keep-alive connections to D-BAS, shared by all loaders and request threads
+dbas_connection_pools = DBASConnectionPoolManager(DBAS_CONNECTION_POOL_SIZE, DBAS_CONNECT_TIMEOUT, DBAS_READ_TIMEOUT,
+                                                  DBAS_COMPRESSED_TRANSFER)
+
+# Fail fast while D-BAS is failing repeatedly
+dbas_circuit_breaker = DBASCircuitBreaker(DBAS_CIRCUIT_BREAKER_FAILURE_THRESHOLD, DBAS_CIRCUIT_BREAKER_RESET_TIMEOUT)
+
+# D-BAS exports persisted on disk, for restarts and offline mode
+dbas_snapshot_store = DBASSnapshotStore(DBAS_SNAPSHOT_DIRECTORY, DBAS_SNAPSHOT_MAX_VERSIONS) \
+    if DBAS_SNAPSHOT_DIRECTORY else None
+
+# Imported D-BAS graphs, keyed by D-BAS API version and discussion ID
+dbas_graph_cache = DBASCache(DBAS_GRAPH_CACHE_MAX_ENTRIES, DBAS_GRAPH_CACHE_TTL)
+
+# Imported D-BAS user opinions, keyed by D-BAS API version, discussion ID and user ID
+dbas_user_cache = DBASCache(DBAS_USER_CACHE_MAX_ENTRIES, DBAS_USER_CACHE_TTL)
+
+# Concurrent loads of the same discussion (or discussion/user pair) share one D-BAS fetch
+dbas_single_flight = DBASSingleFlight()
+
+# Worker threads for D-BAS requests that are dispatched concurrently.
+# Tasks submitted here must not wait on other tasks of this executor.
+dbas_fetch_executor = ThreadPoolExecutor(max_workers=DBAS_FETCH_THREADS)
+
+# Worker processes that create evaluation results concurrently (None to create them in the request thread). Processes
+# are spawned rather than forked, as the app runs several threads.
+dabasco_evaluation_executor = ProcessPoolExecutor(max_workers=DABASCO_EVALUATION_PROCESSES,
+                                                  mp_context=multiprocessing.get_context('spawn')) \
+    if DABASCO_EVALUATION_PROCESSES > 0 else None
+
+# Worker threads for background refreshes of stale cache entries, and the entries currently being refreshed
+dbas_refresh_executor = ThreadPoolExecutor(max_workers=DBAS_REFRESH_THREADS)
+dbas_pending_refreshes = set()
+dbas_pending_refreshes_lock = threading.Lock()
+
+# Encoded evaluation results, keyed by route, discussion ID, user ID, opinion strength, and the fingerprints of the
+# graph and user opinion they were created from, and the output format (plus the content encoding for compressed
+# results)
+dabasco_output_cache = DBASCache(DABASCO_OUTPUT_CACHE_MAX_ENTRIES, DABASCO_OUTPUT_CACHE_TTL)
+
+# Content fingerprints of imported graphs, computed once per graph
+dbas_graph_fingerprints = weakref.WeakKeyDictionary()
+dbas_graph_fingerprints_lock = threading.Lock()
+
+# Requests per discussion (including a decayed count of the previous run), to find the discussions to warm up
+dabasco_request_counter = RequestCounter.load(DABASCO_REQUEST_COUNTS_FILE) if DABASCO_REQUEST_COUNTS_FILE \
+    else RequestCounter()
+
+# Warm-up of the caches after startup (replaced when run as a script; empty, and thus ready, otherwise)
+dabasco_warmup = Warmup(None, [], 1)
+
+
+def is_dbas_failure(error):
+    """
+    Check whether the given error indicates a failing D-BAS instance (as opposed to e.g. an unknown discussion).
+
+    :param error: error raised by a D-BAS request
+    :type error: Exception
+    :return: bool
+    """
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500
+    return isinstance(error, (DBASUnavailableError, http.client.HTTPException, OSError))
+
+
+def fetch_dbas_json(url):
+    """
+    Fetch and decode a json export from D-BAS over a pooled keep-alive connection.
+
+    :param url: URL of the D-BAS export
+    :type url: str
+    :return: decoded json data
+    """
+    json_data, _ = fetch_dbas_json_conditional(url)
+    return json_data
+
+
+def request_dbas(url, validators=None, stream=False):
+    """
+    Send a request to D-BAS through the circuit breaker, conditional on the given validators of a previously fetched
+    version.
+
+    :param url: URL of the D-BAS export
+    :type url: str
+    :param validators: ETag and/or Last-Modified header values of a previously fetched version
+    :type validators: dict
+    :param stream: return the body as an iterator of byte chunks instead of reading it completely. The outcome of a
+        streamed request is only recorded in the circuit breaker once the body is read completely, or reading it fails
+        or is aborted, so the body must be read or closed.
+    :type stream: bool
+    :return: DBASResponse
+    """
+    headers = {}
+    if validators:
+        if validators.get('ETag'):
+            headers['If-None-Match'] = validators['ETag']
+        if validators.get('Last-Modified'):
+            headers['If-Modified-Since'] = validators['Last-Modified']
+    if not dbas_circuit_breaker.allow_request():
+        raise DBASUnavailableError('D-BAS requests are suspended after repeated failures')
+    try:
+        response = dbas_connection_pools.get(url, headers, stream)
+    except Exception as e:
+        if is_dbas_failure(e):
+            dbas_circuit_breaker.record_failure()
+        else:
+            dbas_circuit_breaker.record_success()
+        raise
+    if stream and not isinstance(response.body, list):
+        body = iter_dbas_body(response.body)
+        next(body)  # Start the generator, so that the outcome is also recorded if the body is dropped unread
+        return response._replace(body=body)
+    dbas_circuit_breaker.record_success()
+    return response
+
+
+def iter_dbas_body(chunks):
+    """
+    Pass on the chunks of a streamed D-BAS response body, and record the outcome of the request in the circuit breaker
+    once the body is read completely, or reading it fails or is aborted. The first item is None, to start the
+    generator.
+
+    :param chunks: body chunks of a D-BAS response
+    :type chunks: iterator of bytes
+    :return: iterator of bytes
+    """
+    is_failure = False
+    try:
+        yield None
+        for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        is_failure = is_dbas_failure(e)
+        raise
+    finally:
+        chunks.close()
+        if is_failure:
+            dbas_circuit_breaker.record_failure()
+        else:
+            dbas_circuit_breaker.record_success()
+
+
+def request_dbas_export(url, validators=None, stream=False, snapshot=False):
+    """
+    Get an export from D-BAS, conditional on the given validators of a previously fetched version, and keep a snapshot
+    of it if requested and DBAS_SNAPSHOT_DIRECTORY is set. Only exports with a stable URL (the graph and single user
+    exports) should be snapshotted: each URL gets its own snapshot directory, which is never removed.
+
+    Without validators, the request is made conditional on the newest snapshot, which is served if D-BAS reports it as
+    unchanged. In offline mode (DBAS_OFFLINE), the newest snapshot is served without sending a request to D-BAS.
+
+    :param url: URL of the D-BAS export
+    :type url: str
+    :param validators: ETag and/or Last-Modified header values of a previously fetched version
+    :type validators: dict
+    :param stream: return the body as an iterator of byte chunks instead of reading it completely
+    :type stream: bool
+    :param snapshot: keep a snapshot of the export, and serve it in offline mode or if D-BAS reports it as unchanged
+    :type snapshot: bool
+    :return: DBASResponse
+    """
+    if dbas_snapshot_store is None or not snapshot:
+        if DBAS_OFFLINE:
+            raise DBASUnavailableError('D-BAS is offline and no snapshot of {} is kept'.format(url))
+        return request_dbas(url, validators, stream)
+
+    snapshot = dbas_snapshot_store.latest(url) if DBAS_OFFLINE or not validators else None
+    if DBAS_OFFLINE:
+        if snapshot is None:
+            raise DBASUnavailableError('D-BAS is offline and no snapshot of {} is available'.format(url))
+        if validators and validators == snapshot.validators:
+            return DBASResponse(304, snapshot.validators, [] if stream else b'')
+        body = dbas_snapshot_store.read(snapshot)
+        return DBASResponse(200, snapshot.validators, [body] if stream else body)
+
+    snapshot_validators = snapshot.validators if snapshot else None
+    response = request_dbas(url, validators or snapshot_validators, stream)
+    if response.status == 304 and not validators and snapshot_validators:
+        logging.debug('D-BAS export %s unchanged since snapshot of %s', url, snapshot.fetched_at)
+        body = dbas_snapshot_store.read(snapshot)
+        return DBASResponse(200, snapshot.validators, [body] if stream else body)
+    if response.status == 200:
+        response_validators = get_response_validators(response)
+        if stream:
+            return response._replace(body=dbas_snapshot_store.tee(url, response.body, response_validators))
+        dbas_snapshot_store.save(url, response.body, response_validators)
+    return response
+
+
+def get_response_validators(response):
+    return {header: response.headers[header] for header in ('ETag', 'Last-Modified') if response.headers.get(header)}
+
+
+def fetch_dbas_json_conditional(url, validators=None, snapshot=False):
+    """
+    Fetch and decode a json export from D-BAS, unless D-BAS reports it as unchanged since the version described by the
+    given validators.
+
+    :param url: URL of the D-BAS export
+    :type url: str
+    :param validators: ETag and/or Last-Modified header values of a previously fetched version
+    :type validators: dict
+    :param snapshot: keep a snapshot of the export, see request_dbas_export
+    :type snapshot: bool
+    :return: tuple of decoded json data (None if not modified) and the validators of the current version
+    """
+    response = request_dbas_export(url, validators, snapshot=snapshot)
+    if response.status == 304:
+        return None, validators
+
+    return json_codec.decode(response.body), get_response_validators(response)
+
+
+def fetch_dbas_stream_conditional(url, validators=None, snapshot=False):
+    """
+    Fetch a json export from D-BAS as a stream of text chunks, unless D-BAS reports it as unchanged since the version
+    described by the given validators.
+
+    :param url: URL of the D-BAS export
+    :type url: str
+    :param validators: ETag and/or Last-Modified header values of a previously fetched version
+    :type validators: dict
+    :param snapshot: keep a snapshot of the export, see request_dbas_export
+    :type snapshot: bool
+    :return: tuple of an iterator of text chunks (None if not modified) and the validators of the current version
+    """
+    response = request_dbas_export(url, validators, stream=True, snapshot=snapshot)
+    if response.status == 304:
+        return None, validators
+    return iter_text(response.body), get_response_validators(response)
+
+
+def fetch_dbas_graph_export_conditional(url, validators=None, snapshot=False):
+    """
+    Fetch a graph export from D-BAS, either decoded completely or, if DBAS_STREAMING_IMPORT is set, as a stream of
+    text chunks to be imported incrementally.
+
+    :param url: URL of the D-BAS export
+    :type url: str
+    :param validators: ETag and/or Last-Modified header values of a previously fetched version
+    :type validators: dict
+    :param snapshot: keep a snapshot of the export, see request_dbas_export
+    :type snapshot: bool
+    :return: tuple of the export (None if not modified) and the validators of the current version
+    """
+    if DBAS_STREAMING_IMPORT:
+        return fetch_dbas_stream_conditional(url, validators, snapshot)
+    return fetch_dbas_json_conditional(url, validators, snapshot)
 
 
-def load_dbas_graph_data_v2(discussion_id):
+def load_dbas_graph_data_v2(discussion_id, cached=None):
     """
     Get graph data for the given discussion from the D-BAS API v2 export interface.
 
     :param discussion_id: discussion ID
     :type discussion_id: int
-    :return: json string representation of the graph
+    :param cached: previously cached version of the graph, to be revalidated
+    :type cached: CacheEntry
+    :return: tuple of DBASGraph and the validators of the D-BAS responses
     """
     base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+    cached_validators = cached.validators if cached else {}
 
     # Fetch statements
     params_statements = {DBAS_API2_QUERY_KEY: DBAS_API2_QUERY_STATEMENTS.substitute(discussion_id=discussion_id)}
@@ -52,48 +326,307 @@ def load_dbas_graph_data_v2(discussion_id):
     url_arguments = base_url + '?' + query_string_arguments
     logging.debug('API_v2 arguments URL: %s' % url_arguments)
 
-    statements_response = urllib.request.urlopen(url_statements).read()
-    statements_json = statements_response.decode('utf-8')
-    while isinstance(statements_json, str):
-        statements_json = json.loads(statements_json)
+    # Both queries are independent: fetch arguments in the background while fetching statements
+    arguments_future = dbas_fetch_executor.submit(fetch_dbas_graph_export_conditional, url_arguments,
+                                                  cached_validators.get(url_arguments), True)
+    statements_json, statements_validators = fetch_dbas_graph_export_conditional(
+        url_statements, cached_validators.get(url_statements), snapshot=True)
+    arguments_json, arguments_validators = arguments_future.result()
+
+    if statements_json is None and arguments_json is None:
+        logging.debug('D-BAS graph %s not modified', discussion_id)
+        return cached.value, cached.validators
+
+    # The cached graph cannot be combined with a partial update: fetch the unchanged part again
+    if statements_json is None:
+        statements_json, statements_validators = fetch_dbas_graph_export_conditional(url_statements, snapshot=True)
+    if arguments_json is None:
+        arguments_json, arguments_validators = fetch_dbas_graph_export_conditional(url_arguments, snapshot=True)
+
+    if DBAS_STREAMING_IMPORT:
+        dbas_graph = dbas_import.import_dbas_graph_v2_stream(discussion_id, statements_json, arguments_json)
+    else:
+        dbas_graph = dbas_import.import_dbas_graph_v2(discussion_id, statements_json, arguments_json)
+    return dbas_graph, {url_statements: statements_validators, url_arguments: arguments_validators}
+
+
+def iter_dbas_pages(query_template, discussion_id, keyword):
+    """
+    Fetch the pages of a paginated D-BAS API v2 list query with up to DBAS_API2_PAGE_CONCURRENCY pages in flight, and
+    yield them in order until a page is not full. Must not be called from a task of dbas_fetch_executor.
+
+    :param query_template: query template with $discussion_id, $offset and $limit placeholders
+    :type query_template: string.Template
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param keyword: key of the paginated list in the issue
+    :type keyword: str
+    :return: iterator of decoded json pages
+    """
+    base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+
+    def fetch_page(offset):
+        params = {DBAS_API2_QUERY_KEY: query_template.substitute(discussion_id=discussion_id, offset=offset,
+                                                                 limit=DBAS_API2_PAGE_SIZE)}
+        return fetch_dbas_json(base_url + '?' + urllib.parse.urlencode(params))
+
+    page_futures = collections.deque()
+    next_offset = 0
+    try:
+        while True:
+            while len(page_futures) < max(DBAS_API2_PAGE_CONCURRENCY, 1):
+                page_futures.append(dbas_fetch_executor.submit(fetch_page, next_offset))
+                next_offset += DBAS_API2_PAGE_SIZE
+            page_json = page_futures.popleft().result()
+            yield page_json
+            items = page_json[DBAS_API2_KEYWORD_ISSUE][keyword] if page_json[DBAS_API2_KEYWORD_ISSUE] else []
+            if len(items) < DBAS_API2_PAGE_SIZE:
+                return
+    finally:
+        for page_future in page_futures:
+            page_future.cancel()
+
+
+def load_dbas_graph_data_v2_paginated(discussion_id, cached=None):
+    """
+    Get graph data for the given discussion from the D-BAS API v2 export interface, fetching statements and arguments
+    in pages of DBAS_API2_PAGE_SIZE items.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param cached: previously cached version of the graph (not used, pages are always fetched completely)
+    :type cached: CacheEntry
+    :return: tuple of DBASGraph and (empty) validators
+    """
+    statements_pages = iter_dbas_pages(DBAS_API2_QUERY_STATEMENTS_PAGE, discussion_id, DBAS_API2_KEYWORD_STATEMENTS)
+    arguments_pages = iter_dbas_pages(DBAS_API2_QUERY_ARGUMENTS_PAGE, discussion_id, DBAS_API2_KEYWORD_ARGUMENTS)
+    try:
+        dbas_graph = dbas_import.import_dbas_graph_v2_pages(discussion_id, statements_pages, arguments_pages)
+    finally:
+        statements_pages.close()
+        arguments_pages.close()
+    return dbas_graph, {}
+
+
+def load_dbas_graph_data_v2_delta(discussion_id, cached=None):
+    """
+    Get graph data for the given discussion from the D-BAS API v2 export interface. A cached graph is updated by
+    fetching and importing only the statements and arguments that are newer than the ones imported before, unless it
+    was imported completely more than DBAS_API2_DELTA_FULL_IMPORT_INTERVAL seconds ago.
+
+    The cached graph itself is not modified, since it may be in use by other requests: new items are added to a copy.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param cached: previously cached version of the graph, to be updated
+    :type cached: CacheEntry
+    :return: tuple of DBASGraph and the state of the delta import
+    """
+    base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+    cached_state = cached.validators if cached else {}
+    importer = cached_state.get('delta_importer')
+    full_import_at = cached_state.get('full_import_at')
+
+    is_full_import = importer is None or time.monotonic() - full_import_at >= DBAS_API2_DELTA_FULL_IMPORT_INTERVAL
+    if is_full_import:
+        importer = dbas_import.DBASGraphImporter(discussion_id)
+        full_import_at = time.monotonic()
+    else:
+        importer = importer.copy()
+
+    params_statements = {DBAS_API2_QUERY_KEY: DBAS_API2_QUERY_STATEMENTS_DELTA.substitute(
+        discussion_id=discussion_id, min_uid=importer.max_statement_uid + 1)}
+    url_statements = base_url + '?' + urllib.parse.urlencode(params_statements)
+    params_arguments = {DBAS_API2_QUERY_KEY: DBAS_API2_QUERY_ARGUMENTS_DELTA.substitute(
+        discussion_id=discussion_id, min_uid=importer.max_argument_uid + 1)}
+    url_arguments = base_url + '?' + urllib.parse.urlencode(params_arguments)
+
+    arguments_future = dbas_fetch_executor.submit(fetch_dbas_json, url_arguments)
+    statements_json = fetch_dbas_json(url_statements)
+    arguments_json = arguments_future.result()
+
+    imported_items = dbas_import.import_dbas_graph_v2_delta(importer, statements_json, arguments_json)
+    if not is_full_import and imported_items == 0:
+        logging.debug('D-BAS graph %s not modified', discussion_id)
+        return cached.value, cached.validators
+    logging.debug('Imported %s new statements and arguments of D-BAS graph %s', imported_items, discussion_id)
+    return importer.graph, {'delta_importer': importer, 'full_import_at': full_import_at}
+
+
+def load_dbas_graph_data_v2_combined(discussion_id, cached=None):
+    """
+    Get graph data for the given discussion from the D-BAS API v2 export interface, using a single query for both
+    statements and arguments.
 
-    arguments_response = urllib.request.urlopen(url_arguments).read()
-    arguments_json = arguments_response.decode('utf-8')
-    while isinstance(arguments_json, str):
-        arguments_json = json.loads(arguments_json)
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param cached: previously cached version of the graph, to be revalidated
+    :type cached: CacheEntry
+    :return: tuple of DBASGraph and the validators of the D-BAS response
+    """
+    base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+    cached_validators = cached.validators if cached else {}
+
+    # Fetch statements and arguments
+    params_graph = {DBAS_API2_QUERY_KEY: DBAS_API2_QUERY_GRAPH.substitute(discussion_id=discussion_id)}
+    query_string_graph = urllib.parse.urlencode(params_graph)
+    url_graph = base_url + '?' + query_string_graph
+    logging.debug('API_v2 graph URL: %s' % url_graph)
 
-    dbas_graph = dbas_import.import_dbas_graph_v2(discussion_id, statements_json, arguments_json)
-    return dbas_graph
+    graph_json, graph_validators = fetch_dbas_graph_export_conditional(
+        url_graph, cached_validators.get(url_graph), snapshot=True)
+    if graph_json is None:
+        logging.debug('D-BAS graph %s not modified', discussion_id)
+        return cached.value, cached.validators
 
+    if DBAS_STREAMING_IMPORT:
+        dbas_graph = dbas_import.import_dbas_graph_v2_combined_stream(discussion_id, graph_json)
+    else:
+        dbas_graph = dbas_import.import_dbas_graph_v2_combined(discussion_id, graph_json)
+    return dbas_graph, {url_graph: graph_validators}
 
-def load_dbas_graph_data_v1(discussion_id):
+
+def load_dbas_graph_data_v1(discussion_id, cached=None):
     """
     Get graph data for the given discussion from the D-BAS API v1 export interface.
 
     :param discussion_id: discussion ID
     :type discussion_id: int
-    :return: json string representation of the graph
+    :param cached: previously cached version of the graph, to be revalidated
+    :type cached: CacheEntry
+    :return: tuple of DBASGraph and the validators of the D-BAS response
     """
+    cached_validators = cached.validators if cached else {}
     graph_url = DBAS_BASE_URL + DBAS_API1_BASE_PATH + '/' + DBAS_API1_PATH_GRAPH_DATA + '/{}'.format(discussion_id)
-    graph_response = urllib.request.urlopen(graph_url).read()
-    graph_export = graph_response.decode('utf-8')
-    while isinstance(graph_export, str):
-        graph_export = json.loads(graph_export)
-    dbas_graph = dbas_import.import_dbas_graph(discussion_id, graph_export)
-    return dbas_graph
+    graph_export, graph_validators = fetch_dbas_graph_export_conditional(
+        graph_url, cached_validators.get(graph_url), snapshot=True)
+    if graph_export is None:
+        logging.debug('D-BAS graph %s not modified', discussion_id)
+        return cached.value, cached.validators
 
+    if DBAS_STREAMING_IMPORT:
+        dbas_graph = dbas_import.import_dbas_graph_stream(discussion_id, graph_export)
+    else:
+        dbas_graph = dbas_import.import_dbas_graph(discussion_id, graph_export)
+    return dbas_graph, {graph_url: graph_validators}
 
-def load_dbas_graph_data(discussion_id):
+
+def fetch_dbas_graph_data(discussion_id, cached=None):
     if str(DBAS_API_VERSION) == '1':
-        return load_dbas_graph_data_v1(discussion_id)
+        return load_dbas_graph_data_v1(discussion_id, cached)
     elif str(DBAS_API_VERSION) == '2':
-        return load_dbas_graph_data_v2(discussion_id)
+        if DBAS_API2_DELTA_IMPORT:
+            return load_dbas_graph_data_v2_delta(discussion_id, cached)
+        if DBAS_API2_PAGE_SIZE:
+            return load_dbas_graph_data_v2_paginated(discussion_id, cached)
+        if DBAS_API2_COMBINED_QUERY:
+            return load_dbas_graph_data_v2_combined(discussion_id, cached)
+        return load_dbas_graph_data_v2(discussion_id, cached)
     else:
         logging.warning('invalid DBAS_API_VERSION `%s` (expected `1` or `2`)', str(DBAS_API_VERSION))
-        return None
+        return None, None
+
+
+def refresh_cached_dbas_data(cache, cache_key, fetch_function, *args):
+    """
+    Fetch data from D-BAS and store it in the given cache. An existing (expired) cache entry is revalidated with a
+    conditional request, and concurrent refreshes of the same data share a single D-BAS fetch.
+
+    Data is only stored if its cache entry was not invalidated while it was fetched, and fetches that started before
+    an invalidation are not shared with later refreshes.
+
+    :param cache: cache to update
+    :type cache: DBASCache
+    :param cache_key: cache key of the data
+    :param fetch_function: function fetching the data, called as fetch_function(*args, cached)
+    :param args: arguments of the fetch function
+    :return: fetched data
+    """
+    generation = cache.generation(cache_key)
+    cached = cache.peek(cache_key)
+    flight_key = (fetch_function.__name__,) + cache_key + (generation,)
+    value, validators = dbas_single_flight.do(flight_key, fetch_function, *(args + (cached,)))
+    if cached is not None and value is cached.value:
+        cache.revalidate(cache_key, generation)
+    elif value is not None:
+        cache.put(cache_key, value, validators, generation)
+    return value
 
 
-def load_dbas_user_data_v2(discussion_id, user_id):
+def schedule_cache_refresh(cache, cache_key, fetch_function, *args):
+    """
+    Refresh the given cache entry on a background worker, unless a refresh of it is already pending.
+
+    :param cache: cache to update
+    :type cache: DBASCache
+    :param cache_key: cache key of the data
+    :param fetch_function: function fetching the data, called as fetch_function(*args, cached)
+    :param args: arguments of the fetch function
+    """
+    refresh_key = (fetch_function.__name__,) + cache_key
+    with dbas_pending_refreshes_lock:
+        if refresh_key in dbas_pending_refreshes:
+            return
+        dbas_pending_refreshes.add(refresh_key)
+
+    def refresh():
+        try:
+            refresh_cached_dbas_data(cache, cache_key, fetch_function, *args)
+        except Exception as e:
+            logging.warning('Background refresh of %s failed: %s', refresh_key, e)
+        finally:
+            with dbas_pending_refreshes_lock:
+                dbas_pending_refreshes.discard(refresh_key)
+
+    dbas_refresh_executor.submit(refresh)
+
+
+def load_cached_dbas_data(cache, cache_key, fetch_function, *args):
+    """
+    Get data from the given cache, or from D-BAS on a cache miss.
+
+    An entry that expired less than DBAS_CACHE_MAX_STALENESS seconds ago is served as is, and refreshed on a
+    background worker (stale-while-revalidate). If D-BAS fails, an entry that expired less than
+    DBAS_CACHE_MAX_STALENESS_ON_ERROR seconds ago is served instead.
+
+    :param cache: cache to look up
+    :type cache: DBASCache
+    :param cache_key: cache key of the data
+    :param fetch_function: function fetching the data, called as fetch_function(*args, cached)
+    :param args: arguments of the fetch function
+    :return: cached or fetched data
+    """
+    value = cache.get(cache_key)
+    if value is not None:
+        return value
+    if DBAS_CACHE_MAX_STALENESS > 0:
+        value = cache.get_stale(cache_key, DBAS_CACHE_MAX_STALENESS)
+        if value is not None:
+            schedule_cache_refresh(cache, cache_key, fetch_function, *args)
+            return value
+    try:
+        return refresh_cached_dbas_data(cache, cache_key, fetch_function, *args)
+    except Exception as e:
+        value = cache.get_stale(cache_key, DBAS_CACHE_MAX_STALENESS_ON_ERROR) if is_dbas_failure(e) else None
+        if value is None:
+            raise
+        logging.warning('D-BAS request failed (%s): serve stale cache entry %s', e, cache_key)
+        return value
+
+
+def load_dbas_graph_data(discussion_id):
+    """
+    Get graph data for the given discussion, served from the graph cache if possible.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :return: DBASGraph
+    """
+    cache_key = (str(DBAS_API_VERSION), discussion_id)
+    return load_cached_dbas_data(dbas_graph_cache, cache_key, fetch_dbas_graph_data, discussion_id)
+
+
+def load_dbas_user_data_v2(discussion_id, user_id, cached=None):
     """
     Get user opinion data for the given user in the given discussion from the D-BAS API v2 export interface.
 
@@ -101,25 +634,28 @@ def load_dbas_user_data_v2(discussion_id, user_id):
     :type discussion_id: int
     :param user_id: user ID
     :type user_id: int
-    :return: json string representation of the user opinion
+    :param cached: previously cached version of the user opinion, to be revalidated
+    :type cached: CacheEntry
+    :return: tuple of DBASUser and the validators of the D-BAS response
     """
     base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+    cached_validators = cached.validators if cached else {}
 
     # Fetch user opinions
     params_user = {DBAS_API2_QUERY_KEY: DBAS_API2_QUERY_OPINION.substitute(user_id=user_id)}
     query_string_user = urllib.parse.urlencode(params_user)
     url_user = base_url + '?' + query_string_user
 
-    user_response = urllib.request.urlopen(url_user).read()
-    user_json = user_response.decode('utf-8')
-    while isinstance(user_json, str):
-        user_json = json.loads(user_json)
+    user_json, user_validators = fetch_dbas_json_conditional(url_user, cached_validators.get(url_user), snapshot=True)
+    if user_json is None:
+        logging.debug('D-BAS user %s not modified', user_id)
+        return cached.value, cached.validators
 
     dbas_user = dbas_import.import_dbas_user_v2(discussion_id, user_id, user_json)
-    return dbas_user
+    return dbas_user, {url_user: user_validators}
 
 
-def load_dbas_user_data_v1(discussion_id, user_id):
+def load_dbas_user_data_v1(discussion_id, user_id, cached=None):
     """
     Get user opinion data for the given user in the given discussion from the D-BAS API v1 export interface.
 
@@ -127,26 +663,535 @@ def load_dbas_user_data_v1(discussion_id, user_id):
     :type discussion_id: int
     :param user_id: user ID
     :type user_id: int
-    :return: json string representation of the user opinion
+    :param cached: previously cached version of the user opinion, to be revalidated
+    :type cached: CacheEntry
+    :return: tuple of DBASUser and the validators of the D-BAS response
     """
+    cached_validators = cached.validators if cached else {}
     user_url = '{}{}/{}/{}/{}'.format(DBAS_BASE_URL, DBAS_API1_BASE_PATH,
                                       DBAS_API1_PATH_USER_DATA, user_id, discussion_id)
-    user_response = urllib.request.urlopen(user_url).read()
-    user_export = user_response.decode('utf-8')
-    while isinstance(user_export, str):
-        user_export = json.loads(user_export)
+    user_export, user_validators = fetch_dbas_json_conditional(user_url, cached_validators.get(user_url), snapshot=True)
+    if user_export is None:
+        logging.debug('D-BAS user %s not modified', user_id)
+        return cached.value, cached.validators
+
     dbas_user = dbas_import.import_dbas_user(discussion_id, user_id, user_export)
-    return dbas_user
+    return dbas_user, {user_url: user_validators}
 
 
-def load_dbas_user_data(discussion_id, user_id):
+def fetch_dbas_user_data(discussion_id, user_id, cached=None):
     if str(DBAS_API_VERSION) == '1':
-        return load_dbas_user_data_v1(discussion_id, user_id)
+        return load_dbas_user_data_v1(discussion_id, user_id, cached)
     elif str(DBAS_API_VERSION) == '2':
-        return load_dbas_user_data_v2(discussion_id, user_id)
+        return load_dbas_user_data_v2(discussion_id, user_id, cached)
     else:
         logging.warning('invalid DBAS_API_VERSION `%s` (expected `1` or `2`)', str(DBAS_API_VERSION))
-        return None
+        return None, None
+
+
+def load_dbas_user_data(discussion_id, user_id):
+    """
+    Get user opinion data for the given user in the given discussion, served from the user cache if possible.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param user_id: user ID
+    :type user_id: int
+    :return: DBASUser
+    """
+    cache_key = (str(DBAS_API_VERSION), discussion_id, user_id)
+    return load_cached_dbas_data(dbas_user_cache, cache_key, fetch_dbas_user_data, discussion_id, user_id)
+
+
+def compact_dbas_query(query):
+    """
+    Remove the insignificant whitespace of the given D-BAS API v2 query, which would otherwise be percent-encoded in
+    the request URL, e.g. for each user of a batched opinion query.
+
+    :param query: GraphQL query
+    :type query: str
+    :return: str
+    """
+    return re.sub(r'\s*([{}():,])\s*', r'\1', ' '.join(query.split()))
+
+
+def fetch_dbas_users_data_v2(discussion_id, user_ids):
+    """
+    Get user opinion data for several users in the given discussion from the D-BAS API v2 export interface, using a
+    single query that selects each user under its own alias.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param user_ids: user IDs
+    :type user_ids: list
+    :return: dict of DBASUser by user ID
+    """
+    base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+    selections = ''.join(DBAS_API2_QUERY_OPINION_SELECTION.substitute(
+        alias=DBAS_API2_USER_ALIAS.substitute(user_id=user_id), user_id=user_id) for user_id in user_ids)
+    params_users = {DBAS_API2_QUERY_KEY: compact_dbas_query('{' + selections + '}')}
+    url_users = base_url + '?' + urllib.parse.urlencode(params_users)
+
+    users_json = fetch_dbas_json(url_users)
+    return dbas_import.import_dbas_users_v2(discussion_id, user_ids, users_json)
+
+
+def fetch_dbas_participants(discussion_id):
+    """
+    Get the IDs of the users with an opinion in the given discussion from the D-BAS API v2 export interface.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :return: sorted list of user IDs
+    :raises InvalidRequestError: if D-BAS API v1 is configured, which cannot export the users of a discussion
+    """
+    if str(DBAS_API_VERSION) != '2':
+        raise InvalidRequestError('The users of a discussion can only be loaded with D-BAS API version 2')
+    base_url = DBAS_BASE_URL + DBAS_API2_BASE_PATH
+    params_participants = {DBAS_API2_QUERY_KEY: DBAS_API2_QUERY_PARTICIPANTS.substitute(discussion_id=discussion_id)}
+    url_participants = base_url + '?' + urllib.parse.urlencode(params_participants)
+    return dbas_import.import_dbas_participants_v2(fetch_dbas_json(url_participants))
+
+
+def load_dbas_users_data(discussion_id, user_ids):
+    """
+    Get user opinion data for several users in the given discussion, served from the user cache if possible.
+
+    With D-BAS API v2, the opinions missing from the cache are fetched with one query per DBAS_API2_OPINIONS_BATCH_SIZE
+    users, and the batches are fetched concurrently. With D-BAS API v1 or in offline mode (DBAS_OFFLINE), each opinion
+    is loaded separately, since only single user exports are snapshotted. Must not be called from a task of
+    dbas_fetch_executor.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param user_ids: user IDs
+    :type user_ids: list
+    :return: dict of DBASUser by user ID
+    """
+    dbas_users = {}
+    missing_user_ids = []
+    generations = {}
+    for user_id in dict.fromkeys(user_ids):
+        cache_key = (str(DBAS_API_VERSION), discussion_id, user_id)
+        generations[user_id] = dbas_user_cache.generation(cache_key)
+        dbas_user = dbas_user_cache.get(cache_key)
+        if dbas_user is not None:
+            dbas_users[user_id] = dbas_user
+        else:
+            missing_user_ids.append(user_id)
+    if not missing_user_ids:
+        return dbas_users
+
+    if str(DBAS_API_VERSION) != '2' or DBAS_OFFLINE:
+        user_futures = {user_id: dbas_fetch_executor.submit(load_dbas_user_data, discussion_id, user_id)
+                        for user_id in missing_user_ids}
+        dbas_users.update({user_id: user_future.result() for user_id, user_future in user_futures.items()})
+        return dbas_users
+
+    batches = [missing_user_ids[i:i + DBAS_API2_OPINIONS_BATCH_SIZE]
+               for i in range(0, len(missing_user_ids), DBAS_API2_OPINIONS_BATCH_SIZE)]
+    batch_futures = [dbas_fetch_executor.submit(fetch_dbas_users_data_v2, discussion_id, batch)
+                     for batch in batches[1:]]
+    for batch, batch_future in zip(batches, [None] + batch_futures):
+        try:
+            fetched_users = batch_future.result() if batch_future else fetch_dbas_users_data_v2(discussion_id, batch)
+        except Exception as e:
+            if not is_dbas_failure(e):
+                raise
+            fetched_users = {user_id: dbas_user_cache.get_stale((str(DBAS_API_VERSION), discussion_id, user_id),
+                                                                DBAS_CACHE_MAX_STALENESS_ON_ERROR)
+                             for user_id in batch}
+            if None in fetched_users.values():
+                raise
+            logging.warning('D-BAS request failed (%s): serve stale opinions of users %s', e, batch)
+        else:
+            for user_id, dbas_user in fetched_users.items():
+                dbas_user_cache.put((str(DBAS_API_VERSION), discussion_id, user_id), dbas_user,
+                                    generation=generations[user_id])
+        dbas_users.update(fetched_users)
+    return dbas_users
+
+
+def load_dbas_data(discussion_id, user_id):
+    """
+    Get graph data for the given discussion and, if a user is given, that user's opinion data.
+
+    The user opinion is fetched in the background while the discussion graph is loaded, so both D-BAS requests
+    overlap.
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    :param user_id: user ID, or None to load no user opinion
+    :type user_id: int
+    :return: tuple of DBASGraph and DBASUser (or None)
+    """
+    user_future = dbas_fetch_executor.submit(load_dbas_user_data, discussion_id, user_id) if user_id else None
+    dbas_graph = load_dbas_graph_data(discussion_id)
+    dbas_user = user_future.result() if user_future else None
+    return dbas_graph, dbas_user
+
+
+def json_response(result, status_code=200):
+    """
+    Create a JSON response for the given result. The encoded result is passed to the response as is, so large
+    AF/ADF strings are not copied again.
+
+    :param result: result to encode
+    :type result: dict
+    :param status_code: HTTP status code of the response
+    :type status_code: int
+    :return: flask.Response
+    """
+    return encoded_json_response(json_codec.encode(result), status_code)
+
+
+def encoded_json_response(body, status_code=200):
+    return app.response_class(body, status=status_code, mimetype='application/json')
+
+
+# Evaluation routes of the formats of the multi-format routes, and opinion strengths as passed to the result builders
+evaluation_formats = {
+    DABASCO_OUTPUT_KEYWORD_AF: 'dungify',
+    DABASCO_OUTPUT_KEYWORD_ADF: 'adfify',
+    DABASCO_OUTPUT_KEYWORD_TOAST: 'toastify',
+}
+evaluation_opinions = {
+    DABASCO_INPUT_KEYWORD_OPINION_STRONG: 0,
+    DABASCO_INPUT_KEYWORD_OPINION_STRICT: 1,
+    DABASCO_INPUT_KEYWORD_OPINION_WEAK: -1,
+}
+
+# Content types of the output formats of the evaluation routes
+output_mimetypes = {
+    DABASCO_OUTPUT_FORMAT_JSON: 'application/json',
+    DABASCO_OUTPUT_FORMAT_RAW: 'text/plain',
+}
+
+
+def get_graph_fingerprint(dbas_graph):
+    """
+    Get the content fingerprint of the given graph, computed once per imported graph.
+
+    :param dbas_graph: imported graph
+    :type dbas_graph: DBASGraph
+    :return: str
+    """
+    with dbas_graph_fingerprints_lock:
+        fingerprint = dbas_graph_fingerprints.get(dbas_graph)
+    if fingerprint is None:
+        fingerprint = dbas_graph.fingerprint()
+        with dbas_graph_fingerprints_lock:
+            dbas_graph_fingerprints[dbas_graph] = fingerprint
+    return fingerprint
+
+
+def get_evaluation_key(mode, discussion, user, dbas_graph, dbas_user, opinion_strict,
+                       output_format=DABASCO_OUTPUT_FORMAT_JSON):
+    """
+    Get the key of an evaluation result: the route and its arguments along with the content of the discussion graph
+    and the effective user opinion the result is created from, and the output format.
+
+    :return: tuple
+    """
+    return (mode, discussion, user, opinion_strict, get_graph_fingerprint(dbas_graph),
+            dbas_user.opinion_fingerprint() if dbas_user else None, output_format)
+
+
+def get_evaluation_etag(evaluation_key):
+    """
+    Get the (strong) ETag of an evaluation result. It is derived from the result key and the JSON backend that encodes
+    the result, so it is known before the result is created.
+
+    :param evaluation_key: key as returned by get_evaluation_key()
+    :type evaluation_key: tuple
+    :return: str, unquoted
+    """
+    return hashlib.sha256(repr((evaluation_key, json_codec.backend)).encode('utf-8')).hexdigest()[:32]
+
+
+def create_evaluation_body(evaluation_key, dbas_graph, dbas_user):
+    """
+    Create the encoded result for the given key (or, in the raw format, the UTF-8 encoded output string of the result),
+    or serve it from the output cache. As the key holds the content of
+    the discussion graph and the user opinion, a result is reused until the graph or opinion actually changes, even
+    across refetches from D-BAS.
+
+    :param evaluation_key: key as returned by get_evaluation_key()
+    :type evaluation_key: tuple
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: bytes
+    """
+    body = dabasco_output_cache.get(evaluation_key)
+    if body is not None:
+        return body
+
+    body = create_encoded_result(evaluation_key, dbas_graph, dbas_user)
+    dabasco_output_cache.put(evaluation_key, body)
+    return body
+
+
+def create_encoded_result(evaluation_key, dbas_graph, dbas_user):
+    """
+    Create the encoded result for the given key with the JSON codec of the app, without the output cache.
+
+    :param evaluation_key: key as returned by get_evaluation_key()
+    :type evaluation_key: tuple
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: bytes
+    """
+    return evaluation.create_encoded_result(evaluation_key, dbas_graph, dbas_user, json_codec)
+
+
+def create_evaluation_bodies(evaluation_keys, dbas_graph, dbas_user):
+    """
+    Create the encoded results for the given keys, or serve them from the output cache. If dabasco_evaluation_executor
+    is configured, the missing results are created in one task on a worker process, so the graph and user opinion are
+    sent to the worker once.
+
+    :param evaluation_keys: keys as returned by get_evaluation_key()
+    :type evaluation_keys: list
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: dict of bytes by key
+    """
+    bodies = {}
+    missing_keys = []
+    for evaluation_key in dict.fromkeys(evaluation_keys):
+        body = dabasco_output_cache.get(evaluation_key)
+        if body is not None:
+            bodies[evaluation_key] = body
+        else:
+            missing_keys.append(evaluation_key)
+    if not missing_keys:
+        return bodies
+
+    if dabasco_evaluation_executor is not None:
+        missing_bodies = dabasco_evaluation_executor.submit(evaluation.create_encoded_results, missing_keys,
+                                                            dbas_graph, dbas_user, json_codec.backend).result()
+    else:
+        missing_bodies = [create_encoded_result(evaluation_key, dbas_graph, dbas_user)
+                          for evaluation_key in missing_keys]
+    for evaluation_key, body in zip(missing_keys, missing_bodies):
+        bodies[evaluation_key] = body
+        dabasco_output_cache.put(evaluation_key, body)
+    return bodies
+
+
+def evaluate(mode, discussion, user, opinion_strict):
+    """
+    Create the encoded result of the given evaluation route.
+
+    :param mode: evaluation route, one of the keys of evaluation.evaluation_results
+    :type mode: str
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID, or None
+    :type user: int
+    :param opinion_strict: opinion strength as passed to the result builder
+    :type opinion_strict: int
+    :return: bytes
+    """
+    dbas_graph, dbas_user = load_dbas_data(discussion, user)
+    evaluation_key = get_evaluation_key(mode, discussion, user, dbas_graph, dbas_user, opinion_strict)
+    return create_evaluation_body(evaluation_key, dbas_graph, dbas_user)
+
+
+def create_compressed_evaluation_body(evaluation_key, body, encoding):
+    """
+    Compress the given encoded result, or serve the compressed result from the output cache.
+
+    :param evaluation_key: key as returned by get_evaluation_key()
+    :type evaluation_key: tuple
+    :param body: encoded result
+    :type body: bytes
+    :param encoding: content encoding
+    :type encoding: str
+    :return: bytes
+    """
+    compressed_key = evaluation_key + (encoding,)
+    compressed_body = dabasco_output_cache.get(compressed_key)
+    if compressed_body is None:
+        compressed_body = response_compressor.compress(body, encoding)
+        dabasco_output_cache.put(compressed_key, compressed_body)
+    return compressed_body
+
+
+def iter_output_chunks(output):
+    """
+    Join the given parts of an output string to chunks of about DABASCO_STREAMING_CHUNK_SIZE characters.
+
+    :param output: parts of the output string
+    :type output: iterable of str
+    :return: iterator of str
+    """
+    parts = []
+    size = 0
+    for part in output:
+        parts.append(part)
+        size += len(part)
+        if size >= DABASCO_STREAMING_CHUNK_SIZE:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def iter_encoded_output(keyword, output, discussion, user):
+    """
+    Encode a result with the given output string like json_codec.encode(), but part by part while the output is
+    created.
+
+    :param keyword: key of the output string in the result
+    :type keyword: str
+    :param output: parts of the output string
+    :type output: iterable of str
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID, or None
+    :type user: int
+    :return: iterator of bytes
+    """
+    result = {DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID: discussion}
+    if user:
+        result[DABASCO_OUTPUT_KEYWORD_USER_ID] = user
+
+    # Results are encoded with sorted keys, and the output keywords sort before all other keys of the result
+    yield b'{' + json_codec.encode(keyword)[:-1] + b':"'
+    for chunk in iter_output_chunks(output):
+        yield json_codec.encode(chunk)[1:-2]
+    yield b'",' + json_codec.encode(result)[1:]
+
+
+def streamed_evaluation_response(evaluation_key, dbas_graph, dbas_user, encoding):
+    """
+    Create a chunked response of the given evaluation route that sends the result while it is created, instead of
+    creating and encoding it in memory first. The result is not kept in the output cache.
+
+    :param evaluation_key: key as returned by get_evaluation_key()
+    :type evaluation_key: tuple
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :param encoding: content encoding, or None to send the result uncompressed
+    :type encoding: str
+    :return: flask.Response
+    """
+    mode, discussion, user, opinion_strict = evaluation_key[:4]
+    output_format = evaluation_key[6]
+    keyword, create_output = evaluation_outputs[mode]
+    output = create_output(opinion_strict, dbas_graph, dbas_user)
+    if output_format == DABASCO_OUTPUT_FORMAT_RAW:
+        chunks = (chunk.encode('utf-8') for chunk in iter_output_chunks(output))
+    else:
+        chunks = iter_encoded_output(keyword, output, discussion, user)
+    if encoding:
+        chunks = response_compressor.compress_stream(chunks, encoding)
+    response = app.response_class(chunks, mimetype=output_mimetypes[output_format])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def get_requested_output_format(mode):
+    """
+    Get the output format requested for the given evaluation route: the query parameter format, or the raw format if
+    the client prefers text/plain over JSON. Only AF and ADF results are available in the raw format.
+
+    :param mode: evaluation route
+    :type mode: str
+    :return: str
+    :raises InvalidRequestError: if the requested format is unknown or not available for the route
+    """
+    output_format = request.args.get('format')
+    if output_format is None:
+        if mode in evaluation_outputs and \
+                request.accept_mimetypes.best_match(['application/json', 'text/plain']) == 'text/plain':
+            return DABASCO_OUTPUT_FORMAT_RAW
+        return DABASCO_OUTPUT_FORMAT_JSON
+    if output_format == DABASCO_OUTPUT_FORMAT_RAW and mode not in evaluation_outputs:
+        raise InvalidRequestError('Output format {} is not available for {}'.format(output_format, mode))
+    if output_format not in output_mimetypes:
+        raise InvalidRequestError('Unknown output format: {}'.format(output_format))
+    return output_format
+
+
+def is_streaming_requested():
+    stream = request.args.get('stream')
+    if stream is None:
+        return DABASCO_STREAMING_OUTPUT
+    return stream.lower() in ('1', 'true')
+
+
+def evaluation_response(mode, discussion, user, opinion_strict):
+    """
+    Create the response of the given evaluation route, tagged with the ETag of the result and compressed in the
+    content encoding negotiated with the client. Compressed results are tagged with the ETag of the uncompressed result
+    plus the content encoding. If the client already has the result (If-None-Match), a 304 response is sent without
+    creating the result.
+
+    AF and ADF results that are not in the output cache are streamed if requested (query parameter stream, default
+    DABASCO_STREAMING_OUTPUT). Streamed results are encoded to the same bytes, but their compression may differ in
+    detail from cached compressed results, so compressed streamed results are tagged with a weak ETag.
+
+    In the raw format (query parameter format=raw, or Accept: text/plain), the output string of an AF or ADF result is
+    sent as plain text, and the discussion and user ID are sent in headers.
+
+    :return: flask.Response
+    """
+    dabasco_request_counter.record(discussion)
+    output_format = get_requested_output_format(mode)
+    dbas_graph, dbas_user = load_dbas_data(discussion, user)
+    evaluation_key = get_evaluation_key(mode, discussion, user, dbas_graph, dbas_user, opinion_strict, output_format)
+    etag = get_evaluation_etag(evaluation_key)
+    encoding = response_compressor.negotiate(request.headers.get('Accept-Encoding'))
+    compressed_etag = '{}-{}'.format(etag, encoding) if encoding else None
+    weak_etag = False
+
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    elif compressed_etag and request.if_none_match.contains_weak(compressed_etag):
+        response = app.response_class(status=304)
+        etag = compressed_etag
+    else:
+        if mode in evaluation_outputs and is_streaming_requested():
+            body = dabasco_output_cache.get(evaluation_key)
+        else:
+            body = create_evaluation_body(evaluation_key, dbas_graph, dbas_user)
+
+        if body is None:
+            response = streamed_evaluation_response(evaluation_key, dbas_graph, dbas_user, encoding)
+            if encoding:
+                etag = compressed_etag
+                weak_etag = True
+        else:
+            if encoding and response_compressor.should_compress(body):
+                body = create_compressed_evaluation_body(evaluation_key, body, encoding)
+                etag = compressed_etag
+            else:
+                encoding = None
+            response = app.response_class(body, mimetype=output_mimetypes[output_format])
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+    if output_format == DABASCO_OUTPUT_FORMAT_RAW:
+        response.headers[DABASCO_OUTPUT_HEADER_DISCUSSION_ID] = str(discussion)
+        if user:
+            response.headers[DABASCO_OUTPUT_HEADER_USER_ID] = str(user)
+    response.set_etag(etag, weak=weak_etag)
+    if mode in evaluation_outputs and 'format' not in request.args:
+        response.vary.add('Accept')
+    if response_compressor.encodings:
+        response.vary.add('Accept-Encoding')
+    return response
 
 
 @app.route('/evaluate/toastify/dis/<int:discussion>/user/<int:user>',
@@ -169,34 +1214,7 @@ def toastify(discussion, user, opinion_strict):
     :type opinion_strict: int
     :return: json string
     """
-    logging.debug('Create TOAST representation from D-BAS graph...')
-
-    # Get D-BAS graph and user data
-    dbas_graph = load_dbas_graph_data(discussion)
-    dbas_user = load_dbas_user_data(discussion, user)
-
-    assumptions_type = None
-    assumptions_bias = None
-
-    # Pass through opinion strength
-    opinion_type = DABASCO_INPUT_KEYWORD_OPINION_STRONG
-    if opinion_strict == 1:
-        opinion_type = DABASCO_INPUT_KEYWORD_OPINION_STRICT
-    elif opinion_strict == -1:
-        opinion_type = DABASCO_INPUT_KEYWORD_OPINION_WEAK
-
-    # Set a default semantics
-    semantics = TOAST_KEYWORD_SEMANTICS_PREFERRED  # Default semantics
-
-    # Get assumptions and inference rules from D-BAS data
-    result = aspic_export_toast.export_toast(dbas_graph,
-                                             opinion_type,
-                                             dbas_user,
-                                             assumptions_type,
-                                             assumptions_bias,
-                                             semantics)
-
-    return jsonify(result)
+    return evaluation_response('toastify', discussion, user, opinion_strict)
 
 
 @app.route('/evaluate/adfify/dis/<int:discussion>',
@@ -219,23 +1237,7 @@ def adfify(discussion, user, opinion_strict):
     :type opinion_strict: int
     :return: json string
     """
-    logging.debug('Create ADF from D-BAS graph...')
-
-    # Get D-BAS graph and user data
-    dbas_graph = load_dbas_graph_data(discussion)
-    dbas_user = load_dbas_user_data(discussion, user) if user else None
-
-    # Create ADF
-    adf = adf_import_strass.import_adf(dbas_graph, dbas_user, opinion_strict=bool(opinion_strict))
-
-    # Convert to DIAMOND/YADF formatted string
-    str_output = adf_export_diamond.export_diamond(adf)
-    result = {DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID: discussion,
-              DABASCO_OUTPUT_KEYWORD_ADF: str_output}
-    if user:
-        result[DABASCO_OUTPUT_KEYWORD_USER_ID] = user
-    json_result = jsonify(result)
-    return json_result
+    return evaluation_response('adfify', discussion, user, opinion_strict)
 
 
 @app.route('/evaluate/dungify/dis/<int:discussion>',
@@ -256,34 +1258,358 @@ def dungify(discussion, user, opinion_strict):
     :type opinion_strict: int
     :return: json string
     """
-    logging.debug('Create AF from D-BAS graph...')
+    return evaluation_response('dungify', discussion, user, opinion_strict)
+
 
-    # Get D-BAS graph data
+def get_requested_variants(user):
+    """
+    Get the results requested for a multi-format route: the output formats in the query parameter formats (default:
+    af, adf and, with a user, toast) with each opinion strength in the query parameter opinions (default: strong).
+    The weak opinion strength only applies to TOAST, and without a user only the default opinion strength is used.
+
+    :param user: user ID, or None
+    :type user: int
+    :return: list of tuples of output format and opinion strength name
+    :raises InvalidRequestError: if a format or opinion strength is unknown or not available
+    """
+    default_formats = [DABASCO_OUTPUT_KEYWORD_AF, DABASCO_OUTPUT_KEYWORD_ADF]
+    if user:
+        default_formats.append(DABASCO_OUTPUT_KEYWORD_TOAST)
+    requested_formats = request.args.get(DABASCO_INPUT_KEYWORD_FORMATS)
+    formats = [f.strip() for f in requested_formats.split(',') if f.strip()] if requested_formats else default_formats
+    for output_format in formats:
+        if output_format not in evaluation_formats:
+            raise InvalidRequestError('Unknown format: {}'.format(output_format))
+    if not user and DABASCO_OUTPUT_KEYWORD_TOAST in formats:
+        raise InvalidRequestError('Format {} requires a user'.format(DABASCO_OUTPUT_KEYWORD_TOAST))
+
+    requested_opinions = request.args.get(DABASCO_INPUT_KEYWORD_OPINIONS)
+    opinions = [o.strip() for o in requested_opinions.split(',') if o.strip()] \
+        if requested_opinions and user else [DABASCO_INPUT_KEYWORD_OPINION_STRONG]
+    for opinion in opinions:
+        if opinion not in evaluation_opinions:
+            raise InvalidRequestError('Unknown opinion strength: {}'.format(opinion))
+
+    variants = [(output_format, opinion)
+                for output_format in dict.fromkeys(formats) for opinion in dict.fromkeys(opinions)
+                if opinion != DABASCO_INPUT_KEYWORD_OPINION_WEAK or output_format == DABASCO_OUTPUT_KEYWORD_TOAST]
+    if not variants:
+        raise InvalidRequestError('No result for the requested formats and opinion strengths')
+    return variants
+
+
+def encode_json_object(members):
+    """
+    Encode a JSON object from already encoded members, with sorted keys as json_codec.encode().
+
+    :param members: encoded member values by key
+    :type members: dict
+    :return: bytes
+    """
+    return b'{' + b','.join(json_codec.encode(key)[:-1] + b':' + value
+                            for key, value in sorted(members.items())) + b'}'
+
+
+def encode_evaluation_output(evaluation_key, body):
+    """
+    Get the output of an evaluation result as a JSON value: the output string of a raw result (AF or ADF), or the
+    encoded result itself (TOAST).
+
+    :param evaluation_key: key as returned by get_evaluation_key()
+    :type evaluation_key: tuple
+    :param body: result as returned by create_evaluation_bodies()
+    :type body: bytes
+    :return: bytes
+    """
+    if evaluation_key[6] == DABASCO_OUTPUT_FORMAT_RAW:
+        return json_codec.encode(body.decode('utf-8'))[:-1]
+    return body[:-1]
+
+
+@app.route('/evaluate/dis/<int:discussion>',
+           defaults={'user': None})
+@app.route('/evaluate/dis/<int:discussion>/user/<int:user>')
+def evaluate_formats(discussion, user):
+    """
+    Create several representations of the given discussion (and user opinion) from one load of the discussion graph
+    and user opinion: a JSON object with the discussion and user ID and, for each requested format (af, adf, toast),
+    an object with the output of the corresponding evaluation route for each requested opinion strength (strong,
+    strict, weak): the AF or ADF string, or the TOAST object. Results that are not in the output cache are created in
+    one task on a worker process if DABASCO_EVALUATION_PROCESSES is set. The response is tagged with an ETag and
+    compressed like the responses of the evaluation routes.
+
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID
+    :type user: int
+    :return: json string
+    """
+    dabasco_request_counter.record(discussion)
+    variants = get_requested_variants(user)
+    dbas_graph, dbas_user = load_dbas_data(discussion, user)
+    evaluation_keys = {(output_format, opinion): get_evaluation_key(
+        evaluation_formats[output_format], discussion, user, dbas_graph, dbas_user, evaluation_opinions[opinion],
+        DABASCO_OUTPUT_FORMAT_RAW if evaluation_formats[output_format] in evaluation_outputs else DABASCO_OUTPUT_FORMAT_JSON)
+        for output_format, opinion in variants}
+    etag = get_evaluation_etag(tuple(sorted(evaluation_keys.items())))
+    encoding = response_compressor.negotiate(request.headers.get('Accept-Encoding'))
+    compressed_etag = '{}-{}'.format(etag, encoding) if encoding else None
+
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    elif compressed_etag and request.if_none_match.contains_weak(compressed_etag):
+        response = app.response_class(status=304)
+        etag = compressed_etag
+    else:
+        bodies = create_evaluation_bodies(list(evaluation_keys.values()), dbas_graph, dbas_user)
+        members = {DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID: json_codec.encode(discussion)[:-1]}
+        if user:
+            members[DABASCO_OUTPUT_KEYWORD_USER_ID] = json_codec.encode(user)[:-1]
+        for output_format in dict.fromkeys(output_format for output_format, _ in variants):
+            members[output_format] = encode_json_object({
+                opinion: encode_evaluation_output(evaluation_key, bodies[evaluation_key])
+                for (key_format, opinion), evaluation_key in evaluation_keys.items() if key_format == output_format})
+        body = encode_json_object(members) + b'\n'
+
+        if encoding and response_compressor.should_compress(body):
+            body = response_compressor.compress(body, encoding)
+            etag = compressed_etag
+        else:
+            encoding = None
+        response = encoded_json_response(body)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    if response_compressor.encodings:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def get_requested_user_ids(discussion):
+    """
+    Get the user IDs requested for a cohort route: a comma-separated list of IDs in the query parameter ids, or all
+    users with an opinion in the discussion (ids=all).
+
+    :param discussion: discussion ID
+    :type discussion: int
+    :return: list of user IDs
+    :raises InvalidRequestError: if the user IDs are missing or not positive integers, or there are too many of them
+    """
+    requested_ids = request.args.get(DABASCO_INPUT_KEYWORD_USER_IDS, '').strip()
+    if requested_ids == DABASCO_INPUT_KEYWORD_ALL_USERS:
+        user_ids = fetch_dbas_participants(discussion)
+    else:
+        try:
+            user_ids = list(dict.fromkeys(int(user_id) for user_id in requested_ids.split(',') if user_id.strip()))
+        except ValueError:
+            raise InvalidRequestError('Invalid user IDs: {}'.format(requested_ids))
+        # D-BAS user IDs are positive (and negative IDs would not make valid aliases in batched D-BAS queries)
+        if any(user_id <= 0 for user_id in user_ids):
+            raise InvalidRequestError('Invalid user IDs: {}'.format(requested_ids))
+        if not user_ids:
+            raise InvalidRequestError('No user IDs given (query parameter {})'.format(DABASCO_INPUT_KEYWORD_USER_IDS))
+    if len(user_ids) > DABASCO_COHORT_MAX_USERS:
+        raise InvalidRequestError('Too many users: {} (max. {})'.format(len(user_ids), DABASCO_COHORT_MAX_USERS))
+    return user_ids
+
+
+def iter_cohort_results(evaluation_keys, dbas_graph, dbas_users):
+    """
+    Create the encoded results of an evaluation route for several users of a discussion, one by one. Results are served
+    from and added to the output cache like results of single users.
+
+    :param evaluation_keys: keys as returned by get_evaluation_key(), one per user
+    :type evaluation_keys: list
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_users: opinions of the users, by user ID
+    :type dbas_users: dict
+    :return: iterator of bytes, one line per user
+    """
+    for evaluation_key in evaluation_keys:
+        yield create_evaluation_body(evaluation_key, dbas_graph, dbas_users[evaluation_key[2]])
+
+
+@app.route('/evaluate/<any(toastify, adfify, dungify):mode>/dis/<int:discussion>/users',
+           defaults={'opinion_strict': 0})
+@app.route('/evaluate/<any(toastify, adfify, dungify):mode>/dis/<int:discussion>/users/opinion_strict',
+           defaults={'opinion_strict': 1})
+@app.route('/evaluate/toastify/dis/<int:discussion>/users/opinion_weak',
+           defaults={'mode': 'toastify', 'opinion_strict': -1})
+def evaluate_cohort(mode, discussion, opinion_strict):
+    """
+    Create the results of the given evaluation route for several users of the given discussion, as newline-delimited
+    JSON with the result of one user per line, in the order of the requested user IDs. The discussion graph is loaded
+    once, the user opinions are loaded in bulk, and the results are streamed while they are created.
+
+    The response is tagged with an ETag derived from the keys of the results (including the graph and opinion
+    fingerprints), and a 304 response is sent without creating the results if the client already has them. Compressed
+    responses are compressed while they are streamed, and thus tagged with a weak ETag.
+
+    :param mode: evaluation route: toastify, adfify or dungify
+    :type mode: str
+    :param discussion: discussion ID
+    :type discussion: int
+    :param opinion_strict: opinion strength as in the evaluation route of a single user
+    :type opinion_strict: int
+    :return: NDJSON string
+    """
+    dabasco_request_counter.record(discussion)
+    user_ids = get_requested_user_ids(discussion)
     dbas_graph = load_dbas_graph_data(discussion)
+    dbas_users = load_dbas_users_data(discussion, user_ids)
+    evaluation_keys = [get_evaluation_key(mode, discussion, user_id, dbas_graph, dbas_users[user_id], opinion_strict)
+                       for user_id in user_ids]
+    etag = get_evaluation_etag(tuple(evaluation_keys))
+    encoding = response_compressor.negotiate(request.headers.get('Accept-Encoding'))
+    compressed_etag = '{}-{}'.format(etag, encoding) if encoding else None
 
-    # Create AF
-    dbas_user = load_dbas_user_data(discussion, user) if user else None
-    af = af_import_wyner.import_af_wyner(dbas_graph, dbas_user, opinion_strict=bool(opinion_strict))
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+    elif compressed_etag and request.if_none_match.contains_weak(compressed_etag):
+        response = app.response_class(status=304)
+        response.set_etag(compressed_etag, weak=True)
+    else:
+        chunks = iter_cohort_results(evaluation_keys, dbas_graph, dbas_users)
+        if encoding:
+            chunks = response_compressor.compress_stream(chunks, encoding)
+        response = app.response_class(chunks, mimetype=DABASCO_OUTPUT_MIMETYPE_NDJSON)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(compressed_etag, weak=True)
+        else:
+            response.set_etag(etag)
+    if response_compressor.encodings:
+        response.vary.add('Accept-Encoding')
+    return response
 
-    logging.debug(str(af.name_for_argument))
-    logging.debug(str(af.argument_for_name))
 
-    # Create output text format
-    str_output = af_export_aspartix.export_aspartix(af)
-    result = {DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID: discussion,
-              DABASCO_OUTPUT_KEYWORD_AF: str_output}
-    if user:
-        result[DABASCO_OUTPUT_KEYWORD_USER_ID] = user
-    json_result = jsonify(result)
-    return json_result
+def warm_up_discussion(discussion_id):
+    """
+    Load the graph of the given discussion into the graph cache and, if DABASCO_WARMUP_PRECOMPUTE is set, create its
+    AF and ADF representations (without user opinion).
+
+    :param discussion_id: discussion ID
+    :type discussion_id: int
+    """
+    load_dbas_graph_data(discussion_id)
+    if DABASCO_WARMUP_PRECOMPUTE:
+        for mode in ('dungify', 'adfify'):
+            evaluate(mode, discussion_id, None, 0)
+
+
+def get_warmup_discussions():
+    """
+    Get the discussions to warm up: those listed in DABASCO_WARMUP_DISCUSSIONS, followed by the
+    DABASCO_WARMUP_TOP_N most requested discussions of the previous run.
+
+    :return: list of discussion IDs
+    """
+    return list(DABASCO_WARMUP_DISCUSSIONS) + dabasco_request_counter.most_requested(DABASCO_WARMUP_TOP_N)
+
+
+def save_request_counts_periodically():
+    while True:
+        time.sleep(DABASCO_REQUEST_COUNTS_SAVE_INTERVAL)
+        dabasco_request_counter.save(DABASCO_REQUEST_COUNTS_FILE)
+
+
+@app.route('/statistics')
+def statistics():
+    """
+    Report runtime statistics of the D-BAS fetch layer.
+
+    :return: json string
+    """
+    result = {DABASCO_OUTPUT_KEYWORD_CONNECTION_POOLS: dbas_connection_pools.get_stats(),
+              DABASCO_OUTPUT_KEYWORD_GRAPH_CACHE: dbas_graph_cache.get_stats(),
+              DABASCO_OUTPUT_KEYWORD_USER_CACHE: dbas_user_cache.get_stats(),
+              DABASCO_OUTPUT_KEYWORD_SINGLE_FLIGHT: dbas_single_flight.get_stats(),
+              DABASCO_OUTPUT_KEYWORD_CIRCUIT_BREAKER: dbas_circuit_breaker.get_stats()}
+    result[DABASCO_OUTPUT_KEYWORD_OUTPUT_CACHE] = dabasco_output_cache.get_stats()
+    if dbas_snapshot_store is not None:
+        result[DABASCO_OUTPUT_KEYWORD_SNAPSHOTS] = dbas_snapshot_store.get_stats()
+    return json_response(result)
+
+
+def check_invalidation_token():
+    """
+    Check that the current request is authorized by DABASCO_INVALIDATION_TOKEN.
+
+    :raises InvalidRequestError: if the invalidation routes are disabled or the token does not match
+    """
+    if not DABASCO_INVALIDATION_TOKEN:
+        raise InvalidRequestError('Cache invalidation is disabled', status_code=403)
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization.encode('utf-8'),
+                               'Bearer {}'.format(DABASCO_INVALIDATION_TOKEN).encode('utf-8')):
+        raise InvalidRequestError('Invalid invalidation token', status_code=401)
+
+
+@app.route('/invalidate/dis/<int:discussion>', methods=['POST'],
+           defaults={'user': None})
+@app.route('/invalidate/dis/<int:discussion>/user/<int:user>', methods=['POST'])
+def invalidate(discussion, user):
+    """
+    Remove cached data of the given discussion, or of the given user's opinion in that discussion, after it was
+    changed in D-BAS: the discussion graph (or user opinion) and all evaluation results created from it.
+
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID
+    :type user: int
+    :return: json string with the number of removed entries per cache
+    """
+    check_invalidation_token()
+
+    if user is None:
+        logging.info('Invalidate cached data of discussion %s', discussion)
+        invalidated = {
+            DABASCO_OUTPUT_KEYWORD_GRAPH_CACHE:
+                dbas_graph_cache.invalidate_matching(lambda key: key[1] == discussion),
+            DABASCO_OUTPUT_KEYWORD_USER_CACHE: 0,
+            DABASCO_OUTPUT_KEYWORD_OUTPUT_CACHE:
+                dabasco_output_cache.invalidate_matching(lambda key: key[1] == discussion),
+        }
+    else:
+        logging.info('Invalidate cached opinion of user %s in discussion %s', user, discussion)
+        invalidated = {
+            DABASCO_OUTPUT_KEYWORD_GRAPH_CACHE: 0,
+            DABASCO_OUTPUT_KEYWORD_USER_CACHE:
+                dbas_user_cache.invalidate_matching(lambda key: key[1:] == (discussion, user)),
+            DABASCO_OUTPUT_KEYWORD_OUTPUT_CACHE:
+                dabasco_output_cache.invalidate_matching(lambda key: key[1:3] == (discussion, user)),
+        }
+    return json_response({DABASCO_OUTPUT_KEYWORD_INVALIDATED: invalidated})
+
+
+@app.route('/ready')
+def ready():
+    """
+    Report whether the warm-up after startup has finished, with status 503 while it is running.
+
+    :return: json string
+    """
+    result = {DABASCO_OUTPUT_KEYWORD_READY: dabasco_warmup.is_ready(),
+              DABASCO_OUTPUT_KEYWORD_WARMUP: dabasco_warmup.get_stats()}
+    return json_response(result, 200 if result[DABASCO_OUTPUT_KEYWORD_READY] else 503)
 
 
 @app.errorhandler(InvalidRequestError)
 def handle_invalid_request(error):
-    response = jsonify(error.to_dict())
-    response.status_code = error.status_code
-    return response
+    return json_response(error.to_dict(), error.status_code)
+
+
+@app.errorhandler(DBASUnavailableError)
+def handle_dbas_unavailable(error):
+    return handle_invalid_request(InvalidRequestError(str(error), status_code=503))
 
 
 if __name__ == '__main__':
+    if DABASCO_REQUEST_COUNTS_FILE:
+        atexit.register(dabasco_request_counter.save, DABASCO_REQUEST_COUNTS_FILE)
+        threading.Thread(target=save_request_counts_periodically, daemon=True).start()
+    dabasco_warmup = Warmup(warm_up_discussion, get_warmup_discussions(), DABASCO_WARMUP_THREADS)
+    dabasco_warmup.start()
     app.run(threaded=True, port=5101)
@@ -15,12 +15,35 @@ DABASCO_INPUT_KEYWORD_NEGATIVE_BIAS = 'negative'
 DABASCO_INPUT_KEYWORD_OPINION = 'opinion'
 DABASCO_INPUT_KEYWORD_USER = 'user'
 DABASCO_INPUT_KEYWORD_SEMANTICS = 'semantics'
+DABASCO_INPUT_KEYWORD_USER_IDS = 'ids'
+DABASCO_INPUT_KEYWORD_ALL_USERS = 'all'
+DABASCO_INPUT_KEYWORD_FORMATS = 'formats'
+DABASCO_INPUT_KEYWORD_OPINIONS = 'opinions'
 
 # DABASCO API: output keywords
 DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID = 'dbas_discussion_id'
 DABASCO_OUTPUT_KEYWORD_USER_ID = 'dbas_user_id'
 DABASCO_OUTPUT_KEYWORD_ADF = 'adf'
 DABASCO_OUTPUT_KEYWORD_AF = 'af'
+DABASCO_OUTPUT_KEYWORD_TOAST = 'toast'
+DABASCO_OUTPUT_KEYWORD_CONNECTION_POOLS = 'connection_pools'
+DABASCO_OUTPUT_KEYWORD_GRAPH_CACHE = 'graph_cache'
+DABASCO_OUTPUT_KEYWORD_USER_CACHE = 'user_cache'
+DABASCO_OUTPUT_KEYWORD_SINGLE_FLIGHT = 'single_flight'
+DABASCO_OUTPUT_KEYWORD_CIRCUIT_BREAKER = 'circuit_breaker'
+DABASCO_OUTPUT_KEYWORD_SNAPSHOTS = 'snapshots'
+DABASCO_OUTPUT_KEYWORD_OUTPUT_CACHE = 'output_cache'
+DABASCO_OUTPUT_KEYWORD_READY = 'ready'
+DABASCO_OUTPUT_KEYWORD_WARMUP = 'warmup'
+DABASCO_OUTPUT_KEYWORD_INVALIDATED = 'invalidated'
+
+# DABASCO API: output formats of the evaluation routes (query parameter "format"), and the headers that carry the
+# result metadata in the raw format
+DABASCO_OUTPUT_FORMAT_JSON = 'json'
+DABASCO_OUTPUT_FORMAT_RAW = 'raw'
+DABASCO_OUTPUT_HEADER_DISCUSSION_ID = 'X-DBAS-Discussion-Id'
+DABASCO_OUTPUT_HEADER_USER_ID = 'X-DBAS-User-Id'
+DABASCO_OUTPUT_MIMETYPE_NDJSON = 'application/x-ndjson'
 
 DUMMY_LITERAL_NAME_OPINION = 'opinion_dummy'
 DUMMY_LITERAL_NAME_ASSUMPTIONS = 'assumptions_dummy'
@@ -34,10 +57,80 @@ LITERAL_PREFIX_INFERENCE_RULE = 'i'              # read "inference"
 LITERAL_PREFIX_NOT = 'n'                         # read "not"
 
 
+# JSON backend for decoding D-BAS exports and encoding results: 'orjson', 'json' (standard library) or 'auto' (orjson
+# if installed)
+DABASCO_JSON_BACKEND = 'auto'
+
+# Cache of encoded evaluation results (max. number of results, time-to-live in seconds)
+DABASCO_OUTPUT_CACHE_MAX_ENTRIES = 256
+DABASCO_OUTPUT_CACHE_TTL = 3600
+
+# Compression of evaluation results: content encodings in order of preference ('br' and 'zstd' require the optional
+# packages brotli and zstandard, an empty list disables compression), compression level, and min. size in bytes of a
+# result to compress it
+DABASCO_COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']
+DABASCO_COMPRESSION_LEVEL = 6
+DABASCO_COMPRESSION_MIN_SIZE = 1024
+
+# Stream AF and ADF results while they are created (can be overridden per request with the query parameter
+# stream=true or stream=false), and the number of characters of the output string encoded per chunk
+DABASCO_STREAMING_OUTPUT = False
+DABASCO_STREAMING_CHUNK_SIZE = 65536
+
+# Number of worker processes that create the results of the multi-format routes (/evaluate/dis/<discussion_id>), 0 to
+# create them in the request thread. The missing results of a request are created one after another in a single task,
+# so the graph and user opinion are sent to a worker once per request: this runs several requests in parallel (outside
+# the GIL of the request threads), but does not speed up a single request. Workers are spawned and only need the
+# evaluation module, but when app.py is run as a script, each worker also runs its module level code once at startup.
+DABASCO_EVALUATION_PROCESSES = 0
+
+# Max. number of users evaluated in one request to the cohort routes (/evaluate/<mode>/dis/<discussion_id>/users). This
+# also applies to ids=all: discussions with more users are rejected with status 400.
+DABASCO_COHORT_MAX_USERS = 1000
+
+# Secret token that D-BAS sends as "Authorization: Bearer <token>" to invalidate cached data on changes (None to
+# disable the invalidation routes)
+DABASCO_INVALIDATION_TOKEN = None
+
+# Warm-up at startup: discussions to load into the graph cache, and the number of most requested discussions of the
+# previous run to load additionally
+DABASCO_WARMUP_DISCUSSIONS = []
+DABASCO_WARMUP_TOP_N = 10
+DABASCO_WARMUP_THREADS = 2
+
+# Warm-up at startup: also create the AF and ADF representations of the loaded discussions
+DABASCO_WARMUP_PRECOMPUTE = False
+
+# File to keep the number of requests per discussion in between runs (None to disable), and the number of seconds
+# between writes of the file
+DABASCO_REQUEST_COUNTS_FILE = None
+DABASCO_REQUEST_COUNTS_SAVE_INTERVAL = 300
+
+
 #####################################
 # DBAS API: version (1 or 2)
 DBAS_API_VERSION = 1
 
+# DBAS API v2: fetch statements and arguments in one combined query (True) or in two separate queries (False)
+DBAS_API2_COMBINED_QUERY = False
+
+# DBAS API: import graph exports incrementally while they are downloaded (True), or after decoding them completely
+# (False). Streaming keeps memory usage proportional to the imported graph for very large discussions.
+DBAS_STREAMING_IMPORT = False
+
+# DBAS API v2: refresh cached graphs by importing only the statements and arguments with a UID above the highest UID
+# imported so far (True). This requires a D-BAS GraphQL API that filters statements and arguments by a minimum UID
+# (see DBAS_API2_QUERY_STATEMENTS_DELTA and DBAS_API2_QUERY_ARGUMENTS_DELTA). Since edited or removed items are not
+# noticed by delta imports, graphs are imported completely again after DBAS_API2_DELTA_FULL_IMPORT_INTERVAL seconds.
+DBAS_API2_DELTA_IMPORT = False
+DBAS_API2_DELTA_FULL_IMPORT_INTERVAL = 3600
+
+# DBAS API v2: fetch statements and arguments in pages of this many items (None to fetch each in a single query), with
+# up to DBAS_API2_PAGE_CONCURRENCY pages in flight. This requires a D-BAS GraphQL API that pages statements and
+# arguments in a stable order (see DBAS_API2_QUERY_STATEMENTS_PAGE and DBAS_API2_QUERY_ARGUMENTS_PAGE).
+DBAS_API2_PAGE_SIZE = None
+DBAS_API2_PAGE_CONCURRENCY = 4
+
 # DBAS API: URL schema
 DBAS_BASE_URL = 'http://localhost:4284'
 DBAS_API1_BASE_PATH = '/export'
@@ -45,6 +138,50 @@ DBAS_API1_PATH_GRAPH_DATA = 'doj'
 DBAS_API1_PATH_USER_DATA = 'doj_user'
 DBAS_API2_BASE_PATH = '/api/v2/query'
 
+# DBAS API: connection pool (max. number of idle keep-alive connections per D-BAS host)
+DBAS_CONNECTION_POOL_SIZE = 10
+
+# DBAS API: request gzip/deflate compressed exports from D-BAS
+DBAS_COMPRESSED_TRANSFER = True
+
+# DBAS API: seconds to wait for a connection to D-BAS, and for data from an established connection
+DBAS_CONNECT_TIMEOUT = 3
+DBAS_READ_TIMEOUT = 20
+
+# DBAS API: circuit breaker (consecutive failures until D-BAS requests fail fast, seconds until the next trial request)
+DBAS_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+DBAS_CIRCUIT_BREAKER_RESET_TIMEOUT = 30
+
+# DBAS API: cache of imported discussion graphs (max. number of graphs, time-to-live in seconds)
+DBAS_GRAPH_CACHE_MAX_ENTRIES = 128
+DBAS_GRAPH_CACHE_TTL = 60
+
+# DBAS API: cache of imported user opinions (max. number of opinions, time-to-live in seconds)
+DBAS_USER_CACHE_MAX_ENTRIES = 1024
+DBAS_USER_CACHE_TTL = 10
+
+# DBAS API: seconds after expiry during which a cached graph or opinion is still served while it is refreshed in the
+# background (stale-while-revalidate), 0 to disable
+DBAS_CACHE_MAX_STALENESS = 0
+
+# DBAS API: seconds after expiry during which a cached graph or opinion is served if D-BAS fails or is unavailable
+DBAS_CACHE_MAX_STALENESS_ON_ERROR = 3600
+
+# DBAS API: number of worker threads for concurrent D-BAS requests
+DBAS_FETCH_THREADS = 8
+
+# DBAS API: number of worker threads for background refreshes of stale cache entries
+DBAS_REFRESH_THREADS = 2
+
+# DBAS API: directory for compressed snapshots of the fetched D-BAS graph and single user exports (None to disable
+# snapshots), and the number of snapshots kept per export. Batched opinion, participant, paginated and delta queries
+# are never snapshotted, since their URLs are not stable.
+DBAS_SNAPSHOT_DIRECTORY = None
+DBAS_SNAPSHOT_MAX_VERSIONS = 3
+
+# DBAS API: serve the snapshotted D-BAS exports from the snapshot directory, without sending any request to D-BAS
+DBAS_OFFLINE = False
+
 # DBAS API v2: interface keywords
 DBAS_API2_QUERY_KEY = 'q'
 DBAS_API2_KEYWORD_ISSUE = 'issue'
@@ -61,6 +198,10 @@ DBAS_API2_KEYWORD_USER = 'user'
 DBAS_API2_KEYWORD_CLICKED_STATEMENTS = 'clickedStatements'
 DBAS_API2_KEYWORD_IS_VALID = 'isValid'
 DBAS_API2_KEYWORD_IS_UPVOTE = 'isUpVote'
+DBAS_API2_KEYWORD_MIN_UID = 'minUid'
+DBAS_API2_KEYWORD_OFFSET = 'offset'
+DBAS_API2_KEYWORD_LIMIT = 'limit'
+DBAS_API2_KEYWORD_AUTHOR_UID = 'authorUid'
 
 DBAS_API2_QUERY_STATEMENTS = Template('''
 {
@@ -92,6 +233,94 @@ DBAS_API2_QUERY_ARGUMENTS = Template('''
        DBAS_API2_KEYWORD_IS_SUPPORTIVE, DBAS_API2_KEYWORD_PREMISEGROUP, DBAS_API2_KEYWORD_PREMISES,
        DBAS_API2_KEYWORD_STATEMENT_UID, DBAS_API2_KEYWORD_CONCLUSION_UID, DBAS_API2_KEYWORD_ARGUMENT_UID))
 
+DBAS_API2_QUERY_GRAPH = Template('''
+{
+  %s(uid: $discussion_id) {
+    %s {
+      %s
+    }
+    %s {
+      %s
+      %s
+      %s {
+        %s {
+          %s
+        }
+      }
+      %s
+      %s
+    }
+  }
+}
+''' % (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_STATEMENTS, DBAS_API2_KEYWORD_UID,
+       DBAS_API2_KEYWORD_ARGUMENTS, DBAS_API2_KEYWORD_UID,
+       DBAS_API2_KEYWORD_IS_SUPPORTIVE, DBAS_API2_KEYWORD_PREMISEGROUP, DBAS_API2_KEYWORD_PREMISES,
+       DBAS_API2_KEYWORD_STATEMENT_UID, DBAS_API2_KEYWORD_CONCLUSION_UID, DBAS_API2_KEYWORD_ARGUMENT_UID))
+
+# DBAS API v2: a page of $limit statements or arguments, starting at $offset, for paginated imports
+DBAS_API2_QUERY_STATEMENTS_PAGE = Template('''
+{
+  %s(uid: $discussion_id) {
+    %s(%s: $offset, %s: $limit) {
+      %s
+    }
+  }
+}
+''' % (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_STATEMENTS, DBAS_API2_KEYWORD_OFFSET, DBAS_API2_KEYWORD_LIMIT,
+       DBAS_API2_KEYWORD_UID))
+
+DBAS_API2_QUERY_ARGUMENTS_PAGE = Template('''
+{
+  %s(uid: $discussion_id) {
+    %s(%s: $offset, %s: $limit) {
+      %s
+      %s
+      %s {
+        %s {
+          %s
+        }
+      }
+      %s
+      %s
+    }
+  }
+}
+''' % (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_ARGUMENTS, DBAS_API2_KEYWORD_OFFSET, DBAS_API2_KEYWORD_LIMIT,
+       DBAS_API2_KEYWORD_UID, DBAS_API2_KEYWORD_IS_SUPPORTIVE, DBAS_API2_KEYWORD_PREMISEGROUP,
+       DBAS_API2_KEYWORD_PREMISES, DBAS_API2_KEYWORD_STATEMENT_UID, DBAS_API2_KEYWORD_CONCLUSION_UID,
+       DBAS_API2_KEYWORD_ARGUMENT_UID))
+
+# DBAS API v2: statements and arguments with a UID of at least $min_uid, for delta imports
+DBAS_API2_QUERY_STATEMENTS_DELTA = Template('''
+{
+  %s(uid: $discussion_id) {
+    %s(%s: $min_uid) {
+      %s
+    }
+  }
+}
+''' % (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_STATEMENTS, DBAS_API2_KEYWORD_MIN_UID, DBAS_API2_KEYWORD_UID))
+
+DBAS_API2_QUERY_ARGUMENTS_DELTA = Template('''
+{
+  %s(uid: $discussion_id) {
+    %s(%s: $min_uid) {
+      %s
+      %s
+      %s {
+        %s {
+          %s
+        }
+      }
+      %s
+      %s
+    }
+  }
+}
+''' % (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_ARGUMENTS, DBAS_API2_KEYWORD_MIN_UID, DBAS_API2_KEYWORD_UID,
+       DBAS_API2_KEYWORD_IS_SUPPORTIVE, DBAS_API2_KEYWORD_PREMISEGROUP, DBAS_API2_KEYWORD_PREMISES,
+       DBAS_API2_KEYWORD_STATEMENT_UID, DBAS_API2_KEYWORD_CONCLUSION_UID, DBAS_API2_KEYWORD_ARGUMENT_UID))
+
 DBAS_API2_QUERY_OPINION = Template('''
 {
   %s(%s: $user_id) {
@@ -104,6 +333,38 @@ DBAS_API2_QUERY_OPINION = Template('''
 ''' % (DBAS_API2_KEYWORD_USER, DBAS_API2_KEYWORD_UID, DBAS_API2_KEYWORD_CLICKED_STATEMENTS,
        DBAS_API2_KEYWORD_IS_VALID, DBAS_API2_KEYWORD_STATEMENT_UID, DBAS_API2_KEYWORD_IS_UPVOTE))
 
+# DBAS API v2: opinions of several users in one query, each selected under an alias
+DBAS_API2_USER_ALIAS = Template('%s$user_id' % DBAS_API2_KEYWORD_USER)
+DBAS_API2_QUERY_OPINION_SELECTION = Template('''
+  $alias: %s(%s: $user_id) {
+    %s(%s: true) {
+      %s
+      %s
+    }
+  }
+''' % (DBAS_API2_KEYWORD_USER, DBAS_API2_KEYWORD_UID, DBAS_API2_KEYWORD_CLICKED_STATEMENTS,
+       DBAS_API2_KEYWORD_IS_VALID, DBAS_API2_KEYWORD_STATEMENT_UID, DBAS_API2_KEYWORD_IS_UPVOTE))
+
+# DBAS API v2: authors of the (valid) clicks on the statements of a discussion, i.e. the users with an opinion in it,
+# for the cohort routes with ids=all. This requires a D-BAS GraphQL API that exposes the author of each click
+# (clickedStatements { authorUid }); without it, ids=all fails and user IDs must be listed explicitly.
+DBAS_API2_QUERY_PARTICIPANTS = Template('''
+{
+  %s(uid: $discussion_id) {
+    %s {
+      %s(%s: true) {
+        %s
+      }
+    }
+  }
+}
+''' % (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_STATEMENTS, DBAS_API2_KEYWORD_CLICKED_STATEMENTS,
+       DBAS_API2_KEYWORD_IS_VALID, DBAS_API2_KEYWORD_AUTHOR_UID))
+
+# DBAS API v2: max. number of users whose opinions are fetched in one query (bounds the length of the request URL, about
+# 100 bytes per user)
+DBAS_API2_OPINIONS_BATCH_SIZE = 50
+
 # DBAS API v1: interface keywords
 DBAS_KEYWORD_ACCEPTED_STATEMENTS_EXPLICIT = 'marked_statements'
 DBAS_KEYWORD_ACCEPTED_STATEMENTS_IMPLICIT = 'accepted_statements_via_click'
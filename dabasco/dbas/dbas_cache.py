@@ -0,0 +1,237 @@
+import collections
+import threading
+import time
+
+import logging
+logger = logging.getLogger('root')
+
+CacheEntry = collections.namedtuple('CacheEntry', ['value', 'stored_at', 'validators'])
+
+# Max. number of recent invalidate_matching() predicates that put() and revalidate() check
+MAX_INVALIDATED_PREDICATES = 256
+
+# Number of hash buckets that keep the last forgotten invalidation of the keys hashed to them
+FORGOTTEN_INVALIDATION_BUCKETS = 4096
+
+
+class DBASCache(object):
+    """
+    Thread-safe, bounded LRU cache with time-to-live for data imported from D-BAS.
+
+    Expired entries are not served, but kept (until evicted) together with the HTTP validators of their D-BAS
+    response, so that they can be revalidated with a conditional request instead of being fetched again.
+
+    A fetch records the generation of its key before it starts and passes it to put() or revalidate(), so that data
+    fetched before an invalidation of the key is not stored after it. Generations are numbers of invalidations: only
+    invalidated keys and the predicates of invalidate_matching() are recorded, and only the most recent ones. Older
+    invalidations of keys are kept per hash bucket, so a fetch that started before such an invalidation is discarded
+    if its key is in the same bucket; older predicates discard all fetches that started before them.
+
+    Attributes:
+          max_entries (int): maximum number of cached entries; the least recently used entry is evicted first.
+          ttl (float): number of seconds an entry is served after it was stored or revalidated.
+          stats (dict): counters for hits, misses, evictions, expirations, revalidations and stale hits.
+    """
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'revalidations': 0,
+            'stale_hits': 0,
+        }
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        # Number of invalidations so far, the last invalidation of each invalidated key (oldest first) and of each
+        # predicate, the last forgotten invalidation of the keys in each hash bucket, and the last forgotten predicate
+        self._invalidations = 0
+        self._invalidated_keys = collections.OrderedDict()
+        self._invalidated_predicates = collections.deque()
+        self._forgotten_key_invalidations = [0] * FORGOTTEN_INVALIDATION_BUCKETS
+        self._forgotten_predicate_invalidation = 0
+        self._lock = threading.Lock()
+
+    def generation(self, key):
+        """
+        Get the current generation of the given key, to be passed to put() or revalidate() after fetching its data.
+
+        :param key: cache key
+        :return: generation (opaque, comparable for equality)
+        """
+        with self._lock:
+            return self._invalidations
+
+    def _is_current(self, key, generation):
+        if generation is None:
+            return True
+        if self._invalidated_keys.get(key, 0) > generation or self._forgotten_predicate_invalidation > generation or \
+                self._forgotten_key_invalidations[hash(key) % FORGOTTEN_INVALIDATION_BUCKETS] > generation:
+            return False
+        for invalidation, predicate in reversed(self._invalidated_predicates):
+            if invalidation <= generation:
+                break
+            if predicate(key):
+                return False
+        return True
+
+    def _invalidate_key(self, key):
+        self._invalidations += 1
+        self._invalidated_keys.pop(key, None)
+        self._invalidated_keys[key] = self._invalidations
+        if len(self._invalidated_keys) > 2 * max(self.max_entries, 1) + 64:
+            # Forget the older half of the invalidated keys
+            while len(self._invalidated_keys) > max(self.max_entries, 1) + 32:
+                key, invalidation = self._invalidated_keys.popitem(last=False)
+                self._forgotten_key_invalidations[hash(key) % FORGOTTEN_INVALIDATION_BUCKETS] = invalidation
+
+    def _invalidate_predicate(self, predicate):
+        self._invalidations += 1
+        self._invalidated_predicates.append((self._invalidations, predicate))
+        if len(self._invalidated_predicates) > MAX_INVALIDATED_PREDICATES:
+            self._forgotten_predicate_invalidation, _ = self._invalidated_predicates.popleft()
+
+    def get(self, key):
+        """
+        Get the cached value for the given key, if present and not expired.
+
+        :param key: cache key
+        :return: cached value, or None on a cache miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry.stored_at >= self.ttl:
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry.value
+
+    def get_stale(self, key, max_staleness):
+        """
+        Get the cached value for the given key, if present and expired less than max_staleness seconds ago.
+
+        :param key: cache key
+        :param max_staleness: number of seconds an expired entry is still served
+        :type max_staleness: float
+        :return: cached value, or None if there is no such entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry.stored_at >= self.ttl + max_staleness:
+                return None
+            self._entries.move_to_end(key)
+            self.stats['stale_hits'] += 1
+            return entry.value
+
+    def peek(self, key):
+        """
+        Get the entry for the given key, even if it is expired, without counting a hit or miss.
+
+        :param key: cache key
+        :return: CacheEntry, or None if there is no entry
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, value, validators=None, generation=None):
+        """
+        Store the given value for the given key, evicting the least recently used entries if the cache is full.
+
+        :param key: cache key
+        :param value: value to store
+        :param validators: HTTP validators of the D-BAS response(s) the value was imported from
+        :type validators: dict
+        :param generation: generation of the key before the value was fetched (see generation()); the value is not
+        stored if the key was invalidated since
+        :return: True if the value was stored
+        """
+        if self.max_entries <= 0:
+            return False
+        with self._lock:
+            if not self._is_current(key, generation):
+                logging.debug('Discard %s fetched before its invalidation', key)
+                return False
+            self._entries[key] = CacheEntry(value, self._clock(), validators or {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+                logging.debug('Evict %s from D-BAS cache', evicted_key)
+            return True
+
+    def revalidate(self, key, generation=None):
+        """
+        Mark the entry for the given key as fresh again, after D-BAS confirmed that it is unchanged.
+
+        :param key: cache key
+        :param generation: generation of the key before the revalidation request (see generation())
+        :return: True if an entry was revalidated
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._is_current(key, generation):
+                return False
+            self._entries[key] = entry._replace(stored_at=self._clock())
+            self._entries.move_to_end(key)
+            self.stats['revalidations'] += 1
+            return True
+
+    def invalidate(self, key):
+        """
+        Remove the entry for the given key, if present, and change the generation of the key.
+
+        :param key: cache key
+        :return: True if an entry was removed
+        """
+        with self._lock:
+            self._invalidate_key(key)
+            return self._entries.pop(key, None) is not None
+
+    def invalidate_matching(self, predicate):
+        """
+        Remove all entries whose key matches the given predicate, and change the generation of all matching keys,
+        including those without an entry (e.g. while their first fetch is in flight).
+
+        :param predicate: function called with a cache key, returning True if the entry shall be removed
+        :return: number of removed entries
+        """
+        with self._lock:
+            self._invalidate_predicate(predicate)
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """
+        Remove all entries, and change the generation of all keys.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+            self._invalidated_keys.clear()
+            self._invalidated_predicates.clear()
+            self._forgotten_key_invalidations = [self._invalidations] * FORGOTTEN_INVALIDATION_BUCKETS
+            self._forgotten_predicate_invalidation = self._invalidations
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self):
+        """
+        Get a snapshot of the cache statistics.
+
+        :return: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        return stats
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import logging
+logger = logging.getLogger('root')
+
+
+class DBASUnavailableError(Exception):
+    """
+    Raised instead of sending a request to D-BAS while the circuit breaker is open.
+    """
+    pass
+
+
+class DBASCircuitBreaker(object):
+    """
+    Thread-safe circuit breaker that makes D-BAS requests fail fast after repeated failures.
+
+    The breaker opens after failure_threshold consecutive failures and rejects all requests. After reset_timeout
+    seconds a single trial request is let through (half-open): if it succeeds the breaker closes, otherwise it opens
+    again.
+
+    Attributes:
+          failure_threshold (int): number of consecutive failures that open the breaker.
+          reset_timeout (float): seconds the breaker stays open before a trial request is allowed.
+          state (str): 'closed', 'open' or 'half_open'.
+          stats (dict): counters for successes, failures, rejected requests and openings.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = DBASCircuitBreaker.CLOSED
+        self.stats = {
+            'successes': 0,
+            'failures': 0,
+            'rejected': 0,
+            'opened': 0,
+        }
+        self._clock = clock
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Check whether a request may be sent. Every allowed request must be followed by a call to record_success or
+        record_failure.
+
+        :return: bool
+        """
+        with self._lock:
+            if self.state == DBASCircuitBreaker.CLOSED:
+                return True
+            if self.state == DBASCircuitBreaker.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                logging.info('D-BAS circuit breaker half-open: send trial request')
+                self.state = DBASCircuitBreaker.HALF_OPEN
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self._consecutive_failures = 0
+            if self.state != DBASCircuitBreaker.CLOSED:
+                logging.info('D-BAS circuit breaker closed')
+                self.state = DBASCircuitBreaker.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self._consecutive_failures += 1
+            if self.state == DBASCircuitBreaker.HALF_OPEN or \
+                    (self.state == DBASCircuitBreaker.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                logging.warning('D-BAS circuit breaker opened after %s consecutive failures',
+                                self._consecutive_failures)
+                self.state = DBASCircuitBreaker.OPEN
+                self._opened_at = self._clock()
+                self.stats['opened'] += 1
+
+    def get_stats(self):
+        """
+        Get a snapshot of the circuit breaker state and statistics.
+
+        :return: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['state'] = self.state
+            stats['consecutive_failures'] = self._consecutive_failures
+        return stats
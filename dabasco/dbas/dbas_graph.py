@@ -1,4 +1,5 @@
 import collections
+import hashlib
 
 import logging
 logger = logging.getLogger('root')
@@ -69,6 +70,37 @@ class DBASGraph(object):
                 return False
         return True
 
+    def fingerprint(self):
+        """
+        Compute a fingerprint of the content of this dbas graph: equivalent graphs have the same fingerprint.
+
+        :return: str
+        """
+        content = hashlib.sha256()
+        content.update(repr(self.discussion_id).encode('utf-8'))
+        content.update(repr(sorted(self.statements)).encode('utf-8'))
+        for inference_id in sorted(self.inferences):
+            inference = self.inferences[inference_id]
+            content.update(repr((inference.id, list(inference.premises), inference.conclusion,
+                                 bool(inference.is_supportive))).encode('utf-8'))
+        content.update(b'|')
+        for undercut_id in sorted(self.undercuts):
+            undercut = self.undercuts[undercut_id]
+            content.update(repr((undercut.id, list(undercut.premises), undercut.conclusion)).encode('utf-8'))
+        return content.hexdigest()
+
+    def copy(self):
+        """
+        Create a copy of this dbas graph that can be extended without affecting this graph.
+
+        :return: DBASGraph
+        """
+        graph = DBASGraph(self.discussion_id)
+        graph.statements = set(self.statements)
+        graph.inferences = dict(self.inferences)
+        graph.undercuts = dict(self.undercuts)
+        return graph
+
     def add_statement(self, statement):
         """
         Add the given statement to this dbas graph
@@ -0,0 +1,323 @@
+import collections
+import http.client
+import threading
+import urllib.error
+import urllib.parse
+import zlib
+
+import logging
+logger = logging.getLogger('root')
+
+DBASResponse = collections.namedtuple('DBASResponse', ['status', 'headers', 'body'])
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+SUPPORTED_CONTENT_ENCODINGS = ('gzip', 'deflate')
+
+
+def _content_decoder(content_encoding, first_chunk):
+    """
+    Create a decompressor for the given content encoding. A deflate body is expected in zlib format, but raw deflate
+    data (as sent by some servers) is detected by its first bytes.
+    """
+    if content_encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    is_zlib = len(first_chunk) >= 2 and first_chunk[0] & 0x0f == 8 and (first_chunk[0] << 8 | first_chunk[1]) % 31 == 0
+    return zlib.decompressobj(zlib.MAX_WBITS if is_zlib else -zlib.MAX_WBITS)
+
+
+class DBASConnectionPool(object):
+    """
+    Thread-safe pool of persistent (keep-alive) HTTP connections to a single D-BAS host.
+
+    Attributes:
+          scheme (str): URL scheme of the host, either 'http' or 'https'.
+          host (str): host name of the D-BAS instance.
+          port (int): port of the D-BAS instance.
+          maxsize (int): maximum number of idle connections kept for reuse.
+          connect_timeout (float): seconds to wait for a connection to be established, None to wait indefinitely.
+          read_timeout (float): seconds to wait for data from an established connection, None to wait indefinitely.
+          accept_encoding (bool): request gzip/deflate compressed responses and decode them transparently.
+          stats (dict): counters for requests, created, reused and discarded connections, errors, timeouts, and bytes
+                received (as transferred) and decoded (after decompression).
+    """
+
+    def __init__(self, scheme, host, port, maxsize, connect_timeout=None, read_timeout=None, accept_encoding=False):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.accept_encoding = accept_encoding
+        self.stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'connections_discarded': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'bytes_received': 0,
+            'bytes_decoded': 0,
+        }
+        self._idle_connections = collections.deque()
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+
+    def _get_connection(self):
+        """
+        Take an idle connection from the pool or open a new one if none is available.
+
+        :return: tuple of the connection and a flag indicating whether it is reused
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            if self._idle_connections:
+                self.stats['connections_reused'] += 1
+                return self._idle_connections.pop(), True
+            self.stats['connections_created'] += 1
+        return self._new_connection(), False
+
+    def _release_connection(self, connection):
+        """
+        Return the given connection to the pool, or close it if the pool is full.
+
+        :param connection: connection to release
+        :type connection: http.client.HTTPConnection
+        """
+        with self._lock:
+            if len(self._idle_connections) < self.maxsize:
+                self._idle_connections.append(connection)
+                return
+            self.stats['connections_discarded'] += 1
+        connection.close()
+
+    def _discard_connection(self, connection):
+        with self._lock:
+            self.stats['connections_discarded'] += 1
+        connection.close()
+
+    def request(self, path, headers=None, stream=False):
+        """
+        Send a GET request for the given path over a pooled connection.
+
+        A reused connection may have been closed by the server in the meantime, so a request failing on a reused
+        connection is retried once on a fresh connection. Timeouts are not retried. If accept_encoding is set,
+        compressed responses are requested and the body is returned decompressed.
+
+        :param path: request path including the query string
+        :type path: str
+        :param headers: additional request headers
+        :type headers: dict
+        :param stream: return the body as an iterator of byte chunks instead of reading it completely
+        :type stream: bool
+        :return: DBASResponse
+        """
+        if self.accept_encoding:
+            headers = dict(headers or {}, **{'Accept-Encoding': ', '.join(SUPPORTED_CONTENT_ENCODINGS)})
+        connection, is_reused = self._get_connection()
+        try:
+            response = self._send(connection, path, headers)
+        except (http.client.HTTPException, OSError) as e:
+            self._discard_connection(connection)
+            if not is_reused or isinstance(e, TimeoutError):
+                self._record_error(e)
+                raise
+            logging.debug('Pooled connection to %s:%s went stale, retry on a new connection', self.host, self.port)
+            with self._lock:
+                self.stats['connections_created'] += 1
+            connection = self._new_connection()
+            try:
+                response = self._send(connection, path, headers)
+            except (http.client.HTTPException, OSError) as e:
+                self._discard_connection(connection)
+                self._record_error(e)
+                raise
+
+        body_chunks = self._decode_body(self._iter_body(connection, response),
+                                        response.getheader('Content-Encoding', '').strip().lower())
+        if stream and response.length != 0:
+            return DBASResponse(response.status, response.msg, body_chunks)
+        body = b''.join(body_chunks)
+        return DBASResponse(response.status, response.msg, [body] if stream else body)
+
+    def _iter_body(self, connection, response):
+        """
+        Read the body of the given response in chunks. The connection is returned to the pool once the body is read
+        completely, and discarded if reading fails or is aborted.
+        """
+        is_complete = False
+        try:
+            while True:
+                chunk = response.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            is_complete = True
+        except (http.client.HTTPException, OSError) as e:
+            self._record_error(e)
+            raise
+        finally:
+            if is_complete and not response.will_close:
+                self._release_connection(connection)
+            else:
+                self._discard_connection(connection)
+
+    def _decode_body(self, chunks, content_encoding):
+        """
+        Decompress the given body chunks according to the given content encoding, counting received and decoded bytes.
+        """
+        decoder = None
+        try:
+            for chunk in chunks:
+                with self._lock:
+                    self.stats['bytes_received'] += len(chunk)
+                if content_encoding in SUPPORTED_CONTENT_ENCODINGS:
+                    if decoder is None:
+                        decoder = _content_decoder(content_encoding, chunk)
+                    chunk = decoder.decompress(chunk)
+                if chunk:
+                    with self._lock:
+                        self.stats['bytes_decoded'] += len(chunk)
+                    yield chunk
+            if decoder is not None:
+                chunk = decoder.flush()
+                if chunk:
+                    with self._lock:
+                        self.stats['bytes_decoded'] += len(chunk)
+                    yield chunk
+        except zlib.error as e:
+            error = http.client.HTTPException('Cannot decode {} response body: {}'.format(content_encoding, e))
+            self._record_error(error)
+            raise error
+        finally:
+            chunks.close()
+
+    def _record_error(self, error):
+        with self._lock:
+            self.stats['errors'] += 1
+            if isinstance(error, TimeoutError):
+                self.stats['timeouts'] += 1
+
+    def _send(self, connection, path, headers):
+        if connection.sock is None:
+            # Connect with the connect timeout, then wait for responses with the read timeout
+            connection.connect()
+            connection.sock.settimeout(self.read_timeout)
+        connection.request('GET', path, headers=headers or {})
+        return connection.getresponse()
+
+    def close(self):
+        """
+        Close all idle connections of this pool.
+        """
+        with self._lock:
+            connections = list(self._idle_connections)
+            self._idle_connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def get_stats(self):
+        """
+        Get a snapshot of the pool statistics.
+
+        :return: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['idle_connections'] = len(self._idle_connections)
+        return stats
+
+
+class DBASConnectionPoolManager(object):
+    """
+    Registry of connection pools, one per D-BAS host, shared by all D-BAS loaders.
+
+    Attributes:
+          maxsize (int): maximum number of idle connections kept per host.
+          connect_timeout (float): seconds to wait for a connection to be established, None to wait indefinitely.
+          read_timeout (float): seconds to wait for data from an established connection, None to wait indefinitely.
+          accept_encoding (bool): request gzip/deflate compressed responses and decode them transparently.
+    """
+
+    def __init__(self, maxsize, connect_timeout=None, read_timeout=None, accept_encoding=False):
+        self.maxsize = maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.accept_encoding = accept_encoding
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def connection_pool_for_url(self, url):
+        """
+        Get (or create) the connection pool responsible for the host of the given URL.
+
+        :param url: absolute http or https URL
+        :type url: str
+        :return: DBASConnectionPool
+        """
+        parsed_url = urllib.parse.urlsplit(url)
+        scheme = parsed_url.scheme or 'http'
+        if scheme not in ('http', 'https'):
+            raise ValueError('Unsupported URL scheme for D-BAS connection pool: {}'.format(scheme))
+        port = parsed_url.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parsed_url.hostname, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = DBASConnectionPool(scheme, parsed_url.hostname, port, self.maxsize,
+                                          self.connect_timeout, self.read_timeout, self.accept_encoding)
+                self._pools[key] = pool
+        return pool
+
+    def get(self, url, headers=None, stream=False):
+        """
+        Fetch the given URL over a pooled keep-alive connection.
+
+        :param url: absolute http or https URL
+        :type url: str
+        :param headers: additional request headers
+        :type headers: dict
+        :param stream: return the body as an iterator of byte chunks instead of reading it completely
+        :type stream: bool
+        :return: DBASResponse
+        :raises urllib.error.HTTPError: if D-BAS answers with an error status
+        """
+        pool = self.connection_pool_for_url(url)
+        parsed_url = urllib.parse.urlsplit(url)
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path += '?' + parsed_url.query
+        response = pool.request(path, headers, stream)
+        if response.status >= 400:
+            if stream:
+                # Drain the error body to release the connection
+                for _ in response.body:
+                    pass
+            raise urllib.error.HTTPError(url, response.status, http.client.responses.get(response.status, ''),
+                                         response.headers, None)
+        return response
+
+    def get_stats(self):
+        """
+        Get statistics of all pools, keyed by host.
+
+        :return: dict
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+        return {'{}://{}:{}'.format(pool.scheme, pool.host, pool.port): pool.get_stats() for pool in pools}
+
+    def clear(self):
+        """
+        Close all idle connections and forget all pools.
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
@@ -1,11 +1,124 @@
 from dabasco.config import *
 from dabasco.dbas.dbas_user import DBASUser
 from dabasco.dbas.dbas_graph import DBASGraph
+from dabasco.dbas.dbas_stream import iter_json_array_items
 
 import logging
 logger = logging.getLogger('root')
 
 
+class DBASGraphImporter(object):
+    """
+    Incremental conversion of D-BAS graph export items to a DBASGraph data structure.
+
+    Statements, inferences and undercuts can be added in any order. Statements that are not used by any inference or
+    undercut are omitted from the graph when the import is finished. A finished import can be continued on a copy of
+    the importer, to add newer items to a copy of the graph.
+
+    Attributes:
+          graph (DBASGraph): graph under construction.
+          max_statement_uid (int): highest D-BAS API v2 statement UID added so far (0 if none).
+          max_argument_uid (int): highest D-BAS API v2 argument UID added so far (0 if none).
+    """
+
+    def __init__(self, discussion_id):
+        self.graph = DBASGraph(discussion_id)
+        self.max_statement_uid = 0
+        self.max_argument_uid = 0
+        self._all_statements = set()
+        self._used_statements = set()
+        self._touched_statements = set()
+
+    def copy(self):
+        """
+        Create a copy of this importer, with a copy of its graph, to continue the import without affecting this
+        importer's graph.
+
+        :return: DBASGraphImporter
+        """
+        importer = DBASGraphImporter(self.graph.discussion_id)
+        importer.graph = self.graph.copy()
+        importer.max_statement_uid = self.max_statement_uid
+        importer.max_argument_uid = self.max_argument_uid
+        importer._all_statements = set(self._all_statements)
+        importer._used_statements = set(self._used_statements)
+        importer._touched_statements = set(self._touched_statements)
+        return importer
+
+    def add_statement(self, statement):
+        logging.debug('Statement: %s', statement)
+        self._all_statements.add(statement)
+        self._touched_statements.add(statement)
+
+    def add_inference(self, inference_id, premises, conclusion, is_supportive):
+        self._use_statements(premises)
+        self._use_statements([conclusion])
+        self.graph.add_inference(inference_id, premises, conclusion, is_supportive)
+
+    def add_undercut(self, inference_id, premises, conclusion):
+        self._use_statements(premises)
+        self.graph.add_undercut(inference_id, premises, conclusion)
+
+    def _use_statements(self, statements):
+        self._used_statements.update(statements)
+        self._touched_statements.update(statements)
+
+    def add_v1_inference(self, argument):
+        logging.debug('Inference: %s', argument)
+        self.add_inference(argument[DBAS_KEYWORD_INFERENCE_RULE_ID],
+                           argument[DBAS_KEYWORD_INFERENCE_RULE_PREMISES],
+                           argument[DBAS_KEYWORD_INFERENCE_RULE_CONCLUSION],
+                           argument[DBAS_KEYWORD_INFERENCE_RULE_SUPPORTIVE])
+
+    def add_v1_undercut(self, undercut):
+        logging.debug('Undercut: %s', undercut)
+        self.add_undercut(undercut[DBAS_KEYWORD_UNDERCUT_ID],
+                          undercut[DBAS_KEYWORD_UNDERCUT_PREMISES],
+                          undercut[DBAS_KEYWORD_UNDERCUT_CONCLUSION])
+
+    def add_v2_statement(self, statement_json):
+        statement = int(statement_json[DBAS_API2_KEYWORD_UID])
+        self.max_statement_uid = max(self.max_statement_uid, statement)
+        self.add_statement(statement)
+
+    def add_v2_argument(self, argument_json):
+        logging.debug('Inference: %s', argument_json)
+        inference_id = int(argument_json[DBAS_API2_KEYWORD_UID])
+        self.max_argument_uid = max(self.max_argument_uid, inference_id)
+        premises = [int(s[DBAS_API2_KEYWORD_STATEMENT_UID])
+                    for s in argument_json[DBAS_API2_KEYWORD_PREMISEGROUP][DBAS_API2_KEYWORD_PREMISES]]
+
+        conclusion = argument_json[DBAS_API2_KEYWORD_CONCLUSION_UID]
+        undercut_target = argument_json[DBAS_API2_KEYWORD_ARGUMENT_UID]
+
+        if conclusion:
+            # Normal argument
+            is_supportive = bool(argument_json[DBAS_API2_KEYWORD_IS_SUPPORTIVE])
+            self.add_inference(inference_id, premises, int(conclusion), is_supportive)
+        elif undercut_target:
+            # Undercutting argument
+            self.add_undercut(inference_id, premises, int(undercut_target))
+        else:
+            self._use_statements(premises)
+            logging.warning('D-BAS argument %s has neither statement conclusion nor undercut target!', inference_id)
+
+    def finish(self):
+        """
+        Add all used statements to the graph, which were added or used since the last call.
+
+        :return: DBASGraph
+        """
+        for statement in self._touched_statements:
+            if statement not in self._all_statements or statement in self.graph.statements:
+                continue
+            if statement not in self._used_statements:
+                logging.debug('Statement %s not used in arguments: omit!', statement)
+            else:
+                self.graph.add_statement(statement)
+        self._touched_statements = set()
+        return self.graph
+
+
 def import_dbas_graph_v2(discussion_id, statements_json, arguments_json):
     """
     Convert the given D-BAS API v2 graph export to a DBASGraph data structure.
@@ -19,47 +132,135 @@ def import_dbas_graph_v2(discussion_id, statements_json, arguments_json):
     :return: DBASGraph
     """
     logging.debug('Reading D-BAS graph data...')
-    graph = DBASGraph(discussion_id)
+    importer = DBASGraphImporter(discussion_id)
 
     if statements_json[DBAS_API2_KEYWORD_ISSUE]:
-        all_statements = set()
         for statement_json in statements_json[DBAS_API2_KEYWORD_ISSUE][DBAS_API2_KEYWORD_STATEMENTS]:
-            statement = int(statement_json[DBAS_API2_KEYWORD_UID])
-            logging.debug('Statement: %s', statement)
-            all_statements.add(statement)
+            importer.add_v2_statement(statement_json)
+        for argument_json in arguments_json[DBAS_API2_KEYWORD_ISSUE][DBAS_API2_KEYWORD_ARGUMENTS]:
+            importer.add_v2_argument(argument_json)
+
+    return importer.finish()
+
+
+def import_dbas_graph_v2_pages(discussion_id, statements_pages, arguments_pages):
+    """
+    Convert the given D-BAS API v2 graph export, split into pages of statements and arguments, to a DBASGraph data
+    structure. Pages are consumed one by one, so only the page being imported needs to be kept in memory.
+
+    :param discussion_id: id of the discussion
+    :type discussion_id: int
+    :param statements_pages: iterable of json dicts as provided by D-BAS graph export
+    :param arguments_pages: iterable of json dicts as provided by D-BAS graph export
+    :return: DBASGraph
+    """
+    logging.debug('Reading D-BAS graph data pages...')
+    importer = DBASGraphImporter(discussion_id)
+
+    for statements_json in statements_pages:
+        if statements_json[DBAS_API2_KEYWORD_ISSUE]:
+            for statement_json in statements_json[DBAS_API2_KEYWORD_ISSUE][DBAS_API2_KEYWORD_STATEMENTS]:
+                importer.add_v2_statement(statement_json)
+    for arguments_json in arguments_pages:
+        if arguments_json[DBAS_API2_KEYWORD_ISSUE]:
+            for argument_json in arguments_json[DBAS_API2_KEYWORD_ISSUE][DBAS_API2_KEYWORD_ARGUMENTS]:
+                importer.add_v2_argument(argument_json)
 
-        used_statements = set()
+    return importer.finish()
+
+
+def import_dbas_graph_v2_delta(importer, statements_json, arguments_json):
+    """
+    Continue the given import with the statements and arguments of the given D-BAS API v2 graph export that have a
+    higher UID than all statements and arguments imported so far. Older items are skipped.
+
+    :param importer: importer of the previously imported graph (or a new importer to import the complete graph)
+    :type importer: DBASGraphImporter
+    :param statements_json: json dict as provided by D-BAS graph export
+    :type statements_json: dict
+    :param arguments_json: json dict as provided by D-BAS graph export
+    :type arguments_json: dict
+    :return: number of imported statements and arguments
+    """
+    logging.debug('Reading D-BAS graph delta...')
+    max_statement_uid = importer.max_statement_uid
+    max_argument_uid = importer.max_argument_uid
+    imported_items = 0
+
+    if statements_json[DBAS_API2_KEYWORD_ISSUE]:
+        for statement_json in statements_json[DBAS_API2_KEYWORD_ISSUE][DBAS_API2_KEYWORD_STATEMENTS]:
+            if int(statement_json[DBAS_API2_KEYWORD_UID]) > max_statement_uid:
+                importer.add_v2_statement(statement_json)
+                imported_items += 1
+    if arguments_json[DBAS_API2_KEYWORD_ISSUE]:
         for argument_json in arguments_json[DBAS_API2_KEYWORD_ISSUE][DBAS_API2_KEYWORD_ARGUMENTS]:
-            logging.debug('Inference: %s', argument_json)
-            inference_id = int(argument_json[DBAS_API2_KEYWORD_UID])
-            premises = [int(s[DBAS_API2_KEYWORD_STATEMENT_UID])
-                        for s in argument_json[DBAS_API2_KEYWORD_PREMISEGROUP][DBAS_API2_KEYWORD_PREMISES]]
-            for premise in premises:
-                used_statements.add(premise)
-
-            conclusion = argument_json[DBAS_API2_KEYWORD_CONCLUSION_UID]
-            undercut_target = argument_json[DBAS_API2_KEYWORD_ARGUMENT_UID]
-
-            if conclusion:
-                # Normal argument
-                conclusion = int(conclusion)
-                used_statements.add(conclusion)
-                is_supportive = bool(argument_json[DBAS_API2_KEYWORD_IS_SUPPORTIVE])
-                graph.add_inference(inference_id, premises, conclusion, is_supportive)
-            elif undercut_target:
-                # Undercutting argument
-                undercut_target = int(undercut_target)
-                graph.add_undercut(inference_id, premises, undercut_target)
-            else:
-                logging.warning('D-BAS argument %s has neither statement conclusion nor undercut target!', inference_id)
+            if int(argument_json[DBAS_API2_KEYWORD_UID]) > max_argument_uid:
+                importer.add_v2_argument(argument_json)
+                imported_items += 1
+
+    importer.finish()
+    return imported_items
 
-        for statement in all_statements:
-            if statement not in used_statements:
-                logging.debug('Statement %s not used in arguments: omit!', statement)
-            else:
-                graph.add_statement(statement)
 
-    return graph
+def import_dbas_graph_v2_stream(discussion_id, statements_chunks, arguments_chunks):
+    """
+    Convert the given D-BAS API v2 graph export to a DBASGraph data structure, reading the exports incrementally.
+
+    :param discussion_id: id of the discussion
+    :type discussion_id: int
+    :param statements_chunks: text chunks of the json document as provided by D-BAS graph export
+    :param arguments_chunks: text chunks of the json document as provided by D-BAS graph export
+    :return: DBASGraph
+    """
+    logging.debug('Streaming D-BAS graph data...')
+    importer = DBASGraphImporter(discussion_id)
+
+    statements_path = (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_STATEMENTS)
+    for _, statement_json in iter_json_array_items(statements_chunks, [statements_path]):
+        importer.add_v2_statement(statement_json)
+    arguments_path = (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_ARGUMENTS)
+    for _, argument_json in iter_json_array_items(arguments_chunks, [arguments_path]):
+        importer.add_v2_argument(argument_json)
+
+    return importer.finish()
+
+
+def import_dbas_graph_v2_combined_stream(discussion_id, graph_chunks):
+    """
+    Convert the given D-BAS API v2 graph export, with statements and arguments in a single response, to a DBASGraph
+    data structure, reading the export incrementally.
+
+    :param discussion_id: id of the discussion
+    :type discussion_id: int
+    :param graph_chunks: text chunks of the json document as provided by D-BAS combined graph export
+    :return: DBASGraph
+    """
+    logging.debug('Streaming D-BAS graph data...')
+    importer = DBASGraphImporter(discussion_id)
+
+    statements_path = (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_STATEMENTS)
+    arguments_path = (DBAS_API2_KEYWORD_ISSUE, DBAS_API2_KEYWORD_ARGUMENTS)
+    for path, item_json in iter_json_array_items(graph_chunks, [statements_path, arguments_path]):
+        if path == statements_path:
+            importer.add_v2_statement(item_json)
+        else:
+            importer.add_v2_argument(item_json)
+
+    return importer.finish()
+
+
+def import_dbas_graph_v2_combined(discussion_id, graph_json):
+    """
+    Convert the given D-BAS API v2 graph export, with statements and arguments in a single response, to a DBASGraph
+    data structure.
+
+    :param discussion_id: id of the discussion
+    :type discussion_id: int
+    :param graph_json: json dict as provided by D-BAS combined graph export
+    :type graph_json: dict
+    :return: DBASGraph
+    """
+    return import_dbas_graph_v2(discussion_id, graph_json, graph_json)
 
 
 def import_dbas_user_v2(discussion_id, user_id, user_json):
@@ -90,6 +291,43 @@ def import_dbas_user_v2(discussion_id, user_id, user_json):
     return user_opinion
 
 
+def import_dbas_users_v2(discussion_id, user_ids, users_json):
+    """
+    Convert the given D-BAS API v2 export of several user opinions, each selected under the alias given by
+    DBAS_API2_USER_ALIAS, to DBASUser data structures.
+
+    :param discussion_id: id of the context discussion
+    :type discussion_id: int
+    :param user_ids: ids of the users
+    :type user_ids: list
+    :param users_json: json dict as provided by D-BAS for a query of aliased user opinions
+    :type users_json: dict
+    :return: dict of DBASUser by user id
+    """
+    dbas_users = {}
+    for user_id in user_ids:
+        user_json = users_json.get(DBAS_API2_USER_ALIAS.substitute(user_id=user_id))
+        dbas_users[user_id] = import_dbas_user_v2(discussion_id, user_id, {DBAS_API2_KEYWORD_USER: user_json})
+    return dbas_users
+
+
+def import_dbas_participants_v2(participants_json):
+    """
+    Get the IDs of the users with an opinion in a discussion from the given D-BAS API v2 export of the authors of the
+    clicks on its statements (see DBAS_API2_QUERY_PARTICIPANTS).
+
+    :param participants_json: json dict as provided by D-BAS for a query of click authors
+    :type participants_json: dict
+    :return: sorted list of user ids
+    """
+    user_ids = set()
+    issue_json = participants_json[DBAS_API2_KEYWORD_ISSUE]
+    for statement_json in (issue_json or {}).get(DBAS_API2_KEYWORD_STATEMENTS) or []:
+        for click_json in statement_json.get(DBAS_API2_KEYWORD_CLICKED_STATEMENTS) or []:
+            user_ids.add(int(click_json[DBAS_API2_KEYWORD_AUTHOR_UID]))
+    return sorted(user_ids)
+
+
 def import_dbas_graph(discussion_id, graph_export):
     """
     Convert the given D-BAS graph export to a DBASGraph data structure.
@@ -101,42 +339,40 @@ def import_dbas_graph(discussion_id, graph_export):
     :return: DBASGraph
     """
     logging.debug('Reading D-BAS graph data...')
-    graph = DBASGraph(discussion_id)
+    importer = DBASGraphImporter(discussion_id)
 
-    all_statements = set()
     for statement in graph_export[DBAS_KEYWORD_STATEMENTS]:
-        logging.debug('Statement: %s', statement)
-        # graph.add_statement(statement)
-        all_statements.add(statement)
-
-    used_statements = set()
+        importer.add_statement(statement)
     for argument in graph_export[DBAS_KEYWORD_INFERENCE_RULES]:
-        logging.debug('Inference: %s', argument)
-        inference_id = argument[DBAS_KEYWORD_INFERENCE_RULE_ID]
-        premises = argument[DBAS_KEYWORD_INFERENCE_RULE_PREMISES]
-        conclusion = argument[DBAS_KEYWORD_INFERENCE_RULE_CONCLUSION]
-        for premise in premises:
-            used_statements.add(premise)
-        used_statements.add(conclusion)
-        is_supportive = argument[DBAS_KEYWORD_INFERENCE_RULE_SUPPORTIVE]
-        graph.add_inference(inference_id, premises, conclusion, is_supportive)
-
+        importer.add_v1_inference(argument)
     for undercut in graph_export[DBAS_KEYWORD_UNDERCUTS]:
-        logging.debug('Undercut: %s', undercut)
-        inference_id = undercut[DBAS_KEYWORD_UNDERCUT_ID]
-        premises = undercut[DBAS_KEYWORD_UNDERCUT_PREMISES]
-        conclusion = undercut[DBAS_KEYWORD_UNDERCUT_CONCLUSION]
-        for premise in premises:
-            used_statements.add(premise)
-        graph.add_undercut(inference_id, premises, conclusion)
-
-    for statement in all_statements:
-        if statement not in used_statements:
-            logging.debug('Statement %s not used in arguments: omit!', statement)
+        importer.add_v1_undercut(undercut)
+
+    return importer.finish()
+
+
+def import_dbas_graph_stream(discussion_id, graph_chunks):
+    """
+    Convert the given D-BAS graph export to a DBASGraph data structure, reading the export incrementally.
+
+    :param discussion_id: id of the discussion
+    :type discussion_id: int
+    :param graph_chunks: text chunks of the (possibly string-encoded) json document as provided by D-BAS graph export
+    :return: DBASGraph
+    """
+    logging.debug('Streaming D-BAS graph data...')
+    importer = DBASGraphImporter(discussion_id)
+
+    array_paths = [(DBAS_KEYWORD_STATEMENTS,), (DBAS_KEYWORD_INFERENCE_RULES,), (DBAS_KEYWORD_UNDERCUTS,)]
+    for path, item in iter_json_array_items(graph_chunks, array_paths):
+        if path == (DBAS_KEYWORD_STATEMENTS,):
+            importer.add_statement(item)
+        elif path == (DBAS_KEYWORD_INFERENCE_RULES,):
+            importer.add_v1_inference(item)
         else:
-            graph.add_statement(statement)
+            importer.add_v1_undercut(item)
 
-    return graph
+    return importer.finish()
 
 
 def import_dbas_user(discussion_id, user_id, user_export):
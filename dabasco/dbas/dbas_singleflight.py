@@ -0,0 +1,79 @@
+import threading
+
+import logging
+logger = logging.getLogger('root')
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DBASSingleFlight(object):
+    """
+    Coalesce concurrent identical calls, e.g. D-BAS fetches for the same discussion, into a single execution.
+
+    The first caller for a key executes the call, all callers arriving with the same key while it is in flight wait
+    for it and share its result (or exception).
+
+    Attributes:
+          stats (dict): counters for executed and coalesced calls.
+    """
+
+    def __init__(self):
+        self.stats = {
+            'executed': 0,
+            'coalesced': 0,
+        }
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        """
+        Call function(*args), unless a call with the same key is in flight, in which case wait for its result.
+
+        :param key: key identifying identical calls
+        :param function: function to call
+        :param args: arguments of the function call
+        :return: result of the (shared) function call
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.stats['executed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not is_leader:
+            logging.debug('Wait for in-flight call %s', key)
+            flight.done.wait()
+        else:
+            try:
+                flight.result = function(*args)
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def get_stats(self):
+        """
+        Get a snapshot of the single-flight statistics.
+
+        :return: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._flights)
+        return stats
@@ -0,0 +1,188 @@
+import collections
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import logging
+logger = logging.getLogger('root')
+
+Snapshot = collections.namedtuple('Snapshot', ['url', 'fetched_at', 'validators', 'path'])
+
+SNAPSHOT_SUFFIX = '.json.gz'
+METADATA_SUFFIX = '.meta.json'
+
+
+class DBASSnapshotStore(object):
+    """
+    Thread-safe store of D-BAS exports on disk, so that they survive restarts and can be served without D-BAS.
+
+    Each export is stored gzip-compressed under a directory derived from its URL, in one file per fetch named by the
+    fetch time in milliseconds. A metadata file next to it holds the URL and the HTTP validators of the response. Only
+    the newest max_versions snapshots of each URL are kept.
+
+    Attributes:
+          directory (str): root directory of the snapshots.
+          max_versions (int): number of snapshots kept per URL.
+          stats (dict): counters for saved and loaded snapshots, misses and errors.
+    """
+
+    def __init__(self, directory, max_versions=1, clock=time.time):
+        self.directory = directory
+        self.max_versions = max(max_versions, 1)
+        self.stats = {
+            'saves': 0,
+            'loads': 0,
+            'misses': 0,
+            'errors': 0,
+        }
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _url_directory(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest()[:32])
+
+    def _versions(self, url_directory):
+        """
+        Get the snapshot files in the given directory, newest first.
+        """
+        try:
+            file_names = os.listdir(url_directory)
+        except FileNotFoundError:
+            return []
+        versions = [file_name[:-len(SNAPSHOT_SUFFIX)] for file_name in file_names
+                    if file_name.endswith(SNAPSHOT_SUFFIX) and file_name[:-len(SNAPSHOT_SUFFIX)].isdigit()]
+        return sorted(versions, key=int, reverse=True)
+
+    def latest(self, url):
+        """
+        Get the newest snapshot of the given URL.
+
+        :param url: URL of the D-BAS export
+        :type url: str
+        :return: Snapshot, or None if there is no snapshot
+        """
+        url_directory = self._url_directory(url)
+        for version in self._versions(url_directory):
+            snapshot_path = os.path.join(url_directory, version + SNAPSHOT_SUFFIX)
+            try:
+                with open(os.path.join(url_directory, version + METADATA_SUFFIX), encoding='utf-8') as metadata_file:
+                    metadata = json.load(metadata_file)
+            except (OSError, ValueError) as e:
+                logging.warning('Skip unreadable D-BAS snapshot %s: %s', snapshot_path, e)
+                self._count('errors')
+                continue
+            if metadata.get('url') == url:
+                return Snapshot(url, int(version) / 1000, metadata.get('validators') or {}, snapshot_path)
+        self._count('misses')
+        return None
+
+    def read(self, snapshot):
+        """
+        Read the (decompressed) export of the given snapshot.
+
+        :param snapshot: snapshot to read
+        :type snapshot: Snapshot
+        :return: bytes
+        """
+        with gzip.open(snapshot.path, 'rb') as snapshot_file:
+            body = snapshot_file.read()
+        self._count('loads')
+        return body
+
+    def tee(self, url, chunks, validators):
+        """
+        Pass through the given chunks of an export while writing them to a new snapshot. The snapshot is only
+        committed once all chunks are read; failing to write it does not affect the passed through chunks.
+
+        :param url: URL of the D-BAS export
+        :type url: str
+        :param chunks: iterable of bytes
+        :param validators: ETag and/or Last-Modified header values of the export
+        :type validators: dict
+        :return: iterator of bytes
+        """
+        url_directory = self._url_directory(url)
+        version = str(int(self._clock() * 1000))
+        temporary_path = os.path.join(url_directory, '.{}.{}.tmp'.format(version, threading.get_ident()))
+        snapshot_file = None
+        try:
+            os.makedirs(url_directory, exist_ok=True)
+            snapshot_file = gzip.open(temporary_path, 'wb')
+        except OSError as e:
+            logging.warning('Cannot write D-BAS snapshot of %s: %s', url, e)
+            self._count('errors')
+
+        try:
+            for chunk in chunks:
+                if snapshot_file is not None:
+                    try:
+                        snapshot_file.write(chunk)
+                    except OSError as e:
+                        logging.warning('Cannot write D-BAS snapshot of %s: %s', url, e)
+                        self._count('errors')
+                        snapshot_file.close()
+                        snapshot_file = None
+                        self._remove(temporary_path)
+                yield chunk
+        except BaseException:
+            if snapshot_file is not None:
+                snapshot_file.close()
+                self._remove(temporary_path)
+            raise
+
+        if snapshot_file is not None:
+            try:
+                snapshot_file.close()
+                with open(os.path.join(url_directory, version + METADATA_SUFFIX), 'w',
+                          encoding='utf-8') as metadata_file:
+                    json.dump({'url': url, 'validators': validators or {}}, metadata_file)
+                os.replace(temporary_path, os.path.join(url_directory, version + SNAPSHOT_SUFFIX))
+            except OSError as e:
+                logging.warning('Cannot write D-BAS snapshot of %s: %s', url, e)
+                self._count('errors')
+                self._remove(temporary_path)
+                return
+            self._count('saves')
+            self._prune(url_directory)
+
+    def save(self, url, body, validators):
+        """
+        Write the given export to a new snapshot.
+
+        :param url: URL of the D-BAS export
+        :type url: str
+        :param body: the export
+        :type body: bytes
+        :param validators: ETag and/or Last-Modified header values of the export
+        :type validators: dict
+        """
+        for _ in self.tee(url, [body], validators):
+            pass
+
+    def _prune(self, url_directory):
+        for version in self._versions(url_directory)[self.max_versions:]:
+            self._remove(os.path.join(url_directory, version + SNAPSHOT_SUFFIX))
+            self._remove(os.path.join(url_directory, version + METADATA_SUFFIX))
+
+    @staticmethod
+    def _remove(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    def get_stats(self):
+        """
+        Get a snapshot of the store statistics.
+
+        :return: dict
+        """
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,194 @@
+import codecs
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_CONTENT = re.compile(r'(?:[^"\\]+|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*')
+_NUMBER_CHARACTERS = frozenset('0123456789.eE+-')
+_TRAILING_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}$')
+
+
+def iter_text(byte_chunks, encoding='utf-8'):
+    """
+    Decode the given stream of byte chunks to a stream of text chunks.
+
+    :param byte_chunks: iterable of bytes
+    :param encoding: text encoding of the stream
+    :type encoding: str
+    :return: iterator of str
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def _is_trailing_high_surrogate(text):
+    match = _TRAILING_HIGH_SURROGATE.search(text)
+    if match is None:
+        return False
+    # The escape is only real if it is not preceded by an odd number of (escaped) backslashes
+    preceding_text = text[:match.start()]
+    return (len(preceding_text) - len(preceding_text.rstrip('\\'))) % 2 == 0
+
+
+class JSONStreamReader(object):
+    """
+    Buffered reader over a stream of text chunks, decoding a JSON document piece by piece.
+
+    Only the part of the document that is currently decoded is kept in memory.
+    """
+
+    def __init__(self, text_chunks):
+        self._chunks = iter(text_chunks)
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """
+        Append the next chunk of the stream to the buffer, dropping already consumed text.
+
+        :return: False if the stream is exhausted
+        """
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def peek(self):
+        """
+        Skip whitespace and get the next character without consuming it.
+
+        :return: next character, or an empty string at the end of the stream
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        """
+        Consume the given structural character, skipping preceding whitespace.
+
+        :param char: expected character
+        :type char: str
+        """
+        if self.peek() != char:
+            raise self._error('Expecting {!r}'.format(char))
+        self._pos += 1
+
+    def expect_end(self):
+        """
+        Consume the rest of the stream, which must only contain whitespace.
+        """
+        if self.peek() != '':
+            raise self._error('Extra data')
+
+    def read_value(self):
+        """
+        Decode the next complete JSON value.
+
+        :return: decoded value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if self._eof or (end < len(self._buffer) and self._buffer[end] not in _NUMBER_CHARACTERS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def iter_string(self):
+        """
+        Decode the next JSON value, which must be a string, as a stream of text chunks.
+
+        :return: iterator of str
+        """
+        self.expect('"')
+        while True:
+            end = _STRING_CONTENT.match(self._buffer, self._pos).end()
+            is_complete = end < len(self._buffer) and self._buffer[end] == '"'
+            text = self._buffer[self._pos:end]
+            if not is_complete and not self._eof and _is_trailing_high_surrogate(text):
+                # Keep the first half of a surrogate pair until the second half is available
+                text = text[:-6]
+                end -= 6
+            if text:
+                yield json.loads('"' + text + '"')
+            self._pos = end
+            if is_complete:
+                self._pos += 1
+                return
+            if not self._fill():
+                raise self._error('Unterminated string')
+
+
+def _iter_array_items(reader, path, array_paths):
+    if path in array_paths and reader.peek() == '[':
+        reader.expect('[')
+        if reader.peek() == ']':
+            reader.expect(']')
+            return
+        while True:
+            yield path, reader.read_value()
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+        reader.expect(']')
+    elif reader.peek() == '{' and any(len(p) > len(path) and p[:len(path)] == path for p in array_paths):
+        reader.expect('{')
+        if reader.peek() == '}':
+            reader.expect('}')
+            return
+        while True:
+            key = reader.read_value()
+            reader.expect(':')
+            yield from _iter_array_items(reader, path + (key,), array_paths)
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+        reader.expect('}')
+    else:
+        reader.read_value()
+
+
+def iter_json_array_items(text_chunks, array_paths):
+    """
+    Iterate over the items of the arrays at the given key paths of a JSON document, reading the document
+    incrementally. A document that is itself encoded as a JSON string (possibly repeatedly) is decoded on the fly.
+
+    :param text_chunks: iterable of str containing the JSON document
+    :param array_paths: key paths of the arrays to iterate, e.g. [('issue', 'statements')]
+    :type array_paths: list
+    :return: iterator of (path, item) tuples in document order
+    """
+    readers = [JSONStreamReader(text_chunks)]
+    while readers[-1].peek() == '"':
+        readers.append(JSONStreamReader(readers[-1].iter_string()))
+    yield from _iter_array_items(readers[-1], (), set(array_paths))
+
+    # Consume the stream up to its end, so that the underlying connection can be reused
+    for reader in reversed(readers):
+        reader.expect_end()
@@ -1,3 +1,6 @@
+import hashlib
+
+
 class DBASUser(object):
     """
     Data structure representing a single user opinion data set obtained from D-BAS export.
@@ -66,3 +69,12 @@ class DBASUser(object):
         if self.rejected_arguments_explicit != other.rejected_arguments_explicit:
             return False
         return True
+
+    def opinion_fingerprint(self):
+        """
+        Compute a fingerprint of the effective opinion of this user, i.e. the accepted and rejected statements.
+
+        :return: str
+        """
+        opinion = (sorted(self.get_accepted_statements()), sorted(self.get_rejected_statements()))
+        return hashlib.sha256(repr(opinion).encode('utf-8')).hexdigest()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import unittest
+import threading
+
+from dabasco.dbas.dbas_cache import DBASCache
+from dabasco.dbas.dbas_graph import DBASGraph
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDBASCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = DBASCache(max_entries=2, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        graph = DBASGraph(discussion_id=1)
+        self.assertIsNone(self.cache.get(('1', 1)))
+        self.cache.put(('1', 1), graph)
+        self.assertIs(self.cache.get(('1', 1)), graph)
+        self.assertIsNone(self.cache.get(('2', 1)))
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_ttl_expiration(self):
+        self.cache.put(1, 'graph1')
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get(1), 'graph1')
+        self.clock.now = 10.0
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(self.cache.get_stats()['expirations'], 1)
+
+        # Expired entries are kept for revalidation
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.peek(1).value, 'graph1')
+
+    def test_revalidate(self):
+        self.cache.put(1, 'graph1', {'http://dbas/export/doj/1': {'ETag': '"v1"'}})
+        self.clock.now = 12
+        self.assertIsNone(self.cache.get(1))
+
+        entry = self.cache.peek(1)
+        self.assertEqual(entry.validators, {'http://dbas/export/doj/1': {'ETag': '"v1"'}})
+        self.assertTrue(self.cache.revalidate(1))
+        self.assertFalse(self.cache.revalidate(2))
+        self.assertEqual(self.cache.get(1), 'graph1')
+        self.assertEqual(self.cache.peek(1).validators, entry.validators)
+        self.assertEqual(self.cache.get_stats()['revalidations'], 1)
+
+    def test_get_stale(self):
+        self.cache.put(1, 'graph1')
+        self.clock.now = 14.9
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(self.cache.get_stale(1, max_staleness=5), 'graph1')
+        self.clock.now = 15
+        self.assertIsNone(self.cache.get_stale(1, max_staleness=5))
+        self.assertIsNone(self.cache.get_stale(2, max_staleness=5))
+        self.assertEqual(self.cache.get_stats()['stale_hits'], 1)
+
+    def test_put_refreshes_ttl(self):
+        self.cache.put(1, 'graph1')
+        self.clock.now = 8
+        self.cache.put(1, 'graph1b')
+        self.clock.now = 15
+        self.assertEqual(self.cache.get(1), 'graph1b')
+
+    def test_lru_eviction(self):
+        self.cache.put(1, 'graph1')
+        self.cache.put(2, 'graph2')
+        self.cache.get(1)
+        self.cache.put(3, 'graph3')
+
+        self.assertEqual(self.cache.get(1), 'graph1')
+        self.assertIsNone(self.cache.get(2))
+        self.assertEqual(self.cache.get(3), 'graph3')
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+
+    def test_invalidate_and_clear(self):
+        self.cache.put(1, 'graph1')
+        self.cache.put(2, 'graph2')
+        self.assertTrue(self.cache.invalidate(1))
+        self.assertFalse(self.cache.invalidate(1))
+        self.assertIsNone(self.cache.get(1))
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate_matching(self):
+        cache = DBASCache(max_entries=10, ttl=10)
+        cache.put(('1', 1, 1), 'user1')
+        cache.put(('1', 1, 2), 'user2')
+        cache.put(('1', 2, 1), 'user1')
+        self.assertEqual(cache.invalidate_matching(lambda key: key[1] == 1), 2)
+        self.assertIsNone(cache.get(('1', 1, 1)))
+        self.assertEqual(cache.get(('1', 2, 1)), 'user1')
+        self.assertEqual(cache.invalidate_matching(lambda key: key[1] == 1), 0)
+
+    def test_generation(self):
+        cache = DBASCache(max_entries=10, ttl=10)
+        cache.put(('1', 1), 'graph1')
+
+        # Fetch started before an invalidation: neither stored nor revalidated
+        generation = cache.generation(('1', 1))
+        self.assertTrue(cache.invalidate(('1', 1)))
+        self.assertFalse(cache.put(('1', 1), 'graph1', generation=generation))
+        self.assertIsNone(cache.peek(('1', 1)))
+
+        generation = cache.generation(('1', 1))
+        self.assertTrue(cache.put(('1', 1), 'graph2', generation=generation))
+        self.assertEqual(cache.get(('1', 1)), 'graph2')
+        cache.invalidate_matching(lambda key: key[1] == 1)
+        cache.put(('1', 1), 'graph2')
+        self.assertFalse(cache.revalidate(('1', 1), generation))
+        self.assertTrue(cache.revalidate(('1', 1), cache.generation(('1', 1))))
+
+        # Keys without an entry are invalidated as well, e.g. while their first fetch is in flight
+        generation = cache.generation(('1', 1, 2))
+        self.assertEqual(cache.invalidate_matching(lambda key: key[1] == 1), 1)
+        self.assertNotEqual(cache.generation(('1', 1, 2)), generation)
+        self.assertFalse(cache.put(('1', 1, 2), 'user2', generation=generation))
+
+        generation = cache.generation(('1', 2))
+        cache.clear()
+        self.assertFalse(cache.put(('1', 2), 'graph', generation=generation))
+
+    def test_generation_pruning(self):
+        cache = DBASCache(max_entries=2, ttl=10)
+        generation = cache.generation(('1', 0))
+        cache.invalidate(('1', 0))
+        for discussion_id in range(1, 100):
+            cache.invalidate(('1', discussion_id))
+        self.assertLessEqual(len(cache._invalidated_keys), 2 * 2 + 64)
+        # Fetches that started before a forgotten invalidation of their key are discarded
+        self.assertFalse(cache.put(('1', 0), 'graph', generation=generation))
+        self.assertTrue(cache.put(('1', 0), 'graph', generation=cache.generation(('1', 0))))
+
+        generation = cache.generation(('1', 1, 1))
+        for discussion_id in range(300):
+            cache.invalidate_matching(lambda key, discussion_id=discussion_id: key[1] == discussion_id)
+        self.assertFalse(cache.put(('1', 1, 1), 'user', generation=generation))
+        self.assertTrue(cache.put(('1', 1, 1), 'user', generation=cache.generation(('1', 1, 1))))
+
+    def test_generation_many_keys(self):
+        # Keys that are not invalidated are not recorded: no valid put is rejected, however many keys are fetched
+        cache = DBASCache(max_entries=1024, ttl=10)
+        for cohort in range(6):
+            keys = [('2', 1, cohort * 1000 + user_id) for user_id in range(1000)]
+            generations = [cache.generation(key) for key in keys]
+            stored = [cache.put(key, 'user', generation=generation) for key, generation in zip(keys, generations)]
+            self.assertEqual(stored.count(True), 1000)
+        self.assertEqual(len(cache), 1024)
+        self.assertEqual(len(cache._invalidated_keys), 0)
+
+        # Interleaved fetches of a key are not affected by invalidations of other keys
+        generation = cache.generation(('2', 2, 1))
+        for user_id in range(2000):
+            cache.invalidate(('2', 3, user_id))
+            self.assertTrue(cache.put(('2', 3, user_id), 'user', generation=cache.generation(('2', 3, user_id))))
+        self.assertTrue(cache.put(('2', 2, 1), 'user', generation=generation))
+
+    def test_disabled(self):
+        cache = DBASCache(max_entries=0, ttl=10)
+        cache.put(1, 'graph1')
+        self.assertIsNone(cache.get(1))
+
+    def test_concurrent_access(self):
+        cache = DBASCache(max_entries=10, ttl=60)
+
+        def worker(offset):
+            for i in range(200):
+                cache.put((offset + i) % 20, i)
+                cache.get((offset + i + 1) % 20)
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats['entries'], 10)
+        self.assertEqual(stats['hits'] + stats['misses'], 800)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from dabasco.dbas.dbas_circuit_breaker import DBASCircuitBreaker
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDBASCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = DBASCircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def fail(self, n):
+        for _ in range(n):
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure()
+
+    def test_closed_by_default(self):
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.CLOSED)
+
+    def test_open_after_consecutive_failures(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        stats = self.breaker.get_stats()
+        self.assertEqual(stats['failures'], 3)
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['rejected'], 1)
+
+    def test_success_resets_failure_count(self):
+        self.fail(2)
+        self.breaker.allow_request()
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.CLOSED)
+
+    def test_half_open_trial_success(self):
+        self.fail(3)
+        self.clock.now = 29.9
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.HALF_OPEN)
+
+        # Only a single trial request while half-open
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_half_open_trial_failure(self):
+        self.fail(3)
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, DBASCircuitBreaker.OPEN)
+
+        self.clock.now = 59
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.now = 60
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.get_stats()['opened'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -496,6 +496,40 @@ class TestASPICExport(unittest.TestCase):
 
         self.assertFalse(dbas_discussion1.is_equivalent_to(dbas_discussion2))
 
+    def test_fingerprint(self):
+        dbas_discussion1 = DBASGraph(discussion_id=1)
+        dbas_discussion1.add_statement(1)
+        dbas_discussion1.add_statement(2)
+        dbas_discussion1.add_inference(inference_id=1, premises=[2], conclusion=1, is_supportive=True)
+        dbas_discussion1.add_inference(inference_id=2, premises=[1], conclusion=2, is_supportive=False)
+
+        dbas_discussion2 = DBASGraph(discussion_id=1)
+        dbas_discussion2.statements = {2, 1}
+        dbas_discussion2.inferences = {
+            2: Inference(2, [1], 2, False),
+            1: Inference(1, [2], 1, True),
+        }
+        self.assertEqual(dbas_discussion1.fingerprint(), dbas_discussion2.fingerprint())
+
+        dbas_discussion2.add_undercut(inference_id=3, premises=[2], conclusion=2)
+        self.assertNotEqual(dbas_discussion1.fingerprint(), dbas_discussion2.fingerprint())
+        self.assertNotEqual(dbas_discussion1.fingerprint(), DBASGraph(discussion_id=2).fingerprint())
+
+    def test_copy(self):
+        dbas_discussion = DBASGraph(discussion_id=1)
+        dbas_discussion.statements = {1, 2}
+        dbas_discussion.inferences = {1: Inference(1, [2], 1, True)}
+
+        dbas_discussion_copy = dbas_discussion.copy()
+        self.assertTrue(dbas_discussion.is_equivalent_to(dbas_discussion_copy))
+
+        dbas_discussion_copy.add_statement(3)
+        dbas_discussion_copy.add_inference(inference_id=2, premises=[3], conclusion=1, is_supportive=False)
+        dbas_discussion_copy.add_undercut(inference_id=3, premises=[3], conclusion=1)
+        self.assertEqual(dbas_discussion.statements, {1, 2})
+        self.assertEqual(set(dbas_discussion.inferences.keys()), {1})
+        self.assertEqual(dbas_discussion.undercuts, {})
+
 
 if __name__ == '__main__':
     unittest.main()
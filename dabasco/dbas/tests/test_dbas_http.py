@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import unittest
+import threading
+import time
+import urllib.error
+import gzip
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dabasco.dbas.dbas_http import DBASConnectionPoolManager
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        if self.path.startswith('/missing'):
+            body = b'not found'
+            self.send_response(404)
+        else:
+            body = ('"' + self.path + '"').encode('utf-8')
+            self.send_response(200)
+        accept_encoding = self.headers.get('Accept-Encoding', '')
+        if self.path.startswith('/large'):
+            body = b'[' + b','.join([b'{"uid": 1}'] * 100000) + b']'
+        if self.path.endswith('/raw') and 'deflate' in accept_encoding:
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            self.send_header('Content-Encoding', 'deflate')
+        elif 'gzip' in accept_encoding:
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDBASConnectionPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.pools = DBASConnectionPoolManager(maxsize=2)
+
+    def tearDown(self):
+        self.pools.clear()
+
+    def test_keep_alive_reuse(self):
+        for discussion_id in range(3):
+            response = self.pools.get(self.base_url + '/export/doj/{}'.format(discussion_id))
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.body, '"/export/doj/{}"'.format(discussion_id).encode('utf-8'))
+
+        stats = self.pools.get_stats()[self.base_url]
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['connections_reused'], 2)
+        self.assertEqual(stats['idle_connections'], 1)
+
+    def test_stream(self):
+        response = self.pools.get(self.base_url + '/export/doj/1', stream=True)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(self.pools.get_stats()[self.base_url]['idle_connections'], 0)
+        self.assertEqual(b''.join(response.body), b'"/export/doj/1"')
+
+        # The connection is released once the body is read completely
+        stats = self.pools.get_stats()[self.base_url]
+        self.assertEqual(stats['idle_connections'], 1)
+        self.assertEqual(stats['connections_discarded'], 0)
+
+    def test_stream_aborted(self):
+        response = self.pools.get(self.base_url + '/export/doj/1', stream=True)
+        next(iter(response.body))
+        response.body.close()
+        stats = self.pools.get_stats()[self.base_url]
+        self.assertEqual(stats['idle_connections'], 0)
+        self.assertEqual(stats['connections_discarded'], 1)
+
+    def test_compressed_transfer(self):
+        pools = DBASConnectionPoolManager(maxsize=2, accept_encoding=True)
+        response = pools.get(self.base_url + '/export/doj/1')
+        self.assertEqual(response.body, b'"/export/doj/1"')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        response = pools.get(self.base_url + '/export/doj/1/raw')
+        self.assertEqual(response.body, b'"/export/doj/1/raw"')
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+
+        response = pools.get(self.base_url + '/large', stream=True)
+        self.assertEqual(b''.join(response.body), b'[' + b','.join([b'{"uid": 1}'] * 100000) + b']')
+
+        stats = pools.get_stats()[self.base_url]
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['idle_connections'], 1)
+        self.assertLess(stats['bytes_received'] * 50, stats['bytes_decoded'])
+        pools.clear()
+
+        # Without accept_encoding, the server does not compress
+        response = self.pools.get(self.base_url + '/export/doj/1')
+        self.assertEqual(response.body, b'"/export/doj/1"')
+        stats = self.pools.get_stats()[self.base_url]
+        self.assertEqual(stats['bytes_received'], stats['bytes_decoded'])
+
+    def test_query_string(self):
+        response = self.pools.get(self.base_url + '/api/v2/query?q=%7B%7D')
+        self.assertEqual(response.body, b'"/api/v2/query?q=%7B%7D"')
+
+    def test_one_pool_per_host(self):
+        pool1 = self.pools.connection_pool_for_url(self.base_url + '/a')
+        pool2 = self.pools.connection_pool_for_url(self.base_url + '/b')
+        pool3 = self.pools.connection_pool_for_url('https://example.org/a')
+        self.assertIs(pool1, pool2)
+        self.assertIsNot(pool1, pool3)
+        self.assertEqual(pool3.port, 443)
+
+    def test_error_status(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.pools.get(self.base_url + '/missing')
+        self.assertEqual(context.exception.code, 404)
+
+    def test_pool_size_bounded(self):
+        pool = self.pools.connection_pool_for_url(self.base_url)
+        connections = [pool._get_connection()[0] for _ in range(4)]
+        for connection in connections:
+            pool._release_connection(connection)
+        stats = pool.get_stats()
+        self.assertEqual(stats['idle_connections'], 2)
+        self.assertEqual(stats['connections_discarded'], 2)
+
+    def test_concurrent_requests(self):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    self.pools.get(self.base_url + '/export/doj/1')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stats = self.pools.get_stats()[self.base_url]
+        self.assertEqual(stats['requests'], 20)
+        self.assertEqual(stats['connections_created'] + stats['connections_reused'], 20)
+        self.assertLessEqual(stats['idle_connections'], 2)
+
+    def test_read_timeout(self):
+        pools = DBASConnectionPoolManager(maxsize=2, connect_timeout=1, read_timeout=0.1)
+        with self.assertRaises(TimeoutError):
+            pools.get(self.base_url + '/slow')
+        stats = pools.get_stats()[self.base_url]
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['idle_connections'], 0)
+
+        # The connection is discarded, the next request uses a new one
+        response = pools.get(self.base_url + '/export/doj/1')
+        self.assertEqual(response.status, 200)
+        pools.clear()
+
+    def test_unsupported_scheme(self):
+        with self.assertRaises(ValueError):
+            self.pools.get('ftp://example.org/export')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 
 import unittest
+import json
 
 from dabasco.dbas.dbas_graph import DBASGraph, Inference, Undercut
 from dabasco.dbas.dbas_user import DBASUser
 from dabasco.dbas.dbas_import import import_dbas_user, import_dbas_graph, import_dbas_user_v2, import_dbas_graph_v2
+from dabasco.dbas.dbas_import import import_dbas_graph_v2_combined
+from dabasco.dbas.dbas_import import import_dbas_graph_stream, import_dbas_graph_v2_stream
+from dabasco.dbas.dbas_import import import_dbas_graph_v2_combined_stream, import_dbas_users_v2
+from dabasco.dbas.dbas_import import import_dbas_participants_v2
+from dabasco.dbas.dbas_import import DBASGraphImporter, import_dbas_graph_v2_delta, import_dbas_graph_v2_pages
 
 from os import path
 import logging.config
@@ -256,6 +262,215 @@ class TestASPICExport(unittest.TestCase):
 
         self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion))
 
+    def test_discussion2_apiv2_combined(self):
+        """Bigger discussion with undercut (Using API v2 with a combined statements and arguments query)"""
+        discussion_id = 2
+
+        dbas_graph_json = {
+            "issue": {
+                "statements": [
+                    {"uid": 1},
+                    {"uid": 2},
+                    {"uid": 3},
+                    {"uid": 4},
+                    {"uid": 5},
+                    {"uid": 6},
+                ],
+                "arguments": [
+                    {
+                        "uid": 1,
+                        "isSupportive": True,
+                        "conclusionUid": 1,
+                        "argumentUid": None,
+                        "premisegroup": {
+                            "premises": [
+                                {"statementUid": 2}
+                            ]
+                        }
+                    },
+                    {
+                        "uid": 2,
+                        "isSupportive": False,
+                        "conclusionUid": 1,
+                        "argumentUid": None,
+                        "premisegroup": {
+                            "premises": [
+                                {"statementUid": 3}
+                            ]
+                        }
+                    },
+                    {
+                        "uid": 3,
+                        "isSupportive": False,
+                        "conclusionUid": 2,
+                        "argumentUid": None,
+                        "premisegroup": {
+                            "premises": [
+                                {"statementUid": 4}
+                            ]
+                        }
+                    },
+                    {
+                        "uid": 4,
+                        "conclusionUid": None,
+                        "argumentUid": 2,
+                        "premisegroup": {
+                            "premises": [
+                                {"statementUid": 5}
+                            ]
+                        }
+                    },
+                ]
+            }
+        }
+
+        dbas_discussion = import_dbas_graph_v2_combined(discussion_id, dbas_graph_json)
+
+        dbas_discussion_reference = DBASGraph(discussion_id=discussion_id)
+        dbas_discussion_reference.statements = {1, 2, 3, 4, 5}
+        dbas_discussion_reference.inferences = {
+            1: Inference(1, [2], 1, True),
+            2: Inference(2, [3], 1, False),
+            3: Inference(3, [4], 2, False)
+        }
+        dbas_discussion_reference.undercuts = {
+            4: Undercut(4, [5], 2)
+        }
+
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion))
+
+    def test_discussion2_apiv2_stream(self):
+        """Bigger discussion with undercut (Using API v2 exports read in chunks)"""
+        discussion_id = 2
+
+        dbas_statements_json = {"issue": {"statements": [{"uid": 1}, {"uid": 2}, {"uid": 3}, {"uid": 4}]}}
+        dbas_arguments_json = {
+            "issue": {
+                "arguments": [
+                    {
+                        "uid": 1,
+                        "isSupportive": False,
+                        "conclusionUid": 1,
+                        "argumentUid": None,
+                        "premisegroup": {"premises": [{"statementUid": 2}]}
+                    },
+                    {
+                        "uid": 2,
+                        "conclusionUid": None,
+                        "argumentUid": 1,
+                        "premisegroup": {"premises": [{"statementUid": 3}]}
+                    },
+                ]
+            }
+        }
+        statements_text = json.dumps(dbas_statements_json)
+        arguments_text = json.dumps(dbas_arguments_json)
+        graph_text = json.dumps({"issue": dict(dbas_statements_json["issue"], **dbas_arguments_json["issue"])})
+
+        dbas_discussion = import_dbas_graph_v2_stream(discussion_id,
+                                                      [statements_text[i:i + 5] for i in range(0, 1000, 5)],
+                                                      [arguments_text[i:i + 5] for i in range(0, 1000, 5)])
+        dbas_discussion_combined = import_dbas_graph_v2_combined_stream(
+            discussion_id, [graph_text[i:i + 5] for i in range(0, 1000, 5)])
+
+        dbas_discussion_reference = DBASGraph(discussion_id=discussion_id)
+        dbas_discussion_reference.statements = {1, 2, 3}
+        dbas_discussion_reference.inferences = {
+            1: Inference(1, [2], 1, False),
+        }
+        dbas_discussion_reference.undercuts = {
+            2: Undercut(2, [3], 1)
+        }
+
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion))
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion_combined))
+
+    def test_discussion2_apiv2_pages(self):
+        """Bigger discussion with undercut (Using API v2 exports split into pages)"""
+        discussion_id = 2
+
+        statements_pages = [
+            {"issue": {"statements": [{"uid": 1}, {"uid": 2}]}},
+            {"issue": {"statements": [{"uid": 3}, {"uid": 4}]}},
+            {"issue": {"statements": []}},
+        ]
+        arguments_pages = [
+            {"issue": {"arguments": [{
+                "uid": 1,
+                "isSupportive": False,
+                "conclusionUid": 1,
+                "argumentUid": None,
+                "premisegroup": {"premises": [{"statementUid": 2}]}
+            }]}},
+            {"issue": {"arguments": [{
+                "uid": 2,
+                "conclusionUid": None,
+                "argumentUid": 1,
+                "premisegroup": {"premises": [{"statementUid": 3}]}
+            }]}},
+        ]
+
+        dbas_discussion = import_dbas_graph_v2_pages(discussion_id, iter(statements_pages), iter(arguments_pages))
+
+        dbas_discussion_reference = DBASGraph(discussion_id=discussion_id)
+        dbas_discussion_reference.statements = {1, 2, 3}
+        dbas_discussion_reference.inferences = {
+            1: Inference(1, [2], 1, False),
+        }
+        dbas_discussion_reference.undercuts = {
+            2: Undercut(2, [3], 1)
+        }
+
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion))
+
+    def test_discussion2_apiv2_delta(self):
+        """Bigger discussion with undercut, imported in two steps (Using API v2)"""
+        discussion_id = 2
+
+        def argument_json(uid, premise, conclusion=None, argument=None, is_supportive=False):
+            return {"uid": uid, "isSupportive": is_supportive, "conclusionUid": conclusion, "argumentUid": argument,
+                    "premisegroup": {"premises": [{"statementUid": premise}]}}
+
+        # Statement 3 is not used before the second step
+        importer = DBASGraphImporter(discussion_id)
+        imported_items = import_dbas_graph_v2_delta(
+            importer,
+            {"issue": {"statements": [{"uid": 1}, {"uid": 2}, {"uid": 3}]}},
+            {"issue": {"arguments": [argument_json(1, 2, conclusion=1)]}})
+        self.assertEqual(imported_items, 4)
+        self.assertEqual(importer.graph.statements, {1, 2})
+        self.assertEqual((importer.max_statement_uid, importer.max_argument_uid), (3, 1))
+        dbas_discussion_step1 = importer.graph
+
+        # Items that were already imported are skipped
+        importer = importer.copy()
+        imported_items = import_dbas_graph_v2_delta(
+            importer,
+            {"issue": {"statements": [{"uid": 3}, {"uid": 4}]}},
+            {"issue": {"arguments": [argument_json(1, 2, conclusion=1), argument_json(2, 3, argument=1),
+                                     argument_json(3, 4, conclusion=2, is_supportive=True)]}})
+        self.assertEqual(imported_items, 3)
+
+        dbas_discussion_reference = DBASGraph(discussion_id=discussion_id)
+        dbas_discussion_reference.statements = {1, 2, 3, 4}
+        dbas_discussion_reference.inferences = {
+            1: Inference(1, [2], 1, False),
+            3: Inference(3, [4], 2, True),
+        }
+        dbas_discussion_reference.undercuts = {
+            2: Undercut(2, [3], 1)
+        }
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(importer.graph))
+
+        # The graph of the first step is not modified
+        self.assertEqual(dbas_discussion_step1.statements, {1, 2})
+        self.assertEqual(len(dbas_discussion_step1.inferences), 1)
+        self.assertEqual(len(dbas_discussion_step1.undercuts), 0)
+
+        # Nothing new
+        self.assertEqual(import_dbas_graph_v2_delta(importer.copy(), {"issue": {"statements": []}},
+                                                    {"issue": {"arguments": []}}), 0)
+
     def test_discussion1_user1_apiv2(self):
         discussion_id = 1
         user_id = 1
@@ -281,6 +496,45 @@ class TestASPICExport(unittest.TestCase):
 
         self.assertTrue(dbas_user_reference.is_equivalent_to(dbas_user))
 
+    def test_discussion1_users_apiv2(self):
+        discussion_id = 1
+
+        dbas_users_json = {
+            "user1": {
+                "clickedStatements": [
+                    {"statementUid": 2, "isUpVote": True},
+                    {"statementUid": 3, "isUpVote": False},
+                ]
+            },
+            "user2": None,
+        }
+
+        dbas_users = import_dbas_users_v2(discussion_id=discussion_id, user_ids=[1, 2, 3], users_json=dbas_users_json)
+        self.assertEqual(set(dbas_users.keys()), {1, 2, 3})
+
+        dbas_user1_reference = DBASUser(discussion_id=discussion_id, user_id=1)
+        dbas_user1_reference.accepted_statements_explicit = {2}
+        dbas_user1_reference.rejected_statements_explicit = {3}
+        self.assertTrue(dbas_user1_reference.is_equivalent_to(dbas_users[1]))
+
+        # Unknown users have no opinion
+        self.assertTrue(DBASUser(discussion_id=discussion_id, user_id=2).is_equivalent_to(dbas_users[2]))
+        self.assertTrue(DBASUser(discussion_id=discussion_id, user_id=3).is_equivalent_to(dbas_users[3]))
+
+    def test_participants_apiv2(self):
+        dbas_participants_json = {
+            "issue": {
+                "statements": [
+                    {"clickedStatements": [{"authorUid": 3}, {"authorUid": 1}]},
+                    {"clickedStatements": []},
+                    {"clickedStatements": [{"authorUid": 1}, {"authorUid": 2}]},
+                ]
+            }
+        }
+        self.assertEqual(import_dbas_participants_v2(dbas_participants_json), [1, 2, 3])
+        self.assertEqual(import_dbas_participants_v2({"issue": {"statements": []}}), [])
+        self.assertEqual(import_dbas_participants_v2({"issue": None}), [])
+
     def test_discussion2_user2_apiv2(self):
         discussion_id = 2
         user_id = 2
@@ -419,6 +673,41 @@ class TestASPICExport(unittest.TestCase):
 
         self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion))
 
+    def test_discussion2_stream(self):
+        """Bigger discussion with undercut, from a string-encoded export read in chunks."""
+        discussion_id = 2
+
+        dbas_discussion_json = {
+            "inferences": [
+                {"conclusion": 1, "id": 1, "is_supportive": True, "premises": [2]},
+                {"conclusion": 1, "id": 2, "is_supportive": False, "premises": [3]},
+                {"conclusion": 2, "id": 3, "is_supportive": False, "premises": [4]}
+            ],
+            "nodes": [1, 2, 3, 4, 5, 6],
+            "undercuts": [
+                {"conclusion": 2, "id": 4, "premises": [5]}
+            ]
+        }
+        export_text = json.dumps(json.dumps(dbas_discussion_json))
+        export_chunks = [export_text[i:i + 7] for i in range(0, len(export_text), 7)]
+
+        dbas_discussion = import_dbas_graph_stream(discussion_id, export_chunks)
+
+        dbas_discussion_reference = DBASGraph(discussion_id=discussion_id)
+        dbas_discussion_reference.statements = {1, 2, 3, 4, 5}
+        dbas_discussion_reference.inferences = {
+            1: Inference(1, [2], 1, True),
+            2: Inference(2, [3], 1, False),
+            3: Inference(3, [4], 2, False)
+        }
+        dbas_discussion_reference.undercuts = {
+            4: Undercut(4, [5], 2)
+        }
+
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(dbas_discussion))
+        self.assertTrue(dbas_discussion_reference.is_equivalent_to(
+            import_dbas_graph(discussion_id, dbas_discussion_json)))
+
     def test_discussion1_user1(self):
         discussion_id = 1
         user_id = 1
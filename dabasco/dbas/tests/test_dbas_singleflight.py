@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import unittest
+import threading
+import time
+
+from dabasco.dbas.dbas_singleflight import DBASSingleFlight
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class TestDBASSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.single_flight = DBASSingleFlight()
+        self.release = threading.Event()
+        self.calls = []
+
+    def slow_fetch(self, discussion_id):
+        self.calls.append(discussion_id)
+        self.release.wait(5)
+        if discussion_id < 0:
+            raise ValueError('invalid discussion')
+        return 'graph{}'.format(discussion_id)
+
+    def run_concurrently(self, keys_and_args):
+        results = [None] * len(keys_and_args)
+
+        def worker(index, key, arg):
+            try:
+                results[index] = self.single_flight.do(key, self.slow_fetch, arg)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=worker, args=(index, key, arg))
+                   for index, (key, arg) in enumerate(keys_and_args)]
+        for thread in threads:
+            thread.start()
+        # Release the fetch only after all callers have joined a flight
+        while sum(self.single_flight.get_stats()[key] for key in ('executed', 'coalesced')) < len(keys_and_args):
+            time.sleep(0.001)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesce_identical_calls(self):
+        results = self.run_concurrently([(('graph', 1), 1)] * 5)
+
+        self.assertEqual(results, ['graph1'] * 5)
+        self.assertEqual(self.calls, [1])
+        stats = self.single_flight.get_stats()
+        self.assertEqual(stats['executed'], 1)
+        self.assertEqual(stats['coalesced'], 4)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_distinct_keys(self):
+        results = self.run_concurrently([(('graph', 1), 1), (('graph', 2), 2), (('graph', 1), 1)])
+
+        self.assertEqual(results, ['graph1', 'graph2', 'graph1'])
+        self.assertEqual(sorted(self.calls), [1, 2])
+
+    def test_shared_error(self):
+        results = self.run_concurrently([(('graph', -1), -1)] * 3)
+
+        self.assertEqual(len(self.calls), 1)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+
+    def test_sequential_calls_not_coalesced(self):
+        self.release.set()
+        self.assertEqual(self.single_flight.do('key', self.slow_fetch, 1), 'graph1')
+        self.assertEqual(self.single_flight.do('key', self.slow_fetch, 1), 'graph1')
+        self.assertEqual(self.calls, [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from dabasco.dbas.dbas_snapshot import DBASSnapshotStore
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDBASSnapshotStore(unittest.TestCase):
+
+    url = 'http://dbas/export/doj/1'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.store = DBASSnapshotStore(self.directory, max_versions=2, clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        self.assertIsNone(self.store.latest(self.url))
+        self.store.save(self.url, b'{"nodes": [1]}', {'ETag': '"v1"'})
+
+        snapshot = self.store.latest(self.url)
+        self.assertEqual(snapshot.url, self.url)
+        self.assertEqual(snapshot.fetched_at, 1000.0)
+        self.assertEqual(snapshot.validators, {'ETag': '"v1"'})
+        self.assertEqual(self.store.read(snapshot), b'{"nodes": [1]}')
+        self.assertIsNone(self.store.latest('http://dbas/export/doj/2'))
+
+        # Snapshots are persisted across store instances
+        store = DBASSnapshotStore(self.directory)
+        self.assertEqual(store.read(store.latest(self.url)), b'{"nodes": [1]}')
+
+        stats = self.store.get_stats()
+        self.assertEqual(stats['saves'], 1)
+        self.assertEqual(stats['loads'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_versions(self):
+        for version in range(3):
+            self.clock.now += 1
+            self.store.save(self.url, '{}'.format(version).encode('utf-8'), {})
+        self.assertEqual(self.store.read(self.store.latest(self.url)), b'2')
+
+        # Only the newest versions are kept
+        url_directory, = os.listdir(self.directory)
+        self.assertEqual(len(os.listdir(path.join(self.directory, url_directory))), 4)
+
+    def test_tee(self):
+        chunks = [b'{"nodes": ', b'[1, 2]', b'}']
+        self.assertEqual(list(self.store.tee(self.url, iter(chunks), {'ETag': '"v1"'})), chunks)
+        self.assertEqual(self.store.read(self.store.latest(self.url)), b''.join(chunks))
+
+    def test_tee_aborted(self):
+        chunks = self.store.tee(self.url, iter([b'{"nodes": ', b'[1, 2]', b'}']), {})
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(self.store.latest(self.url))
+        url_directory, = os.listdir(self.directory)
+        self.assertEqual(os.listdir(path.join(self.directory, url_directory)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+
+from dabasco.dbas.dbas_stream import iter_json_array_items, iter_text
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestDBASStream(unittest.TestCase):
+
+    document = {
+        'nodes': [1, 2, 30000, -4.5e3],
+        'meta': {'title': 'quote " backslash \\ unicode é \U0001F600', 'nodes': [99]},
+        'inferences': [
+            {'id': 1, 'premises': [2], 'conclusion': 1, 'is_supportive': True},
+            {'id': 2, 'premises': [3, 4], 'conclusion': 1, 'is_supportive': False, 'text': '\\ud83d \\"'},
+        ],
+        'undercuts': [],
+    }
+    array_paths = [('nodes',), ('inferences',), ('undercuts',)]
+
+    def assert_items(self, text, chunk_size):
+        items = list(iter_json_array_items(chunked(text, chunk_size), self.array_paths))
+        self.assertEqual([item for p, item in items if p == ('nodes',)], self.document['nodes'])
+        self.assertEqual([item for p, item in items if p == ('inferences',)], self.document['inferences'])
+        self.assertEqual([item for p, item in items if p == ('undercuts',)], [])
+
+    def test_plain_document(self):
+        for chunk_size in (1, 2, 5, 1000):
+            self.assert_items(json.dumps(self.document), chunk_size)
+
+    def test_string_encoded_document(self):
+        for chunk_size in (1, 2, 5, 1000):
+            self.assert_items(json.dumps(json.dumps(self.document)), chunk_size)
+            self.assert_items(json.dumps(json.dumps(self.document), ensure_ascii=False), chunk_size)
+
+    def test_repeatedly_string_encoded_document(self):
+        for chunk_size in (1, 3, 1000):
+            self.assert_items(json.dumps(json.dumps(json.dumps(self.document))), chunk_size)
+
+    def test_nested_paths(self):
+        text = json.dumps({'issue': {'uid': 1, 'statements': [{'uid': 1}, {'uid': 2}], 'arguments': [{'uid': 3}]}})
+        items = list(iter_json_array_items(chunked(text, 4), [('issue', 'statements'), ('issue', 'arguments')]))
+        self.assertEqual(items, [(('issue', 'statements'), {'uid': 1}),
+                                 (('issue', 'statements'), {'uid': 2}),
+                                 (('issue', 'arguments'), {'uid': 3})])
+
+    def test_missing_and_null_paths(self):
+        self.assertEqual(list(iter_json_array_items(['{"issue": null}'], [('issue', 'statements')])), [])
+        self.assertEqual(list(iter_json_array_items(['{"other": [1]}'], [('issue', 'statements')])), [])
+
+    def test_invalid_document(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array_items(['{"nodes": [1, 2'], [('nodes',)]))
+        with self.assertRaises(ValueError):
+            list(iter_json_array_items(['"{\\"nodes\\": [1]}'], [('nodes',)]))
+        with self.assertRaises(ValueError):
+            list(iter_json_array_items(['{"nodes": [1]} {}'], [('nodes',)]))
+
+    def test_iter_text(self):
+        data = '{"title": "é\U0001F600"}'.encode('utf-8')
+        text = ''.join(iter_text([data[i:i + 1] for i in range(len(data))]))
+        self.assertEqual(text, '{"title": "é\U0001F600"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -475,6 +475,21 @@ class TestASPICExport(unittest.TestCase):
         self.assertEquals(result_accepted, reference_accepted)
         self.assertEquals(result_rejected, reference_rejected)
 
+    def test_opinion_fingerprint(self):
+        user1 = DBASUser(discussion_id=1, user_id=1)
+        user1.accepted_statements_explicit = {1, 2}
+        user1.rejected_statements_implicit = {3}
+
+        # Same effective opinion
+        user2 = DBASUser(discussion_id=1, user_id=1)
+        user2.accepted_statements_explicit = {2}
+        user2.accepted_statements_implicit = {1}
+        user2.rejected_statements_explicit = {3}
+        self.assertEqual(user1.opinion_fingerprint(), user2.opinion_fingerprint())
+
+        user2.rejected_statements_explicit = {2, 3}
+        self.assertNotEqual(user1.opinion_fingerprint(), user2.opinion_fingerprint())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,207 @@
+from config import *
+
+from server.json_codec import JSONCodec
+
+import adf.import_strass as adf_import_strass
+import adf.export_diamond as adf_export_diamond
+
+import af.import_wyner as af_import_wyner
+import af.export_aspartix as af_export_aspartix
+
+import aspic.export_toast as aspic_export_toast
+
+import logging
+logger = logging.getLogger('root')
+
+# JSON codecs of the worker processes, by backend
+json_codecs = {}
+
+
+def create_toast_result(discussion, user, opinion_strict, dbas_graph, dbas_user):
+    """
+    Create a TOAST-formatted graph representation for given user's opinion.
+
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID
+    :type user: int
+    :param opinion_strict: indicate whether assumptions shall be implemented as strict (1), defeasible (0), or weak (-1)
+    :type opinion_strict: int
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user
+    :type dbas_user: DBASUser
+    :return: dict
+    """
+    logging.debug('Create TOAST representation from D-BAS graph...')
+
+    assumptions_type = None
+    assumptions_bias = None
+
+    # Pass through opinion strength
+    opinion_type = DABASCO_INPUT_KEYWORD_OPINION_STRONG
+    if opinion_strict == 1:
+        opinion_type = DABASCO_INPUT_KEYWORD_OPINION_STRICT
+    elif opinion_strict == -1:
+        opinion_type = DABASCO_INPUT_KEYWORD_OPINION_WEAK
+
+    # Set a default semantics
+    semantics = TOAST_KEYWORD_SEMANTICS_PREFERRED  # Default semantics
+
+    # Get assumptions and inference rules from D-BAS data
+    return aspic_export_toast.export_toast(dbas_graph,
+                                           opinion_type,
+                                           dbas_user,
+                                           assumptions_type,
+                                           assumptions_bias,
+                                           semantics)
+
+
+def create_adf_output(opinion_strict, dbas_graph, dbas_user):
+    """
+    Create an ADF for the given user's opinion and get its YADF/QADF/DIAMOND-formatted representation in parts.
+
+    :param opinion_strict: indicate whether assumptions shall be implemented as strict or defeasible
+    :type opinion_strict: int
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: iterator of str
+    """
+    logging.debug('Create ADF from D-BAS graph...')
+
+    # Create ADF
+    adf = adf_import_strass.import_adf(dbas_graph, dbas_user, opinion_strict=bool(opinion_strict))
+
+    # Convert to DIAMOND/YADF formatted string
+    return adf_export_diamond.iter_diamond(adf)
+
+
+def create_adf_result(discussion, user, opinion_strict, dbas_graph, dbas_user):
+    """
+    Create a YADF/QADF/DIAMOND-formatted ADF representation for given user's opinion.
+
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID
+    :type user: int
+    :param opinion_strict: indicate whether assumptions shall be implemented as strict or defeasible
+    :type opinion_strict: int
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: dict
+    """
+    str_output = ''.join(create_adf_output(opinion_strict, dbas_graph, dbas_user))
+    result = {DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID: discussion,
+              DABASCO_OUTPUT_KEYWORD_ADF: str_output}
+    if user:
+        result[DABASCO_OUTPUT_KEYWORD_USER_ID] = user
+    return result
+
+
+def create_af_output(opinion_strict, dbas_graph, dbas_user):
+    """
+    Create a Dung-style AF for the given discussion and get its ASPARTIX-formatted representation in parts.
+
+    :param opinion_strict: indicate whether user opinion shall be implemented as strict or defeasible rules
+    :type opinion_strict: int
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: iterator of str
+    """
+    logging.debug('Create AF from D-BAS graph...')
+
+    # Create AF
+    af = af_import_wyner.import_af_wyner(dbas_graph, dbas_user, opinion_strict=bool(opinion_strict))
+
+    logging.debug(str(af.name_for_argument))
+    logging.debug(str(af.argument_for_name))
+
+    # Create output text format
+    return af_export_aspartix.iter_aspartix(af)
+
+
+def create_af_result(discussion, user, opinion_strict, dbas_graph, dbas_user):
+    """
+    Create a Dung-style argumentation graph representation for the given discussion.
+
+    :param discussion: discussion ID
+    :type discussion: int
+    :param user: user ID
+    :type user: int
+    :param opinion_strict: indicate whether user opinion shall be implemented as strict or defeasible rules
+    :type opinion_strict: int
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :return: dict
+    """
+    str_output = ''.join(create_af_output(opinion_strict, dbas_graph, dbas_user))
+    result = {DABASCO_OUTPUT_KEYWORD_DISCUSSION_ID: discussion,
+              DABASCO_OUTPUT_KEYWORD_AF: str_output}
+    if user:
+        result[DABASCO_OUTPUT_KEYWORD_USER_ID] = user
+    return result
+
+
+# Result builders of the evaluation routes
+evaluation_results = {
+    'toastify': create_toast_result,
+    'adfify': create_adf_result,
+    'dungify': create_af_result,
+}
+
+# Output keywords and output builders of the evaluation routes that can stream their results
+evaluation_outputs = {
+    'adfify': (DABASCO_OUTPUT_KEYWORD_ADF, create_adf_output),
+    'dungify': (DABASCO_OUTPUT_KEYWORD_AF, create_af_output),
+}
+
+
+def create_encoded_result(evaluation_key, dbas_graph, dbas_user, json_codec):
+    """
+    Create the encoded result for the given key (or, in the raw format, the UTF-8 encoded output string of the result).
+
+    :param evaluation_key: key as returned by get_evaluation_key() of the app
+    :type evaluation_key: tuple
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :param json_codec: encoder of the result
+    :type json_codec: JSONCodec
+    :return: bytes
+    """
+    mode, discussion, user, opinion_strict = evaluation_key[:4]
+    if evaluation_key[6] == DABASCO_OUTPUT_FORMAT_RAW:
+        _, create_output = evaluation_outputs[mode]
+        return ''.join(create_output(opinion_strict, dbas_graph, dbas_user)).encode('utf-8')
+    return json_codec.encode(evaluation_results[mode](discussion, user, opinion_strict, dbas_graph, dbas_user))
+
+
+def create_encoded_results(evaluation_keys, dbas_graph, dbas_user, json_backend):
+    """
+    Create the encoded results for the given keys, as a task of a worker process. The task only needs this module and
+    the packages it imports, not the app.
+
+    :param evaluation_keys: keys as returned by get_evaluation_key() of the app
+    :type evaluation_keys: list
+    :param dbas_graph: graph of the discussion
+    :type dbas_graph: DBASGraph
+    :param dbas_user: opinion of the user, or None
+    :type dbas_user: DBASUser
+    :param json_backend: JSON backend of the app
+    :type json_backend: str
+    :return: list of bytes, in the order of the keys
+    """
+    json_codec = json_codecs.get(json_backend)
+    if json_codec is None:
+        json_codec = json_codecs[json_backend] = JSONCodec(json_backend)
+    return [create_encoded_result(evaluation_key, dbas_graph, dbas_user, json_codec)
+            for evaluation_key in evaluation_keys]
@@ -0,0 +1,148 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import logging
+logger = logging.getLogger('root')
+
+CONTENT_ENCODING_BROTLI = 'br'
+CONTENT_ENCODING_ZSTD = 'zstd'
+CONTENT_ENCODING_GZIP = 'gzip'
+
+
+def get_available_encodings():
+    """
+    Get the content encodings that can be created with the installed packages.
+
+    :return: set of str
+    """
+    encodings = {CONTENT_ENCODING_GZIP}
+    if brotli is not None:
+        encodings.add(CONTENT_ENCODING_BROTLI)
+    if zstandard is not None:
+        encodings.add(CONTENT_ENCODING_ZSTD)
+    return encodings
+
+
+def parse_accept_encoding(header):
+    """
+    Parse the value of an Accept-Encoding header.
+
+    :param header: header value, e.g. 'gzip;q=0.8, br'
+    :type header: str
+    :return: dict of (lower case) content coding and quality value
+    """
+    qualities = {}
+    for item in (header or '').split(','):
+        coding, _, parameters = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for parameter in parameters.split(';'):
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+class ResponseCompressor(object):
+    """
+    Compressor of dabasco responses, negotiating the content encoding with the Accept-Encoding header of the client.
+    Brotli and Zstandard are only used if the optional packages brotli and zstandard are installed.
+
+    Attributes:
+          encodings (list): content encodings in order of preference, restricted to the available ones.
+          level (int): compression level, clamped to the range of each encoding.
+          min_size (int): min. number of bytes of a response to compress it.
+    """
+
+    def __init__(self, encodings=(CONTENT_ENCODING_GZIP,), level=6, min_size=1024):
+        available_encodings = get_available_encodings()
+        self.encodings = [encoding for encoding in encodings if encoding in available_encodings]
+        unavailable_encodings = [encoding for encoding in encodings if encoding not in available_encodings]
+        if unavailable_encodings:
+            logging.info('Response compression not available: %s', ', '.join(unavailable_encodings))
+        self.level = level
+        self.min_size = min_size
+
+    def negotiate(self, accept_encoding):
+        """
+        Choose the content encoding of a response: the encoding with the highest quality value for the client, the
+        most preferred one of those on a tie.
+
+        :param accept_encoding: value of the Accept-Encoding header of the request, or None
+        :type accept_encoding: str
+        :return: str, or None to send the response uncompressed
+        """
+        qualities = parse_accept_encoding(accept_encoding)
+        best_encoding = None
+        best_quality = 0.0
+        for encoding in self.encodings:
+            quality = qualities.get(encoding, qualities.get('*', 0.0))
+            if quality > best_quality:
+                best_encoding = encoding
+                best_quality = quality
+        return best_encoding
+
+    def should_compress(self, body):
+        return len(body) >= self.min_size
+
+    def compress(self, body, encoding):
+        """
+        Compress the given response body.
+
+        :param body: response body
+        :type body: bytes
+        :param encoding: content encoding, one of encodings
+        :type encoding: str
+        :return: bytes
+        """
+        if encoding == CONTENT_ENCODING_GZIP:
+            return gzip.compress(body, compresslevel=min(max(self.level, 1), 9), mtime=0)
+        if encoding == CONTENT_ENCODING_BROTLI:
+            return brotli.compress(body, quality=min(max(self.level, 0), 11))
+        if encoding == CONTENT_ENCODING_ZSTD:
+            return zstandard.ZstdCompressor(level=min(max(self.level, 1), 22)).compress(body)
+        raise ValueError('Unknown content encoding: {}'.format(encoding))
+
+    def compress_stream(self, chunks, encoding):
+        """
+        Compress the given response body while it is created.
+
+        :param chunks: parts of the response body
+        :type chunks: iterable of bytes
+        :param encoding: content encoding, one of encodings
+        :type encoding: str
+        :return: iterator of bytes
+        """
+        if encoding == CONTENT_ENCODING_GZIP:
+            compressor = zlib.compressobj(min(max(self.level, 1), 9), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress, finish = compressor.compress, compressor.flush
+        elif encoding == CONTENT_ENCODING_BROTLI:
+            compressor = brotli.Compressor(quality=min(max(self.level, 0), 11))
+            compress, finish = compressor.process, compressor.finish
+        elif encoding == CONTENT_ENCODING_ZSTD:
+            compressor = zstandard.ZstdCompressor(level=min(max(self.level, 1), 22)).compressobj()
+            compress, finish = compressor.compress, compressor.flush
+        else:
+            raise ValueError('Unknown content encoding: {}'.format(encoding))
+
+        for chunk in chunks:
+            compressed_chunk = compress(chunk)
+            if compressed_chunk:
+                yield compressed_chunk
+        yield finish()
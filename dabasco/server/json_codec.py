@@ -0,0 +1,71 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import logging
+logger = logging.getLogger('root')
+
+JSON_BACKEND_AUTO = 'auto'
+JSON_BACKEND_ORJSON = 'orjson'
+JSON_BACKEND_STDLIB = 'json'
+
+
+class JSONCodec(object):
+    """
+    JSON decoder for D-BAS exports and encoder for dabasco results, backed by orjson if it is installed and by the
+    json module of the standard library otherwise.
+
+    Attributes:
+          backend (str): name of the backend in use, either 'orjson' or 'json'.
+          max_string_encodings (int): maximum number of times a decoded document may be wrapped in JSON strings.
+    """
+
+    def __init__(self, backend=JSON_BACKEND_AUTO, max_string_encodings=1):
+        if backend == JSON_BACKEND_AUTO:
+            backend = JSON_BACKEND_ORJSON if orjson is not None else JSON_BACKEND_STDLIB
+        if backend == JSON_BACKEND_ORJSON and orjson is None:
+            raise ValueError('JSON backend orjson is not installed')
+        if backend not in (JSON_BACKEND_ORJSON, JSON_BACKEND_STDLIB):
+            raise ValueError('Unknown JSON backend: {}'.format(backend))
+        self.backend = backend
+        self.max_string_encodings = max_string_encodings
+
+    def _loads(self, data):
+        if self.backend == JSON_BACKEND_ORJSON:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def decode(self, data):
+        """
+        Decode the given JSON document. A document that is encoded as a JSON string (as the D-BAS API v1 export) is
+        unwrapped, up to max_string_encodings times.
+
+        :param data: JSON document
+        :type data: bytes or str
+        :return: decoded data
+        :raises ValueError: if the document is not valid JSON, or still a string after unwrapping
+        """
+        value = self._loads(data)
+        for _ in range(self.max_string_encodings):
+            if not isinstance(value, str):
+                break
+            value = self._loads(value)
+        if isinstance(value, str):
+            raise ValueError('JSON document is encoded as a string more than {} time(s)'
+                             .format(self.max_string_encodings))
+        return value
+
+    def encode(self, data):
+        """
+        Encode the given data as compact, UTF-8 encoded JSON with sorted keys and a trailing newline.
+
+        :param data: data to encode
+        :return: bytes
+        """
+        if self.backend == JSON_BACKEND_ORJSON:
+            return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS |
+                                orjson.OPT_APPEND_NEWLINE)
+        return (json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False) + '\n').encode('utf-8')
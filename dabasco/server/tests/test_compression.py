@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import unittest
+import gzip
+
+from dabasco.server.compression import ResponseCompressor, parse_accept_encoding, brotli, zstandard
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class TestResponseCompressor(unittest.TestCase):
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, Deflate;q=0.5 ,br;q=0, zstd;q=x'),
+                         {'gzip': 1.0, 'deflate': 0.5, 'br': 0.0, 'zstd': 0.0})
+        self.assertEqual(parse_accept_encoding(''), {})
+        self.assertEqual(parse_accept_encoding(None), {})
+
+    def test_negotiate(self):
+        compressor = ResponseCompressor(['br', 'zstd', 'gzip'])
+        self.assertEqual(compressor.negotiate('gzip'), 'gzip')
+        self.assertEqual(compressor.negotiate('deflate, *;q=0.5'), compressor.encodings[0])
+        self.assertNotEqual(compressor.negotiate('gzip;q=0, *'), 'gzip')
+        self.assertIsNone(compressor.negotiate('gzip;q=0'))
+        self.assertIsNone(compressor.negotiate('deflate'))
+        self.assertIsNone(compressor.negotiate(None))
+        if brotli is not None:
+            self.assertEqual(compressor.negotiate('gzip, br'), 'br')
+            self.assertEqual(compressor.negotiate('gzip, br;q=0.5'), 'gzip')
+        else:
+            self.assertNotIn('br', compressor.encodings)
+            self.assertEqual(compressor.negotiate('gzip, br'), 'gzip')
+        if zstandard is None:
+            self.assertNotIn('zstd', compressor.encodings)
+
+        self.assertIsNone(ResponseCompressor([]).negotiate('gzip, br, zstd'))
+
+    def test_compress(self):
+        compressor = ResponseCompressor(['gzip'], level=6, min_size=100)
+        body = b'{"af":"' + b'att(s1,ns1).\n' * 1000 + b'"}\n'
+        self.assertTrue(compressor.should_compress(body))
+        self.assertFalse(compressor.should_compress(b'{}\n'))
+
+        compressed_body = compressor.compress(body, 'gzip')
+        self.assertLess(len(compressed_body), len(body))
+        self.assertEqual(gzip.decompress(compressed_body), body)
+        # Compressed results are tagged with a strong ETag, so compression must be deterministic
+        self.assertEqual(compressor.compress(body, 'gzip'), compressed_body)
+
+        with self.assertRaises(ValueError):
+            compressor.compress(body, 'compress')
+
+    def test_compress_stream(self):
+        compressor = ResponseCompressor(['gzip'], level=6)
+        chunks = [b'{"af":"', b'att(s1,ns1).\n' * 1000, b'arg(s1).\n' * 1000, b'"}\n']
+        compressed_body = b''.join(compressor.compress_stream(iter(chunks), 'gzip'))
+        self.assertEqual(gzip.decompress(compressed_body), b''.join(chunks))
+        self.assertEqual(gzip.decompress(b''.join(compressor.compress_stream([], 'gzip'))), b'')
+
+        with self.assertRaises(ValueError):
+            list(compressor.compress_stream(chunks, 'compress'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+
+from dabasco.server.json_codec import JSONCodec, orjson
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class TestJSONCodec(unittest.TestCase):
+
+    def check_codec(self, codec):
+        data = {'nodes': [1, 2, 3], 'inferences': [{'id': 1, 'is_supportive': True, 'premises': [2]}]}
+        self.assertEqual(codec.decode(json.dumps(data).encode('utf-8')), data)
+        self.assertEqual(codec.decode(json.dumps(data)), data)
+
+        # String-encoded document (D-BAS API v1 export)
+        self.assertEqual(codec.decode(json.dumps(json.dumps(data)).encode('utf-8')), data)
+        with self.assertRaises(ValueError):
+            codec.decode(json.dumps(json.dumps(json.dumps(data))))
+        with self.assertRaises(ValueError):
+            codec.decode(b'{"nodes": [1, 2')
+
+        result = {'dbas_discussion_id': 2, 'af': 'arg(s1).\narg(ns1).\natt(s1,ns1).\n', 'label': 'ä'}
+        encoded = codec.encode(result)
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(encoded, json.dumps(result, sort_keys=True, separators=(',', ':'),
+                                             ensure_ascii=False).encode('utf-8') + b'\n')
+        self.assertEqual(codec.decode(encoded), result)
+
+    def test_stdlib(self):
+        codec = JSONCodec('json')
+        self.assertEqual(codec.backend, 'json')
+        self.check_codec(codec)
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson(self):
+        codec = JSONCodec('orjson')
+        self.assertEqual(codec.backend, 'orjson')
+        self.check_codec(codec)
+
+    def test_auto(self):
+        codec = JSONCodec()
+        self.assertEqual(codec.backend, 'json' if orjson is None else 'orjson')
+
+    def test_max_string_encodings(self):
+        codec = JSONCodec('json', max_string_encodings=2)
+        self.assertEqual(codec.decode(json.dumps(json.dumps(json.dumps([1, 2])))), [1, 2])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            JSONCodec('yaml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import unittest
+import shutil
+import tempfile
+import threading
+
+from dabasco.server.warmup import RequestCounter, Warmup
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+
+class TestRequestCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = path.join(self.directory, 'request_counts.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_most_requested(self):
+        counter = RequestCounter()
+        for discussion_id in [1, 2, 2, 3, 3, 3]:
+            counter.record(discussion_id)
+        self.assertEqual(counter.most_requested(2), [3, 2])
+        self.assertEqual(counter.most_requested(5), [3, 2, 1])
+
+    def test_save_and_load(self):
+        counter = RequestCounter({1: 1, 2: 4, 3: 10})
+        counter.save(self.file_path)
+
+        # Counts of the previous run are halved
+        loaded_counter = RequestCounter.load(self.file_path)
+        self.assertEqual(loaded_counter.counts, {2: 2, 3: 5})
+        self.assertEqual(loaded_counter.most_requested(1), [3])
+
+    def test_load_missing_or_invalid(self):
+        self.assertEqual(RequestCounter.load(self.file_path).counts, {})
+        with open(self.file_path, 'w') as counts_file:
+            counts_file.write('[1, 2')
+        self.assertEqual(RequestCounter.load(self.file_path).counts, {})
+
+
+class TestWarmup(unittest.TestCase):
+
+    def test_warmup(self):
+        loaded = []
+        release = threading.Event()
+
+        def load(discussion_id):
+            release.wait()
+            if discussion_id == 3:
+                raise ValueError('Unknown discussion')
+            loaded.append(discussion_id)
+
+        warmup = Warmup(load, [1, 2, 3, 2], threads=2)
+        warmup.start()
+        self.assertFalse(warmup.is_ready())
+        release.set()
+        self.assertTrue(warmup.wait(5))
+
+        self.assertEqual(sorted(loaded), [1, 2])
+        stats = warmup.get_stats()
+        self.assertEqual(stats['discussions'], 3)
+        self.assertEqual(stats['loaded'], 2)
+        self.assertEqual(stats['failed'], 1)
+        self.assertTrue(stats['ready'])
+
+    def test_empty(self):
+        warmup = Warmup(None, [], threads=2)
+        warmup.start()
+        self.assertTrue(warmup.is_ready())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import collections
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+logger = logging.getLogger('root')
+
+
+class RequestCounter(object):
+    """
+    Thread-safe counter of requests per discussion, persisted between runs to find the discussions to warm up.
+
+    Counts loaded from a previous run are halved, so that discussions that are no longer requested fade out.
+
+    Attributes:
+          counts (collections.Counter): number of requests per discussion ID.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = collections.Counter(counts or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Load the request counts of a previous run from the given file.
+
+        :param file_path: path of a file written by save()
+        :type file_path: str
+        :return: RequestCounter, empty if the file does not exist or cannot be read
+        """
+        try:
+            with open(file_path, encoding='utf-8') as counts_file:
+                counts = json.load(counts_file)
+            return cls({int(discussion_id): count // 2 for discussion_id, count in counts.items() if count // 2 > 0})
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning('Cannot read discussion request counts from %s: %s', file_path, e)
+            return cls()
+
+    def record(self, discussion_id):
+        with self._lock:
+            self.counts[discussion_id] += 1
+
+    def most_requested(self, n):
+        """
+        Get the IDs of the n most requested discussions.
+
+        :param n: number of discussions
+        :type n: int
+        :return: list of discussion IDs, most requested first
+        """
+        with self._lock:
+            return [discussion_id for discussion_id, _ in self.counts.most_common(n)]
+
+    def save(self, file_path):
+        """
+        Write the request counts to the given file.
+
+        :param file_path: path of the file
+        :type file_path: str
+        """
+        with self._lock:
+            counts = {str(discussion_id): count for discussion_id, count in self.counts.items()}
+        temporary_path = file_path + '.tmp'
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as counts_file:
+                json.dump(counts, counts_file)
+            os.replace(temporary_path, file_path)
+        except OSError as e:
+            logging.warning('Cannot write discussion request counts to %s: %s', file_path, e)
+
+
+class Warmup(object):
+    """
+    Load a list of discussions on background workers, e.g. to fill the caches after a restart.
+
+    Attributes:
+          discussion_ids (list): IDs of the discussions to load.
+          stats (dict): counters for loaded and failed discussions.
+    """
+
+    def __init__(self, load_function, discussion_ids, threads):
+        self.discussion_ids = list(dict.fromkeys(discussion_ids))
+        self.stats = {
+            'discussions': len(self.discussion_ids),
+            'loaded': 0,
+            'failed': 0,
+        }
+        self._load_function = load_function
+        self._threads = max(threads, 1)
+        self._done = threading.Event()
+        self._pending = len(self.discussion_ids)
+        self._lock = threading.Lock()
+        if not self.discussion_ids:
+            self._done.set()
+
+    def start(self):
+        """
+        Start loading all discussions in the background.
+        """
+        if not self.discussion_ids:
+            return
+        logging.info('Warm up %s discussion(s)', len(self.discussion_ids))
+        executor = ThreadPoolExecutor(max_workers=self._threads)
+        for discussion_id in self.discussion_ids:
+            executor.submit(self._load, discussion_id)
+        executor.shutdown(wait=False)
+
+    def _load(self, discussion_id):
+        try:
+            self._load_function(discussion_id)
+            stat = 'loaded'
+        except Exception as e:
+            logging.warning('Warm-up of discussion %s failed: %s', discussion_id, e)
+            stat = 'failed'
+        with self._lock:
+            self.stats[stat] += 1
+            self._pending -= 1
+            if self._pending == 0:
+                logging.info('Warm-up finished: %s', self.stats)
+                self._done.set()
+
+    def is_ready(self):
+        """
+        Check whether all discussions were loaded (or failed to load).
+
+        :return: bool
+        """
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait until the warm-up has finished.
+
+        :param timeout: max. number of seconds to wait, None to wait indefinitely
+        :type timeout: float
+        :return: True if the warm-up has finished
+        """
+        return self._done.wait(timeout)
+
+    def get_stats(self):
+        """
+        Get a snapshot of the warm-up progress.
+
+        :return: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats['ready'] = self.is_ready()
+        return stats
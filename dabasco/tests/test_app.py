@@ -0,0 +1,705 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import re
+import sys
+import multiprocessing
+import urllib.parse
+import gzip
+import threading
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from unittest import mock
+
+from dabasco.server.json_codec import orjson
+
+from os import path
+import logging.config
+log_file_path = path.join(path.dirname(path.abspath(__file__)), '../logging.ini')
+logging.config.fileConfig(log_file_path, disable_existing_loggers=False)
+logger = logging.getLogger('test')
+
+# The app is run as a script from its own directory
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+import app  # noqa: E402
+
+
+def iter_chunks(body):
+    yield body[:10]
+    yield body[10:]
+
+
+def export_graph_v1(discussion_id):
+    arguments = range(1, 4)
+    return {'nodes': list(range(1, 5)),
+            'inferences': [{'id': i, 'premises': [i + 1], 'conclusion': 1, 'is_supportive': i % 2 == 0}
+                           for i in arguments],
+            'undercuts': []}
+
+
+def export_user_v1(user_id):
+    return {'marked_statements': [2], 'accepted_statements_via_click': [user_id % 3 + 2],
+            'rejected_statements_via_click': [], 'marked_arguments': [], 'rejected_arguments': []}
+
+
+def answer_opinions_v2(query):
+    return {alias: {'clickedStatements': [{'statementUid': int(user_id) % 3 + 2, 'isUpVote': True}]}
+            for alias, user_id in re.findall(r'(\w+):user\(uid:(\d+)\)', query)}
+
+
+class StubConnectionPools(object):
+    """
+    Replacement of the D-BAS connection pools that answers the D-BAS API v1 export requests of dabasco, and D-BAS API
+    v2 queries with answer_api2 (by default batched opinion queries).
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.stream_chunks = iter_chunks
+        self.answer_api2 = answer_opinions_v2
+        self.user_exports = {}
+        self.error = None
+        self.gate = None
+
+    def get(self, url, headers=None, stream=False):
+        self.requests.append(url)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        parsed_url = urllib.parse.urlsplit(url)
+        if parsed_url.path == app.DBAS_API2_BASE_PATH:
+            query = urllib.parse.parse_qs(parsed_url.query)[app.DBAS_API2_QUERY_KEY][0]
+            body = json.dumps(self.answer_api2(query)).encode('utf-8')
+            return app.DBASResponse(200, {}, self.stream_chunks(body) if stream else body)
+        parts = parsed_url.path.split('/')
+        if parts[-2] == app.DBAS_API1_PATH_GRAPH_DATA:
+            export = export_graph_v1(int(parts[-1]))
+        else:
+            export = self.user_exports.get(int(parts[-2])) or export_user_v1(int(parts[-2]))
+        # D-BAS API v1 exports are json strings
+        body = json.dumps(json.dumps(export)).encode('utf-8')
+        if stream:
+            return app.DBASResponse(200, {}, self.stream_chunks(body))
+        return app.DBASResponse(200, {}, body)
+
+    def get_stats(self):
+        return {}
+
+
+class FakeDiscussionV2(object):
+    """
+    D-BAS API v2 discussion that answers the delta and paginated statement and argument queries of the graph loaders,
+    and records them as (keyword, minUid or offset) tuples.
+    """
+
+    def __init__(self, statements, arguments):
+        self.statements = [{'uid': uid} for uid in range(1, statements + 1)]
+        self.arguments = []
+        for uid in range(1, arguments + 1):
+            self.add_argument(uid, uid + 1)
+        self.queries = []
+        self.failing_pages = set()
+        self.page_gates = {}
+
+    def add_argument(self, uid, premise, conclusion=1):
+        self.arguments.append({'uid': uid, 'isSupportive': True, 'conclusionUid': conclusion, 'argumentUid': None,
+                               'premisegroup': {'premises': [{'statementUid': premise}]}})
+
+    def __call__(self, query):
+        keyword, parameter, value, limit = re.search(
+            r'(statements|arguments)\((minUid|offset): (\d+)(?:, limit: (\d+))?\)', query).groups()
+        self.queries.append((keyword, int(value)))
+        items = getattr(self, keyword)
+        if parameter == 'minUid':
+            items = [item for item in items if item['uid'] >= int(value)]
+        else:
+            gate = self.page_gates.get((keyword, int(value)))
+            if gate is not None:
+                gate.wait(5)
+            if (keyword, int(value)) in self.failing_pages:
+                raise ConnectionResetError('connection reset while fetching a page')
+            items = items[int(value):int(value) + int(limit)]
+        return {'issue': {keyword: items}}
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """
+    Thread pool that keeps all futures it returned.
+    """
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers)
+        self.futures = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Base of the app tests: D-BAS is replaced by StubConnectionPools, the caches are empty, and the app configuration
+    changed by a test is restored afterwards.
+    """
+
+    def setUp(self):
+        self.config = {name: getattr(app, name) for name in (
+            'DBAS_API_VERSION', 'DBAS_STREAMING_IMPORT', 'DABASCO_STREAMING_CHUNK_SIZE', 'dbas_connection_pools',
+            'DABASCO_COHORT_MAX_USERS', 'dbas_circuit_breaker', 'dabasco_evaluation_executor', 'json_codec',
+            'response_compressor', 'DABASCO_INVALIDATION_TOKEN', 'DBAS_API2_DELTA_IMPORT',
+            'DBAS_API2_DELTA_FULL_IMPORT_INTERVAL', 'DBAS_API2_PAGE_SIZE', 'DBAS_API2_PAGE_CONCURRENCY',
+            'dbas_fetch_executor', 'dbas_graph_cache', 'DBAS_CACHE_MAX_STALENESS', 'DBAS_CACHE_MAX_STALENESS_ON_ERROR',
+            'dbas_snapshot_store', 'DBAS_OFFLINE', 'dabasco_warmup')}
+        app.DBAS_API_VERSION = 1
+        app.dbas_connection_pools = StubConnectionPools()
+        app.dbas_circuit_breaker = app.DBASCircuitBreaker(1, 60)
+        for cache in (app.dbas_graph_cache, app.dbas_user_cache, app.dabasco_output_cache):
+            cache.clear()
+        # Compress all results, however small
+        app.response_compressor = app.ResponseCompressor(('gzip',), 6, 0)
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        for name, value in self.config.items():
+            setattr(app, name, value)
+
+
+class TestApp(AppTestCase):
+
+    def test_stream_success_recorded_after_body(self):
+        response = app.request_dbas('http://dbas/export/doj/1', stream=True)
+        self.assertEqual(app.dbas_circuit_breaker.get_stats()['successes'], 0)
+        self.assertEqual(b''.join(response.body), json.dumps(json.dumps(export_graph_v1(1))).encode('utf-8'))
+        self.assertEqual(app.dbas_circuit_breaker.get_stats()['successes'], 1)
+
+    def test_stream_failure_recorded(self):
+        def failing_chunks(body):
+            yield body[:10]
+            raise ConnectionResetError('connection reset while reading the body')
+        app.dbas_connection_pools.stream_chunks = failing_chunks
+        response = app.request_dbas('http://dbas/export/doj/1', stream=True)
+        with self.assertRaises(ConnectionResetError):
+            b''.join(response.body)
+        stats = app.dbas_circuit_breaker.get_stats()
+        self.assertEqual((stats['successes'], stats['failures'], stats['state']), (0, 1, 'open'))
+
+    def test_stream_failure_during_import(self):
+        def failing_chunks(body):
+            yield body[:10]
+            raise ConnectionResetError('connection reset while reading the body')
+        app.dbas_connection_pools.stream_chunks = failing_chunks
+        app.DBAS_STREAMING_IMPORT = True
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1').status_code, 500)
+        self.assertEqual(app.dbas_circuit_breaker.get_stats()['failures'], 1)
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1').status_code, 503)
+
+    def test_stream_dropped_unread(self):
+        response = app.request_dbas('http://dbas/export/doj/1', stream=True)
+        del response
+        self.assertEqual(app.dbas_circuit_breaker.get_stats()['successes'], 1)
+        self.assertTrue(app.dbas_circuit_breaker.allow_request())
+
+    def test_streamed_result(self):
+        # Split the outputs into several chunks
+        app.DABASCO_STREAMING_CHUNK_SIZE = 7
+        backends = ['json'] + (['orjson'] if orjson is not None else [])
+        for backend in backends:
+            app.json_codec = app.JSONCodec(backend)
+            for url in ('/evaluate/dungify/dis/1', '/evaluate/dungify/dis/1/user/2',
+                        '/evaluate/adfify/dis/1', '/evaluate/adfify/dis/1/user/2/opinion_strict'):
+                app.dabasco_output_cache.clear()
+                streamed_response = self.client.get(url + '?stream=true')
+                self.assertIsNone(streamed_response.content_length)
+                streamed_body = streamed_response.get_data()
+                app.dabasco_output_cache.clear()
+                body = self.client.get(url + '?stream=false').get_data()
+                cached_response = self.client.get(url + '?stream=true')
+                self.assertEqual(cached_response.content_length, len(body))
+                self.assertEqual(streamed_body, body, (backend, url))
+                self.assertEqual(cached_response.get_data(), body, (backend, url))
+                self.assertEqual(app.json_codec.decode(body)['dbas_discussion_id'], 1)
+
+    def assert_not_modified(self, url, etag, headers=None, response_etag=None):
+        app.dabasco_output_cache.clear()
+        # Results are not created for a 304 response
+        with mock.patch.object(app, 'create_encoded_result', side_effect=AssertionError('result created')):
+            response = self.client.get(url, headers=dict(headers or {}, **{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], response_etag or etag)
+        self.assertEqual(response.get_data(), b'')
+
+    def test_etag(self):
+        for url in ('/evaluate/dungify/dis/1/user/2', '/evaluate/toastify/dis/1/user/2/opinion_weak',
+                    '/evaluate/dis/1/user/2?opinions=strong,strict'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Content-Encoding', response.headers)
+            etag = response.headers['ETag']
+            self.assertFalse(etag.startswith('W/'))
+            self.assert_not_modified(url, etag)
+            # The uncompressed result is also current for clients accepting a compressed one
+            self.assert_not_modified(url, etag, {'Accept-Encoding': 'gzip'})
+
+            response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            compressed_etag = response.headers['ETag']
+            self.assertEqual(compressed_etag, etag[:-1] + '-gzip"')
+            self.assertEqual(gzip.decompress(response.get_data()), self.client.get(url).get_data())
+            self.assert_not_modified(url, compressed_etag, {'Accept-Encoding': 'gzip'})
+
+    def test_etag_changed(self):
+        url = '/evaluate/dungify/dis/1/user/2'
+        etag = self.client.get(url).headers['ETag']
+        self.assertNotEqual(self.client.get(url + '/opinion_strict').headers['ETag'], etag)
+        self.assertNotEqual(self.client.get('/evaluate/dungify/dis/1/user/3').headers['ETag'], etag)
+        self.assertNotEqual(self.client.get(url + '?format=raw').headers['ETag'], etag)
+
+    def test_etag_streamed(self):
+        url = '/evaluate/adfify/dis/1/user/2?stream=true'
+        etag = self.client.get(url).headers['ETag']
+        app.dabasco_output_cache.clear()
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(response.content_length)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['ETag'], 'W/' + etag[:-1] + '-gzip"')
+        self.assertEqual(gzip.decompress(response.get_data()), self.client.get(url).get_data())
+        # A cached result would be compressed completely, and thus be sent with a strong ETag
+        self.assert_not_modified(url, response.headers['ETag'], {'Accept-Encoding': 'gzip'}, etag[:-1] + '-gzip"')
+
+    def test_raw_format(self):
+        result = self.client.get('/evaluate/dungify/dis/1/user/2').get_json()
+        for headers, query in (({}, '?format=raw'), ({'Accept': 'text/plain'}, ''),
+                               ({'Accept': 'text/plain;q=0.9, application/json;q=0.5'}, '')):
+            response = self.client.get('/evaluate/dungify/dis/1/user/2' + query,
+                                       headers=dict(headers, Origin='http://example.org'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/plain')
+            self.assertEqual(response.get_data(as_text=True), result['af'])
+            self.assertEqual(response.headers['X-DBAS-Discussion-Id'], '1')
+            self.assertEqual(response.headers['X-DBAS-User-Id'], '2')
+            self.assertEqual(set(response.headers['Access-Control-Expose-Headers'].split(', ')),
+                             {'X-DBAS-Discussion-Id', 'X-DBAS-User-Id'})
+
+        response = self.client.get('/evaluate/adfify/dis/1', headers={'Accept': 'text/plain'})
+        self.assertEqual(response.get_data(as_text=True), self.client.get('/evaluate/adfify/dis/1').get_json()['adf'])
+        self.assertNotIn('X-DBAS-User-Id', response.headers)
+        self.assertIn('Accept', response.vary)
+
+    def test_json_format(self):
+        for headers, query in (({}, ''), ({}, '?format=json'), ({'Accept': 'text/plain'}, '?format=json'),
+                               ({'Accept': 'application/json, text/plain;q=0.5'}, '')):
+            response = self.client.get('/evaluate/dungify/dis/1/user/2' + query, headers=headers)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(response.get_json()['dbas_user_id'], 2)
+            self.assertNotIn('X-DBAS-User-Id', response.headers)
+
+    def test_raw_format_not_available(self):
+        response = self.client.get('/evaluate/toastify/dis/1/user/2?format=raw')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1?format=xml').status_code, 400)
+        # TOAST results are always JSON
+        response = self.client.get('/evaluate/toastify/dis/1/user/2', headers={'Accept': 'text/plain'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+
+    def test_cohort(self):
+        response = self.client.get('/evaluate/dungify/dis/1/users?ids=3,1,2,1,3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data().split(b'\n')
+        self.assertEqual(lines[-1], b'')
+        results = [json.loads(line) for line in lines[:-1]]
+        # One line per user, in the order of the first occurrence of each user ID
+        self.assertEqual([result['dbas_user_id'] for result in results], [3, 1, 2])
+        for user, line in zip((3, 1, 2), lines):
+            self.assertEqual(line + b'\n', self.client.get('/evaluate/dungify/dis/1/user/{}'.format(user)).get_data())
+
+        response = self.client.get('/evaluate/toastify/dis/1/users/opinion_weak?ids=2')
+        self.assertEqual(response.get_data(),
+                         self.client.get('/evaluate/toastify/dis/1/user/2/opinion_weak').get_data())
+
+    def test_cohort_etag(self):
+        url = '/evaluate/dungify/dis/1/users?ids=3,1,2'
+        etag = self.client.get(url).headers['ETag']
+        self.assertNotEqual(self.client.get('/evaluate/dungify/dis/1/users?ids=1,2,3').headers['ETag'], etag)
+        self.assertNotEqual(self.client.get('/evaluate/adfify/dis/1/users?ids=3,1,2').headers['ETag'], etag)
+        self.assert_not_modified(url, etag)
+        self.assert_not_modified(url, etag, {'Accept-Encoding': 'gzip'})
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['ETag'], 'W/' + etag[:-1] + '-gzip"')
+        self.assertEqual(gzip.decompress(response.get_data()), self.client.get(url).get_data())
+        self.assert_not_modified(url, response.headers['ETag'], {'Accept-Encoding': 'gzip'})
+
+        # A changed opinion changes the ETag
+        app.dbas_connection_pools.user_exports[2] = dict(export_user_v1(2), marked_statements=[3])
+        app.dbas_user_cache.clear()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_cohort_invalid_ids(self):
+        for ids in ('', ',', 'a', '1,b', '1.5', '0', '-1', '2,-3'):
+            response = self.client.get('/evaluate/adfify/dis/1/users?ids=' + ids)
+            self.assertEqual(response.status_code, 400, ids)
+        self.assertEqual(self.client.get('/evaluate/adfify/dis/1/users').status_code, 400)
+        self.assertEqual(app.dbas_connection_pools.requests, [])
+
+    def test_cohort_max_users(self):
+        app.DABASCO_COHORT_MAX_USERS = 3
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1/users?ids=1,2,3,1').status_code, 200)
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1/users?ids=1,2,3,4').status_code, 400)
+
+    def test_cohort_all_users_api_v1(self):
+        # D-BAS API v1 cannot export the users of a discussion
+        response = self.client.get('/evaluate/dungify/dis/1/users?ids=all')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batched_opinion_query(self):
+        user_ids = list(range(100001, 100001 + app.DBAS_API2_OPINIONS_BATCH_SIZE))
+        dbas_users = app.fetch_dbas_users_data_v2(1, user_ids)
+        self.assertEqual(sorted(dbas_users), user_ids)
+        self.assertEqual(dbas_users[100001].accepted_statements_explicit, {2 + 100001 % 3})
+        url = app.dbas_connection_pools.requests[-1]
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)[app.DBAS_API2_QUERY_KEY][0]
+        self.assertNotIn('  ', query)
+        self.assertNotIn('\n', query)
+        self.assertLess(len(url), 110 * len(user_ids))
+
+    def test_formats(self):
+        response = self.client.get('/evaluate/dis/1/user/2?formats=af,adf,toast&opinions=strong,strict')
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertEqual(sorted(result), ['adf', 'af', 'dbas_discussion_id', 'dbas_user_id', 'toast'])
+        self.assertEqual((result['dbas_discussion_id'], result['dbas_user_id']), (1, 2))
+        for opinion, opinion_path in (('strong', ''), ('strict', '/opinion_strict')):
+            for output_format, mode in (('af', 'dungify'), ('adf', 'adfify')):
+                output = self.client.get('/evaluate/{}/dis/1/user/2{}?format=raw'.format(mode, opinion_path))
+                self.assertEqual(result[output_format][opinion], output.get_data(as_text=True))
+            toast = self.client.get('/evaluate/toastify/dis/1/user/2{}'.format(opinion_path))
+            self.assertEqual(result['toast'][opinion], toast.get_json())
+
+    def test_formats_evaluation_processes(self):
+        url = '/evaluate/dis/1/user/2?opinions=strong,strict,weak'
+        body = self.client.get(url).get_data()
+        app.dabasco_output_cache.clear()
+        app.dabasco_evaluation_executor = ProcessPoolExecutor(max_workers=1,
+                                                              mp_context=multiprocessing.get_context('spawn'))
+        try:
+            self.assertEqual(self.client.get(url).get_data(), body)
+        finally:
+            app.dabasco_evaluation_executor.shutdown()
+
+
+class TestAppInvalidation(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        app.DABASCO_INVALIDATION_TOKEN = 's3cret'
+        self.authorization = {'Authorization': 'Bearer s3cret'}
+
+    def test_disabled(self):
+        app.DABASCO_INVALIDATION_TOKEN = None
+        for url in ('/invalidate/dis/1', '/invalidate/dis/1/user/2'):
+            self.assertEqual(self.client.post(url, headers=self.authorization).status_code, 403)
+            self.assertEqual(self.client.post(url).status_code, 403)
+
+    def test_unauthorized(self):
+        self.client.get('/evaluate/dungify/dis/1/user/2')
+        for headers in ({}, {'Authorization': ''}, {'Authorization': 's3cret'}, {'Authorization': 'Bearer'},
+                        {'Authorization': 'Bearer  s3cret'}, {'Authorization': 'Basic s3cret'},
+                        {'Authorization': 'Bearer wrong'}, {'Authorization': 'Bearer s3cret2'}):
+            for url in ('/invalidate/dis/1', '/invalidate/dis/1/user/2'):
+                self.assertEqual(self.client.post(url, headers=headers).status_code, 401, headers)
+        self.assertEqual((len(app.dbas_graph_cache), len(app.dbas_user_cache), len(app.dabasco_output_cache)),
+                         (1, 1, 1))
+        self.assertEqual(self.client.get('/invalidate/dis/1', headers=self.authorization).status_code, 405)
+
+    def test_invalidate_discussion(self):
+        for url in ('/evaluate/dungify/dis/1/user/2', '/evaluate/adfify/dis/1', '/evaluate/dungify/dis/2'):
+            self.client.get(url)
+        requests = len(app.dbas_connection_pools.requests)
+
+        response = self.client.post('/invalidate/dis/1', headers=self.authorization)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'invalidated': {'graph_cache': 1, 'user_cache': 0, 'output_cache': 2}})
+        self.assertEqual((len(app.dbas_graph_cache), len(app.dbas_user_cache), len(app.dabasco_output_cache)),
+                         (1, 1, 1))
+
+        # The graph is fetched again, the unchanged opinion is still cached
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1/user/2').status_code, 200)
+        self.assertEqual(app.dbas_connection_pools.requests[requests:], ['{}{}/{}/1'.format(
+            app.DBAS_BASE_URL, app.DBAS_API1_BASE_PATH, app.DBAS_API1_PATH_GRAPH_DATA)])
+        self.client.get('/evaluate/dungify/dis/2')
+        self.assertEqual(len(app.dbas_connection_pools.requests), requests + 1)
+
+    def test_invalidate_user(self):
+        for url in ('/evaluate/dungify/dis/1/user/2', '/evaluate/dungify/dis/1/user/3', '/evaluate/adfify/dis/1'):
+            self.client.get(url)
+        requests = len(app.dbas_connection_pools.requests)
+
+        response = self.client.post('/invalidate/dis/1/user/2', headers=self.authorization)
+        self.assertEqual(response.get_json(), {'invalidated': {'graph_cache': 0, 'user_cache': 1, 'output_cache': 1}})
+
+        # The opinion is fetched again, the unchanged graph is still cached
+        self.client.get('/evaluate/dungify/dis/1/user/2')
+        self.assertEqual(app.dbas_connection_pools.requests[requests:], ['{}{}/{}/2/1'.format(
+            app.DBAS_BASE_URL, app.DBAS_API1_BASE_PATH, app.DBAS_API1_PATH_USER_DATA)])
+        self.client.get('/evaluate/dungify/dis/1/user/3')
+        self.client.get('/evaluate/adfify/dis/1')
+        self.assertEqual(len(app.dbas_connection_pools.requests), requests + 1)
+
+
+class TestAppGraphLoadersV2(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        app.DBAS_API_VERSION = 2
+        self.discussion = FakeDiscussionV2(4, 3)
+        app.dbas_connection_pools.answer_api2 = self.discussion
+        self.now = 0
+        app.dbas_graph_cache = app.DBASCache(16, 10, clock=lambda: self.now)
+
+    def test_delta_refresh(self):
+        app.DBAS_API2_DELTA_IMPORT = True
+        dbas_graph = app.load_dbas_graph_data(1)
+        self.assertCountEqual(self.discussion.queries, [('statements', 1), ('arguments', 1)])
+        self.assertEqual(dbas_graph.statements, {1, 2, 3, 4})
+        self.assertEqual(set(dbas_graph.inferences), {1, 2, 3})
+
+        self.discussion.statements.append({'uid': 5})
+        self.discussion.add_argument(4, 5)
+        self.discussion.queries.clear()
+        self.now = 10
+        updated_graph = app.load_dbas_graph_data(1)
+        self.assertCountEqual(self.discussion.queries, [('statements', 5), ('arguments', 4)])
+        self.assertEqual(updated_graph.statements, {1, 2, 3, 4, 5})
+        self.assertEqual(set(updated_graph.inferences), {1, 2, 3, 4})
+        self.assertEqual(updated_graph.inferences[4].premises, [5])
+        # The graph served before is not modified
+        self.assertEqual(dbas_graph.statements, {1, 2, 3, 4})
+        self.assertEqual(set(dbas_graph.inferences), {1, 2, 3})
+
+        response = self.client.get('/evaluate/dungify/dis/1', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('arg(i4).', response.get_json()['af'])
+
+    def test_delta_refresh_not_modified(self):
+        app.DBAS_API2_DELTA_IMPORT = True
+        dbas_graph = app.load_dbas_graph_data(1)
+        self.discussion.queries.clear()
+        self.now = 10
+        self.assertIs(app.load_dbas_graph_data(1), dbas_graph)
+        self.assertCountEqual(self.discussion.queries, [('statements', 5), ('arguments', 4)])
+        # The unchanged graph is served for another TTL
+        self.now = 19
+        self.assertIs(app.load_dbas_graph_data(1), dbas_graph)
+        self.assertEqual(len(self.discussion.queries), 2)
+
+    def test_delta_full_import(self):
+        app.DBAS_API2_DELTA_IMPORT = True
+        app.DBAS_API2_DELTA_FULL_IMPORT_INTERVAL = 60
+        dbas_graph = app.load_dbas_graph_data(1)
+        # Edited items are not noticed by delta imports
+        self.discussion.arguments[0]['isSupportive'] = False
+        self.now = 10
+        self.assertIs(app.load_dbas_graph_data(1), dbas_graph)
+
+        self.discussion.queries.clear()
+        self.now = 20
+        full_import_at = app.time.monotonic() + 60
+        with mock.patch.object(app.time, 'monotonic', return_value=full_import_at):
+            updated_graph = app.load_dbas_graph_data(1)
+        self.assertCountEqual(self.discussion.queries, [('statements', 1), ('arguments', 1)])
+        self.assertIsNot(updated_graph, dbas_graph)
+        self.assertFalse(updated_graph.inferences[1].is_supportive)
+        self.assertTrue(dbas_graph.inferences[1].is_supportive)
+
+    def use_recording_executor(self):
+        # A single worker runs the page fetches in order
+        executor = RecordingExecutor(1)
+        self.addCleanup(executor.shutdown)
+        app.dbas_fetch_executor = executor
+        return executor
+
+    def assert_no_running_futures(self, executor):
+        for gate in self.discussion.page_gates.values():
+            gate.set()
+        done, not_done = wait(executor.futures, timeout=5)
+        self.assertFalse(not_done)
+
+    def test_paginated_import(self):
+        app.DBAS_API2_PAGE_SIZE = 2
+        self.discussion = FakeDiscussionV2(5, 4)
+        app.dbas_connection_pools.answer_api2 = self.discussion
+        dbas_graph = app.load_dbas_graph_data(1)
+        self.assertEqual(dbas_graph.statements, {1, 2, 3, 4, 5})
+        self.assertEqual(set(dbas_graph.inferences), {1, 2, 3, 4})
+        self.assertEqual(dbas_graph.inferences[4].premises, [5])
+
+    def test_pages_short_last_page(self):
+        app.DBAS_API2_PAGE_SIZE = 2
+        app.DBAS_API2_PAGE_CONCURRENCY = 3
+        executor = self.use_recording_executor()
+        self.discussion = FakeDiscussionV2(5, 4)
+        self.discussion.page_gates[('statements', 6)] = threading.Event()
+        app.dbas_connection_pools.answer_api2 = self.discussion
+
+        pages = list(app.iter_dbas_pages(app.DBAS_API2_QUERY_STATEMENTS_PAGE, 1, 'statements'))
+        self.assertEqual([[item['uid'] for item in page['issue']['statements']] for page in pages],
+                         [[1, 2], [3, 4], [5]])
+        # Up to 3 pages were in flight: the pages after the short one are fetched ahead, then cancelled
+        self.assertEqual(len(executor.futures), 5)
+        self.assertTrue(executor.futures[4].cancelled())
+        self.assertNotIn(('statements', 8), self.discussion.queries)
+        self.assert_no_running_futures(executor)
+
+    def test_pages_empty_last_page(self):
+        app.DBAS_API2_PAGE_SIZE = 2
+        app.DBAS_API2_PAGE_CONCURRENCY = 1
+        executor = self.use_recording_executor()
+        self.discussion = FakeDiscussionV2(4, 4)
+        app.dbas_connection_pools.answer_api2 = self.discussion
+
+        pages = list(app.iter_dbas_pages(app.DBAS_API2_QUERY_ARGUMENTS_PAGE, 1, 'arguments'))
+        self.assertEqual([len(page['issue']['arguments']) for page in pages], [2, 2, 0])
+        self.assertEqual(self.discussion.queries, [('arguments', 0), ('arguments', 2), ('arguments', 4)])
+        self.assertEqual(len(executor.futures), 3)
+
+    def test_pages_failure(self):
+        app.DBAS_API2_PAGE_SIZE = 2
+        app.DBAS_API2_PAGE_CONCURRENCY = 3
+        executor = self.use_recording_executor()
+        # Keep the breaker closed, so the page after the failing one waits for its gate
+        app.dbas_circuit_breaker = app.DBASCircuitBreaker(10, 60)
+        self.discussion = FakeDiscussionV2(9, 4)
+        self.discussion.failing_pages.add(('statements', 2))
+        self.discussion.page_gates[('statements', 4)] = threading.Event()
+        app.dbas_connection_pools.answer_api2 = self.discussion
+
+        with self.assertRaises(ConnectionResetError):
+            app.load_dbas_graph_data(1)
+        # The page fetched ahead of the failing one is cancelled, and no arguments are fetched
+        self.assertEqual(len(executor.futures), 4)
+        self.assertTrue(executor.futures[3].cancelled())
+        self.assertNotIn('arguments', [keyword for keyword, offset in self.discussion.queries])
+        self.assertIsNone(app.dbas_graph_cache.peek(('2', 1)))
+        self.assert_no_running_futures(executor)
+
+
+class TestAppStaleCache(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 0
+        app.dbas_graph_cache = app.DBASCache(16, 10, clock=lambda: self.now)
+
+    def wait_for(self, condition):
+        for _ in range(500):
+            if condition():
+                break
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_stale_while_revalidate(self):
+        app.DBAS_CACHE_MAX_STALENESS = 30
+        dbas_graph = app.load_dbas_graph_data(1)
+        stub = app.dbas_connection_pools
+        stub.gate = threading.Event()
+        self.now = 15
+        # The expired graph is served while a single refresh waits for D-BAS in the background
+        for _ in range(3):
+            self.assertIs(app.load_dbas_graph_data(1), dbas_graph)
+        self.wait_for(lambda: len(stub.requests) == 2)
+        self.assertEqual(len(app.dbas_pending_refreshes), 1)
+
+        stub.gate.set()
+        self.wait_for(lambda: not app.dbas_pending_refreshes)
+        refreshed_graph = app.load_dbas_graph_data(1)
+        self.assertIsNot(refreshed_graph, dbas_graph)
+        self.assertTrue(refreshed_graph.is_equivalent_to(dbas_graph))
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_stale_on_error(self):
+        app.DBAS_CACHE_MAX_STALENESS = 10
+        app.DBAS_CACHE_MAX_STALENESS_ON_ERROR = 60
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1').status_code, 200)
+        body = self.client.get('/evaluate/dungify/dis/1').data
+        stub = app.dbas_connection_pools
+        stub.error = ConnectionResetError('connection refused by D-BAS')
+
+        # Within DBAS_CACHE_MAX_STALENESS, the background refresh fails
+        self.now = 15
+        response = self.client.get('/evaluate/dungify/dis/1')
+        self.assertEqual((response.status_code, response.data), (200, body))
+        self.wait_for(lambda: not app.dbas_pending_refreshes)
+        self.assertEqual(app.dbas_circuit_breaker.get_stats()['state'], 'open')
+        # Within DBAS_CACHE_MAX_STALENESS_ON_ERROR, the failed refresh is answered with the stale graph
+        self.now = 65
+        response = self.client.get('/evaluate/dungify/dis/1')
+        self.assertEqual((response.status_code, response.data), (200, body))
+        # Beyond, D-BAS is reported unavailable
+        self.now = 75
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1').status_code, 503)
+
+
+class TestAppOffline(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        snapshot_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_directory.cleanup)
+        app.dbas_snapshot_store = app.DBASSnapshotStore(snapshot_directory.name, 3)
+
+    def test_offline(self):
+        response = self.client.get('/evaluate/dungify/dis/1/user/2')
+        self.assertEqual(response.status_code, 200)
+        stub = app.dbas_connection_pools
+        requests = len(stub.requests)
+
+        for cache in (app.dbas_graph_cache, app.dbas_user_cache, app.dabasco_output_cache):
+            cache.clear()
+        app.DBAS_OFFLINE = True
+        stub.error = AssertionError('no requests are sent to D-BAS in offline mode')
+        offline_response = self.client.get('/evaluate/dungify/dis/1/user/2')
+        self.assertEqual((offline_response.status_code, offline_response.data), (200, response.data))
+        self.assertEqual(len(stub.requests), requests)
+
+    def test_offline_without_snapshot(self):
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1/user/2').status_code, 200)
+        app.DBAS_OFFLINE = True
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/2').status_code, 503)
+        self.assertEqual(self.client.get('/evaluate/dungify/dis/1/user/3').status_code, 503)
+
+
+class TestAppReady(AppTestCase):
+
+    def test_ready(self):
+        stub = app.dbas_connection_pools
+        stub.gate = threading.Event()
+        app.dabasco_warmup = app.Warmup(app.warm_up_discussion, [1, 2], 1)
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.get_json()['ready'])
+
+        app.dabasco_warmup.start()
+        self.assertEqual(self.client.get('/ready').status_code, 503)
+        stub.gate.set()
+        self.assertTrue(app.dabasco_warmup.wait(5))
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'ready': True, 'warmup': {
+            'discussions': 2, 'loaded': 2, 'failed': 0, 'ready': True}})
+        self.assertIsNotNone(app.dbas_graph_cache.peek(('1', 2)))
+
+    def test_ready_without_warmup(self):
+        app.dabasco_warmup = app.Warmup(None, [], 1)
+        self.assertEqual(self.client.get('/ready').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()